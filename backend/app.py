@@ -1,70 +1,107 @@
 from flask import Flask, jsonify, request
-from sqlalchemy import create_engine, or_, func, desc, text
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import or_, func, desc, text, select, update
 
 from sqlalchemy.orm import sessionmaker, scoped_session
 from config import ProductionConfig  # usamos configuración segura desde .env
+from database import crear_engine, metricas_pool
 from models.libro import Base, Libro, Faltante, LibroBaja
+from controllers import eventos
+from controllers.busqueda import IndiceLibros, buscar_titulo_autor
+from controllers.cache_isbn import CacheIsbn
+from controllers.editoriales import DiccionarioEditoriales
+from controllers.sugerencias import SugerenciasLibros, ORDENES
+from controllers.isbn_interno import AsignadorIsbn, CodigosAgotados
+from controllers import importacion, exportacion, reportes, resumen_bajas, stock, archivo_faltantes
+from controllers.streaming import respuesta_stream, TAMANIO_LOTE
+from controllers.serializacion import filas_a_dicts, instalar_json, isoformat
+from controllers import versiones, ruteo, difusion, esquema, metricas, registro
+from controllers import admin as panel_admin
+from controllers.versiones import con_etag
 
 from unidecode import unidecode
 from flask_cors import CORS
-from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
-from flask import send_from_directory,request, jsonify
+from flask import send_from_directory,request, jsonify, Response, stream_with_context
 from flask import abort
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.exc import SQLAlchemyError
-from flask_migrate import Migrate
 
 import jwt 
 import time
 import os
+import logging
+import threading
+import click
 
-# Cargar variables de entorno solo si no estamos en producción
-if os.getenv('FLASK_ENV') != 'production':
-    from dotenv import load_dotenv
-    load_dotenv()
+def _desde_cli_de_flask():
+    """True si la app la carga el comando `flask` (flask db, flask exportar...)."""
+    from flask.cli import FlaskGroup
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.find_root().command, FlaskGroup)
 
-def create_app():
-    app = Flask(__name__, static_folder="../frontend/build", static_url_path="/")
-    CORS(app)
-    app.config.from_object(ProductionConfig)
 
-    # --- Soporte para migraciones sin tocar tu ORM actual ---
-    # Config para Flask-SQLAlchemy (solo para que Flask-Migrate funcione)
-    app.config['SQLALCHEMY_DATABASE_URI'] = app.config["SQLALCHEMY_DATABASE_URI"]
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def instalar_migraciones(app):
+    """
+    Flask-SQLAlchemy + Flask-Migrate (`flask db ...`), solo para el CLI:
+    importarlos (alembic incluido) duplica lo que tarda en arrancar un worker.
+    """
+    from flask_sqlalchemy import SQLAlchemy
+    from flask_migrate import Migrate
 
     # Creamos un "db" solo para migraciones, usando la MISMA metadata de tus modelos
     db = SQLAlchemy(metadata=Base.metadata)
     db.init_app(app)
+    Migrate(app, db, compare_type=True)
 
-    # Inicializamos Flask-Migrate apuntando a esa metadata
-    migrate = Migrate(app, db, compare_type=True)
-    # --------------------------------------------------------
 
-    engine = create_engine(app.config["SQLALCHEMY_DATABASE_URI"], echo=True, pool_pre_ping=True)
-    
-    # 🔧 CREAR SCHEMA Y TABLAS EN PRODUCCIÓN
-    if os.getenv("FLASK_ENV") == "production" or app.config.get("CREATE_TABLES_ON_STARTUP"):
-        print("🏗️ Creando schema y tablas en producción...")
-        
-        # Crear el schema si no existe
-        with engine.connect() as conn:
-            try:
-                conn.execute(text("CREATE SCHEMA IF NOT EXISTS stock_charles_schema"))
-                conn.commit()
-                print("✅ Schema 'stock_charles_schema' creado/verificado!")
-            except Exception as e:
-                print(f"⚠️ Error creando schema: {e}")
-        
-        # Crear las tablas
-        Base.metadata.create_all(engine)
-        print("✅ Tablas creadas exitosamente!")
-    elif os.getenv("FLASK_ENV") == "development":
-        Base.metadata.create_all(engine)
+def create_app():
+    """
+    Arma la app sin efectos secundarios: no toca la base (ni DDL ni
+    consultas), no importa Flask-Admin ni alembic y no arranca más hilos que
+    el que escribe los logs (ver controllers/registro.py). Las
+    precargas arrancan con el primer request o desde el servidor
+    (gunicorn.conf.py, asgi.py), y el esquema se maneja con
+    `flask preparar-base`, que corre en cada deploy (ver controllers/esquema.py).
+    """
+    app = Flask(__name__, static_folder="../frontend/build", static_url_path="/")
+    instalar_json(app)   # jsonify con orjson (ver controllers/serializacion.py)
+    CORS(app)
+    app.config.from_object(ProductionConfig)
+    registro.configurar(
+        nivel=app.config["LOG_LEVEL"],
+        niveles=registro.parsear_niveles(app.config["LOG_NIVELES"]),
+        muestreo_debug=app.config["LOG_MUESTREO_DEBUG"],
+        echo_sql=app.config["SQLALCHEMY_ECHO"],
+    )
+
+    # --- Soporte para migraciones sin tocar tu ORM actual ---
+    if _desde_cli_de_flask():
+        instalar_migraciones(app)
+    # --------------------------------------------------------
 
-    SessionFactory = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    # Pool según SQLALCHEMY_ENGINE_OPTIONS + statement_timeout (ver database.py)
+    # echo=False: SQLALCHEMY_ECHO se maneja con el nivel del logger sqlalchemy.engine (por la cola de logs)
+    engine = crear_engine(config=app.config, echo=False)
+    app.engine = engine
+
+    # Réplica de lectura opcional (GET -> réplica, escrituras -> primaria)
+    app.engine_replica = app.monitor_replica = None
+    opciones_sesion = {}
+    if app.config.get("SQLALCHEMY_REPLICA_URI"):
+        app.engine_replica = crear_engine(app.config["SQLALCHEMY_REPLICA_URI"], config=app.config, echo=False)
+        app.monitor_replica = ruteo.MonitorReplica(app.engine_replica, lag_maximo=app.config["REPLICA_LAG_MAXIMO"])
+        opciones_sesion = {
+            "class_": ruteo.SesionRuteada,
+            "replica": app.engine_replica,
+            "monitor": app.monitor_replica,
+        }
+        app.logger.info("📖 Réplica de lectura configurada")
+
+    # Latencia y SQL por vista para /metrics (primero: la latencia incluye los demás before_request)
+    metricas.instalar(app, (engine, app.engine_replica), umbral_n_mas_1=app.config["METRICAS_UMBRAL_N_MAS_1"])
+    if app.config["LOG_SQL_POR_REQUEST"]:
+        registro.instalar_sql_por_request(app, (engine, app.engine_replica))
+
+    SessionFactory = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine, **opciones_sesion))
     app.session_factory = SessionFactory
     app.session = SessionFactory   # <— clave: los endpoints que ya usan app.session siguen funcionando
 
@@ -72,8 +109,75 @@ def create_app():
     def remove_session(exception=None):
         SessionFactory.remove()
 
-    admin = Admin(app, name="Panel de Administración", template_mode="bootstrap3")
-    admin.add_view(ModelView(Libro, db.session))
+    if app.engine_replica is not None:
+        ruteo.instalar(app, SessionFactory, ventana=app.config["REPLICA_VENTANA_ESCRITURA"])
+
+    # Índice en memoria para /libros?q= (se carga en la primera búsqueda)
+    eventos.instalar()
+    app.indice_libros = IndiceLibros()
+    eventos.suscribir(Libro, app.indice_libros.on_commit)
+
+    # Typeahead de /api/libros/sugerir: usa el mismo índice + stock y ventas recientes
+    # (se suscribe después del índice: reubica cada libro con sus palabras nuevas)
+    app.sugerencias = SugerenciasLibros(app.indice_libros, dias_ventas=app.config["SUGERENCIAS_DIAS_VENTAS"])
+    eventos.suscribir(Libro, app.sugerencias.on_commit_libro)
+    eventos.suscribir(LibroBaja, app.sugerencias.on_commit_baja)
+
+    # Mapa isbn -> libro para el lector de códigos de barra
+    app.cache_isbn = CacheIsbn(
+        ttl_positivo=app.config["CACHE_ISBN_TTL_POSITIVO"],
+        ttl_negativo=app.config["CACHE_ISBN_TTL_NEGATIVO"],
+    )
+    eventos.suscribir(Libro, app.cache_isbn.on_commit)
+
+    # Editoriales con contador de libros para /api/editoriales (y su autocompletado)
+    app.editoriales = DiccionarioEditoriales()
+    eventos.suscribir(Libro, app.editoriales.on_commit)
+
+    # Códigos internos de 5 dígitos (/generar-isbn), reservados de a bloques
+    app.asignador_isbn = AsignadorIsbn(engine, tamanio_bloque=app.config["ISBN_INTERNO_BLOQUE"])
+
+    # Versión por tabla para los ETag de los GET (304 sin tocar la base)
+    versiones.instalar(app, engine, (Libro, Faltante, LibroBaja), ttl=app.config["VERSIONES_TTL"])
+
+    # Con varios workers, los commits de cada uno llegan a las estructuras en memoria de los demás
+    difusion.instalar(app, engine, (Libro, LibroBaja))
+
+    hilos_iniciados = {"pid": None}
+    lock_hilos = threading.Lock()
+
+    def iniciar_hilos():
+        """
+        Precargas, escucha de cambios y chequeo del esquema: hilos de este
+        proceso (una vez por proceso; no sobreviven a un fork).
+        """
+        with lock_hilos:
+            if hilos_iniciados["pid"] == os.getpid():
+                return
+            hilos_iniciados["pid"] = os.getpid()
+        esquema.verificar_en_segundo_plano(engine)
+        app.cache_isbn.precargar_en_segundo_plano(SessionFactory.session_factory)
+        app.editoriales.precargar_en_segundo_plano(SessionFactory.session_factory)
+        if app.difusion is not None:
+            app.difusion.iniciar()
+        if app.config["FALTANTES_ARCHIVO_DIAS"] > 0:
+            archivo_faltantes.archivar_en_segundo_plano(
+                SessionFactory.session_factory,
+                dias=app.config["FALTANTES_ARCHIVO_DIAS"],
+                lote=app.config["FALTANTES_ARCHIVO_LOTE"],
+                intervalo=app.config["FALTANTES_ARCHIVO_INTERVALO"],
+            )
+
+    app.iniciar_hilos = iniciar_hilos
+
+    @app.before_request
+    def _iniciar_hilos():
+        # gunicorn y asgi.py los arrancan antes; con `python app.py`, el primer request
+        if hilos_iniciados["pid"] != os.getpid():
+            iniciar_hilos()
+
+    # Misma sesión (y pool) que el resto de la app; se arma con el primer request a /admin
+    panel_admin.instalar(app, SessionFactory)
 
     return app
 
@@ -118,99 +222,133 @@ def login():
     except Exception as e:
         return jsonify({'error': 'Error en login', 'detalle': str(e)}), 500
 
+# Columnas que devuelve el listado de libros (sin hidratar objetos del ORM)
+COLUMNAS_LIBRO = (
+    Libro.id, Libro.titulo, Libro.autor, Libro.editorial,
+    Libro.isbn, Libro.stock, Libro.precio, Libro.ubicacion,
+)
+LIMITE_MAXIMO_PAGINA = 1000
+
 # ============================================================
 # Obtener todos los libros o filtrar por palabra clave
 @app.route('/libros', methods=['GET'])
+@con_etag('libros')
 def obtener_libros():
     session = app.session
     palabra_clave = request.args.get('q')
     isbn = request.args.get('isbn')  # Obtener el ISBN si está presente
 
     try:
-        if isbn:  # Si el ISBN está presente, filtra por él
-            libro = session.query(Libro).filter(Libro.isbn == isbn).first()
+        if isbn:  # Si el ISBN está presente, filtra por él (desde el cache de ISBN)
+            libro = app.cache_isbn.buscar(session, isbn.strip())
             if libro:
-                return jsonify([{
-                    'id': libro.id,
-                    'titulo': libro.titulo,
-                    'autor': libro.autor,
-                    'editorial': libro.editorial,
-                    'isbn': libro.isbn,
-                    'stock': libro.stock,
-                    'precio': libro.precio,
-                    'ubicacion': libro.ubicacion
-                }])
+                return jsonify([libro])
             else:
                 return jsonify([])  # Cambio clave: Devuelve array vacío en lugar de error 404
         
         # Si no se pasa ISBN, busca por palabra clave
         if palabra_clave:
-            palabra_clave = unidecode(palabra_clave.lower())
-            libros = session.query(Libro).filter(
-                or_( # or_ es como WHERE titulo LIKE '%harry%' OR autor LIKE '%harry%' "significa Dame los libros que cumplan con condición_1 o condición_2".
-                    func.lower(Libro.titulo).like(f"%{palabra_clave}%"),
-                    #Esto baja todo a minúsculas. Es para que la búsqueda no sea sensible a mayúsculas/minúsculas. esto genera en SQL algo como LOWER(titulo)
-                    func.lower(Libro.autor).like(f"%{palabra_clave}%")
-                    #El % significa "cualquier cosa antes o después".
-                )
-            ).all()
+            # El índice en memoria normaliza título/autor con unidecode y devuelve
+            # los ids ya ordenados por relevancia; después traemos esas filas por PK.
+            limite = request.args.get('limit', type=int)
+            indice = app.indice_libros
+            indice.asegurar_cargado(session)
+            ids = indice.buscar(palabra_clave, limite=limite)
+            if not ids:
+                return jsonify([])
+            filas = filas_a_dicts(session.execute(select(*COLUMNAS_LIBRO).where(Libro.id.in_(ids))))
+            libros_por_id = {fila['id']: fila for fila in filas}
+            return jsonify([libros_por_id[i] for i in ids if i in libros_por_id])
         else:
-            libros = session.query(Libro).all()
-
-        return jsonify([{
-            'id': libro.id,
-            'titulo': libro.titulo,
-            'autor': libro.autor,
-            'editorial': libro.editorial,
-            'isbn': libro.isbn,
-            'stock': libro.stock,
-            'precio': libro.precio,
-            'ubicacion': libro.ubicacion
-        } for libro in libros])
+            # Listado completo: paginado por id (keyset) o en streaming
+            limite = request.args.get('limit', type=int)
+            cursor = request.args.get('cursor', type=int)  # último id recibido
+
+            consulta = select(*COLUMNAS_LIBRO).order_by(Libro.id)
+            if cursor:
+                consulta = consulta.where(Libro.id > cursor)
+
+            if limite:
+                limite = max(1, min(limite, LIMITE_MAXIMO_PAGINA))
+                pagina = filas_a_dicts(session.execute(consulta.limit(limite)))
+                return jsonify({
+                    'libros': pagina,
+                    # Si vino la página llena puede haber más: el cliente pide con cursor=siguiente
+                    'siguiente': pagina[-1]['id'] if len(pagina) == limite else None
+                })
+
+            # Sin limit: mismo array JSON de siempre pero escrito a medida que
+            # llegan las filas del cursor del servidor (yield_per), memoria constante.
+            filas = session.execute(consulta.execution_options(yield_per=TAMANIO_LOTE))
+            return respuesta_stream(filas, formato=request.args.get('formato', 'json'))
 
     except Exception as e:
         return jsonify({'error': 'Ocurrió un error al obtener los libros', 'mensaje': str(e)}), 500
 
+# Lookup rápido para el lector de códigos de barra
+@app.route('/libros/isbn/<isbn>', methods=['GET'])
+@con_etag('libros')
+def obtener_libro_por_isbn(isbn):
+    try:
+        libro = app.cache_isbn.buscar(app.session, isbn.strip())
+        if libro is None:
+            return jsonify({'error': 'Libro no encontrado'}), 404
+        return jsonify(libro)
+    except Exception as e:
+        return jsonify({'error': 'Error al buscar el ISBN', 'mensaje': str(e)}), 500
+
+# Varios ISBN en un solo request: /libros/isbn?isbns=978...,978...
+@app.route('/libros/isbn', methods=['GET'])
+@con_etag('libros')
+def obtener_libros_por_isbn():
+    isbns = [i.strip() for i in request.args.get('isbns', '').split(',') if i.strip()]
+    if not isbns:
+        return jsonify({'error': 'Parámetro isbns requerido'}), 400
+    if len(isbns) > LIMITE_MAXIMO_PAGINA:
+        return jsonify({'error': f'Máximo {LIMITE_MAXIMO_PAGINA} ISBN por consulta'}), 400
+
+    try:
+        encontrados = app.cache_isbn.buscar_varios(app.session, isbns)
+        return jsonify({
+            'libros': [encontrados[i] for i in isbns if i in encontrados],
+            'no_encontrados': [i for i in isbns if i not in encontrados]
+        })
+    except Exception as e:
+        return jsonify({'error': 'Error al buscar los ISBN', 'mensaje': str(e)}), 500
+
 @app.route('/libros', methods=['POST'])
 def crear_libro():
     session = app.session
     data = request.json
-    print("📦 Datos recibidos:", data)
-    print(f"🔍 Tipo de cada campo:")
-    for key, value in data.items():
-        print(f"  {key}: {value} (tipo: {type(value)})")
+    # Volcado completo solo con LOG_LEVEL=DEBUG (y muestreado con LOG_MUESTREO_DEBUG)
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug("📦 Datos recibidos", extra={"datos": {
+            key: {"valor": value, "tipo": type(value).__name__} for key, value in data.items()
+        }})
 
     # Validación de campos obligatorios
     if not data.get('titulo') or not data.get('autor'):
-        print("❌ Error: Faltan campos obligatorios (titulo o autor)")
         return jsonify({'error': 'Faltan campos obligatorios (titulo o autor)'}), 400
     
     # Validar ISBN - debe existir y no estar vacío
     isbn = data.get('isbn', '').strip()
     if not isbn:
-        print("❌ Error: ISBN vacío o faltante")
         return jsonify({'error': 'El ISBN es obligatorio'}), 400
-    print(f"✅ ISBN validado: '{isbn}'")
 
     # Validar ubicación - debe existir y no estar vacía
     ubicacion = data.get('ubicacion', '').strip()
     if not ubicacion:
-        print("❌ Error: Ubicación vacía o faltante")
         return jsonify({'error': 'La ubicación es obligatoria'}), 400
-    print(f"✅ Ubicación validada: '{ubicacion}'")
 
     # Procesar el precio: si viene vacío o null, lo dejamos en None
     precio_raw = data.get('precio')
     precio = float(precio_raw) if precio_raw not in (None, '', 'null') else None
-    print(f"✅ Precio procesado: {precio}")
 
     try:
-        print("🔍 Buscando libro existente por ISBN...")
         # Buscar si ya existe un libro con el mismo ISBN
         libro_existente = session.query(Libro).filter(Libro.isbn == isbn).first()
 
         if libro_existente:
-            print(f"📚 Libro existente encontrado, actualizando...")
             # Si ya existe, actualizamos el libro con los nuevos datos
             libro_existente.titulo = data['titulo']
             libro_existente.autor = data['autor']
@@ -220,10 +358,8 @@ def crear_libro():
             libro_existente.ubicacion = ubicacion
 
             session.commit()
-            print("✅ Libro actualizado exitosamente")
             return jsonify({'mensaje': 'Libro actualizado con éxito'}), 200
         else:
-            print(f"📚 Creando nuevo libro...")
             # Si no existe, creamos un nuevo libro
             nuevo_libro = Libro(
                 titulo=data['titulo'],
@@ -236,15 +372,11 @@ def crear_libro():
             )
             session.add(nuevo_libro)
             session.commit()
-            print("✅ Libro creado exitosamente")
             return jsonify({'mensaje': 'Libro creado con éxito'}), 201
 
     except Exception as e:
         session.rollback()
-        print(f"❌ Error en crear_libro: {type(e).__name__}: {str(e)}")
-        print(f"📦 Datos que causaron el error: {data}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("❌ Error en crear_libro", extra={"datos": data})
         return jsonify({
             'error': 'Error al crear o actualizar el libro', 
             'mensaje': str(e),
@@ -253,6 +385,46 @@ def crear_libro():
         }), 500
 
 
+# Importación masiva (listas de proveedores): CSV con encabezado o NDJSON
+@app.route('/libros/importar', methods=['POST'])
+def importar_libros():
+    session = app.session
+    formato = request.args.get('formato')
+    if not formato:
+        formato = 'csv' if 'csv' in (request.mimetype or '') else 'ndjson'
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Formato inválido (csv o ndjson)'}), 400
+
+    try:
+        # Se lee del stream del request a medida que se procesa, sin cargar el archivo entero
+        filas = importacion.leer_filas(request.stream, formato)
+        reporte = importacion.importar(session, filas)
+        return jsonify(reporte), 200
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': 'Error al importar libros', 'mensaje': str(e)}), 500
+
+@app.cli.command('importar-libros')
+@click.argument('archivo', type=click.File('rb'))
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Por defecto se deduce de la extensión del archivo')
+@click.option('--lote', default=importacion.TAMANIO_LOTE, show_default=True, help='Filas por INSERT')
+def importar_libros_cli(archivo, formato, lote):
+    """Importa libros desde un CSV/NDJSON (usar - para leer de stdin)."""
+    formato = formato or ('csv' if archivo.name.endswith('.csv') else 'ndjson')
+    session = app.session_factory()
+    try:
+        inicio = time.perf_counter()
+        reporte = importacion.importar(session, importacion.leer_filas(archivo, formato), tamanio_lote=lote)
+        duracion = time.perf_counter() - inicio
+    finally:
+        app.session_factory.remove()
+
+    for error in reporte['errores']:
+        click.echo(f"  fila {error['fila']}: {error['error']}", err=True)
+    click.echo(f"✅ {reporte['importadas']} libros importados, {reporte['con_error']} con error "
+               f"({reporte['procesadas']} filas en {duracion:.1f}s)")
+
 # Actualizar libro
 @app.route('/libros/<int:libro_id>', methods=['PUT'])
 def actualizar_libro(libro_id):
@@ -303,70 +475,143 @@ def eliminar_libro(libro_id):
 @app.route('/bajar-libro/<int:libro_id>', methods=['PUT'])
 def bajar_libro(libro_id):
     session = app.session
-    libro = session.query(Libro).get(libro_id)
-
-    if libro is None:
-        return jsonify({'error': 'Libro no encontrado'}), 404
-
     data = request.json
     cantidad = data.get('cantidad')
 
-    if not cantidad or cantidad <= 0:
+    if not isinstance(cantidad, int) or cantidad <= 0:
         return jsonify({'error': 'Cantidad inválida'}), 400
 
     try:
-        # Log para ver el stock antes de la actualización
-        app.logger.info(f"Antes de actualizar: {libro.titulo} - Stock actual: {libro.stock}")
+        # Chequeo y descuento en un solo UPDATE (ver controllers/stock.py)
+        libro = stock.descontar(session, libro_id, cantidad)
+        session.commit()
 
-        if libro.stock >= cantidad:
-            libro.stock -= cantidad
-            session.commit()
+        # Log para confirmar que se hizo la actualización (leer el libro después del commit es otro SELECT)
+        if app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug("Después de actualizar: %s - Stock restante: %s", libro.titulo, libro.stock)
 
-            # Log para confirmar que se hizo la actualización
-            app.logger.info(f"Después de actualizar: {libro.titulo} - Stock restante: {libro.stock}")
-            
-            return jsonify({'mensaje': 'Stock actualizado exitosamente'})
-        else:
-            return jsonify({'error': 'No hay suficiente stock disponible'}), 400
+        return jsonify({'mensaje': 'Stock actualizado exitosamente'})
+    except stock.StockInsuficiente as e:
+        session.rollback()
+        if e.faltantes[0]['disponible'] is None:
+            return jsonify({'error': 'Libro no encontrado'}), 404
+        return jsonify({'error': 'No hay suficiente stock disponible'}), 400
     except Exception as e:
         session.rollback()
-        app.logger.error(f"Error al actualizar el stock: {str(e)}")
+        app.logger.exception("Error al actualizar el stock")
         return jsonify({'error': 'Error al bajar el stock', 'mensaje': str(e)}), 500
 
 # Nuevo endpoint para bajar stock (separado del marcar baja)
 @app.route('/libros/<int:libro_id>/bajar-stock', methods=['PUT'])
 def bajar_stock_libro(libro_id):
     session = app.session
-    libro = session.query(Libro).get(libro_id)
-    
-    if libro is None:
-        return jsonify({'error': 'Libro no encontrado'}), 404
-    
+
     try:
         payload = request.get_json()
         cantidad = int(payload.get('cantidad', 0))
         
         if cantidad <= 0:
             return jsonify({'error': 'La cantidad debe ser mayor que 0'}), 400
-            
-        if cantidad > libro.stock:
-            return jsonify({'error': f'No hay suficiente stock. Stock actual: {libro.stock}'}), 400
-        
-        # Solo bajar el stock, NO marcar como baja todavía
-        libro.stock -= cantidad
+
+        # Solo bajar el stock, NO marcar como baja todavía.
+        # El UPDATE ... RETURNING ya trae el stock nuevo: no hace falta refresh
+        libro = stock.descontar(session, libro_id, cantidad)
         session.commit()
-        session.refresh(libro)
         
         return jsonify({
             'mensaje': 'Stock actualizado',
             'stock': libro.stock,
             'ubicacion': libro.ubicacion
         })
-        
+
+    except stock.StockInsuficiente as e:
+        session.rollback()
+        disponible = e.faltantes[0]['disponible']
+        if disponible is None:
+            return jsonify({'error': 'Libro no encontrado'}), 404
+        return jsonify({'error': f'No hay suficiente stock. Stock actual: {disponible}'}), 400
     except Exception as e:
         session.rollback()
         return jsonify({'error': 'Error al actualizar stock', 'mensaje': str(e)}), 500
 
+# Venta de varios libros en una sola transacción (todo o nada)
+# Body: {"items": [{"libro_id": 1, "cantidad": 2}, ...]}
+@app.route('/ventas', methods=['POST'])
+def registrar_venta():
+    session = app.session
+    payload = request.get_json(silent=True) or {}
+
+    try:
+        cantidades = stock.agrupar_items(payload.get('items'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        libros = stock.descontar_varios(session, cantidades)
+        session.commit()
+        return jsonify({
+            'mensaje': 'Venta registrada',
+            'items': [
+                {'libro_id': libro_id, 'cantidad': cantidad, 'stock': libros[libro_id].stock}
+                for libro_id, cantidad in cantidades.items()
+            ]
+        })
+    except stock.StockInsuficiente as e:
+        session.rollback()
+        return jsonify({'error': 'No hay suficiente stock disponible', 'faltantes': e.faltantes}), 400
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': 'Error al registrar la venta', 'mensaje': str(e)}), 500
+
+# Venta de un libro en una sola ida a la base: baja el stock, registra el
+# movimiento en libros_bajas y marca fecha_baja si el stock llega a 0.
+# Reemplaza la secuencia bajar-stock + marcar-baja.
+@app.route('/libros/<int:libro_id>/vender', methods=['PUT'])
+def vender_libro(libro_id):
+    session = app.session
+    payload = request.get_json(silent=True) or {}
+    try:
+        cantidad = int(payload.get('cantidad', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Cantidad inválida'}), 400
+    if cantidad <= 0:
+        return jsonify({'error': 'La cantidad debe ser mayor que 0'}), 400
+
+    tz_argentina = timezone(timedelta(hours=-3))  # UTC-3 para Argentina
+    ahora = datetime.now(tz_argentina).replace(tzinfo=None)
+
+    try:
+        venta = stock.vender(session, libro_id, cantidad, ahora)
+        session.commit()
+        return jsonify({
+            'mensaje': 'Baja registrada',
+            'fecha_baja': ahora.isoformat(),
+            'cantidad_bajada': cantidad,
+            'stock_resultante': venta['stock'],
+            'ubicacion': venta['ubicacion'],
+            'libro': {
+                'id': venta['id'],
+                'titulo': venta['titulo'],
+                'stock': venta['stock'],
+                'fecha_baja': venta['fecha_baja'].isoformat() if venta['fecha_baja'] else None
+            },
+            'movimiento': {
+                'id': venta['movimiento_id'],
+                'fecha_baja': ahora.isoformat(),
+                'cantidad_bajada': cantidad,
+                'stock_resultante': venta['stock']
+            }
+        })
+    except stock.StockInsuficiente as e:
+        session.rollback()
+        disponible = e.faltantes[0]['disponible']
+        if disponible is None:
+            return jsonify({'error': 'Libro no encontrado'}), 404
+        return jsonify({'error': f'No hay suficiente stock. Stock actual: {disponible}'}), 400
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': 'Error al registrar la venta', 'mensaje': str(e)}), 500
+
 @app.route('/libros/<int:libro_id>/marcar-baja', methods=['PUT'])
 def marcar_baja(libro_id):
     session = app.session
@@ -402,6 +647,12 @@ def marcar_baja(libro_id):
             ubicacion=libro.ubicacion
         )
         session.add(mov)
+        # Resumen diario (bajas_diarias) en la misma transacción que el movimiento
+        resumen_bajas.sumar(session, [{
+            'fecha_baja': mov.fecha_baja, 'isbn': mov.isbn, 'editorial': mov.editorial,
+            'ubicacion': mov.ubicacion, 'titulo': mov.titulo,
+            'cantidad_bajada': mov.cantidad_bajada, 'precio': mov.precio,
+        }])
         
         # Solo marcar fecha_baja en el libro si stock llegó a 0
         if libro.stock == 0:
@@ -434,111 +685,226 @@ def marcar_baja(libro_id):
         session.rollback()
         return jsonify({'error': 'Error al marcar baja', 'mensaje': str(e)}), 500
 
+# Columnas del listado de bajas (con los nombres que espera el frontend)
+COLUMNAS_BAJA = (
+    LibroBaja.id,                                       # id del movimiento
+    LibroBaja.titulo, LibroBaja.autor, LibroBaja.editorial,
+    LibroBaja.isbn, LibroBaja.precio, LibroBaja.ubicacion,
+    LibroBaja.fecha_baja,
+    LibroBaja.stock_resultante.label('cantidad'),       # tu columna "Cantidad Actual"
+    LibroBaja.stock_resultante.label('stock'),          # por compatibilidad si lo usás
+    LibroBaja.cantidad_bajada,                          # Esta es la cantidad que se bajó
+)
+
+# Movimientos de baja: ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (inclusive)
+#   &limit=N&cursor=<siguiente>  -> página por keyset sobre (fecha_baja, id)
+#   &por=dia|editorial|ubicacion|isbn -> totales agregados en SQL
 @app.route('/libros/dados-baja', methods=['GET'])
+@con_etag('libros_bajas')
 def listar_dados_baja():
     session = app.session
+    por = request.args.get('por')
+    limite = request.args.get('limit', type=int)
+
     try:
-        bajas = (
-            session.query(LibroBaja)
-            .order_by(desc(LibroBaja.fecha_baja))
-            .all()
+        desde = exportacion.parsear_fecha(request.args.get('desde'))
+        hasta = exportacion.parsear_fecha(request.args.get('hasta'), fin_de_rango=True)
+
+        if por:
+            consulta, convertir = reportes.consulta_agrupada(por, desde=desde, hasta=hasta)
+            return jsonify(filas_a_dicts(session.execute(consulta), convertir=convertir))
+
+        consulta = reportes.consulta_movimientos(
+            COLUMNAS_BAJA, desde=desde, hasta=hasta, cursor=request.args.get('cursor')
         )
-        print(f"📚 Encontrados {len(bajas)} movimientos de baja")
-        
-        data = [
-            {
-                'id': b.id,                              # id del movimiento
-                'titulo': b.titulo,
-                'autor': b.autor,
-                'editorial': b.editorial,
-                'isbn': b.isbn,
-                'precio': b.precio,
-                'ubicacion': b.ubicacion,
-                'fecha_baja': b.fecha_baja.isoformat(),
-                'cantidad': b.stock_resultante,          # tu columna "Cantidad Actual"
-                'stock': b.stock_resultante,              # por compatibilidad si lo usás
-                'cantidad_bajada': b.cantidad_bajada      # Esta es la cantidad que se bajó
-            }
-            for b in bajas
-        ]
+        if limite:
+            limite = max(1, min(limite, LIMITE_MAXIMO_PAGINA))
+            pagina = filas_a_dicts(session.execute(consulta.limit(limite)), convertir={'fecha_baja': isoformat})
+            return jsonify({
+                'bajas': pagina,
+                'siguiente': reportes.armar_cursor(pagina[-1]) if len(pagina) == limite else None
+            })
+
+        data = filas_a_dicts(session.execute(consulta), convertir={'fecha_baja': isoformat})
         return jsonify(data)
-        
+
+    except (exportacion.ErrorExportacion, reportes.ErrorReporte) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Error al obtener libros dados de baja: {e}")
+        app.logger.exception("❌ Error al obtener libros dados de baja")
         return jsonify({'error': 'Error al obtener libros dados de baja', 'mensaje': str(e)}), 500
 
-@app.route('/generar-isbn', methods=['GET'])
-def generar_isbn():
+@app.cli.command('reconstruir-bajas-diarias')
+@click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='YYYY-MM-DD (inclusive)')
+@click.option('--hasta', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='YYYY-MM-DD (inclusive)')
+def reconstruir_bajas_diarias_cli(desde, hasta):
+    """Vuelve a calcular el resumen bajas_diarias desde libros_bajas (todo el historial o un rango)."""
+    session = app.session_factory()
     try:
-        session = app.session
-
-        # Buscar el último ISBN numérico de 5 dígitos
-        ultimo_libro = session.query(Libro).filter(
-            Libro.isbn.like('_____')  # Busca exactamente 5 caracteres (podrían ser dígitos)
-        ).order_by(Libro.isbn.desc()).first()
-
-        if ultimo_libro and ultimo_libro.isbn.isdigit():  # Verifica que sean solo dígitos
-            nuevo_numero = int(ultimo_libro.isbn) + 1
-        else:
-            # Si no hay ISBNs numéricos, empezar desde 1
-            nuevo_numero = 1
-
-        nuevo_isbn = f"{nuevo_numero:05d}"  # Formatea a 5 dígitos con ceros a la izquierda
+        filas = resumen_bajas.reconstruir(
+            session, desde=desde.date() if desde else None, hasta=hasta.date() if hasta else None
+        )
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        app.session_factory.remove()
+    click.echo(f"✅ Resumen diario reconstruido: {filas} filas")
+
+@app.cli.command('preparar-base')
+def preparar_base_cli():
+    """Deja la base en la última migración (paso de deploy, antes de levantar el servidor)."""
+    from flask_migrate import stamp, upgrade
+
+    estado = esquema.preparar_base(app.engine)
+    if estado == "creada":
+        click.echo("✅ Schema, tablas e índices de búsqueda creados; base marcada en la última migración")
+        return
+    if estado == "sin_version":
+        # Base armada por el create_all que hacía la app al arrancar: una sola vez
+        stamp(revision=esquema.REVISION_CREATE_ALL)
+        click.echo(f"ℹ️ Base sin alembic_version: marcada en {esquema.REVISION_CREATE_ALL}")
+    upgrade()
+    esquema.exigir_al_dia(app.engine)
+    click.echo("✅ Base en la última migración")
+
+# Exportación masiva: /exportar/libros o /exportar/libros_bajas
+# ?formato=csv|ndjson|columnar&columnas=a,b&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&cursor=<id>&gzip=1
+@app.route('/exportar/<tabla>', methods=['GET'])
+def exportar_tabla(tabla):
+    session = app.session
+    formato = request.args.get('formato', 'csv')
+    comprimir = request.args.get('gzip') in ('1', 'true')
+    columnas = [c.strip() for c in request.args.get('columnas', '').split(',') if c.strip()]
 
-        # Verificar que no exista duplicado
-        while session.query(Libro).filter(Libro.isbn == nuevo_isbn).first():
-            nuevo_numero += 1
-            nuevo_isbn = f"{nuevo_numero:05d}"
+    try:
+        consulta, nombres = exportacion.armar_consulta(
+            tabla,
+            columnas=columnas,
+            desde=exportacion.parsear_fecha(request.args.get('desde')),
+            hasta=exportacion.parsear_fecha(request.args.get('hasta'), fin_de_rango=True),
+            cursor=request.args.get('cursor', type=int),
+        )
+        cuerpo = exportacion.generar(session.execute(consulta), nombres, formato=formato, comprimir=comprimir)
+    except exportacion.ErrorExportacion as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al exportar', 'mensaje': str(e)}), 500
+
+    mimetype = 'application/gzip' if comprimir else exportacion.FORMATOS[formato][0]
+    nombre = exportacion.nombre_archivo(tabla, formato, comprimir)
+    return Response(
+        stream_with_context(cuerpo),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={nombre}'}
+    )
+
+@app.cli.command('exportar')
+@click.argument('tabla', type=click.Choice(list(exportacion.TABLAS)))
+@click.option('--formato', type=click.Choice(list(exportacion.FORMATOS)), default='csv', show_default=True)
+@click.option('--columnas', default='', help='Lista separada por comas (por defecto todas)')
+@click.option('--desde', default=None, help='YYYY-MM-DD (fecha_alta / fecha_baja)')
+@click.option('--hasta', default=None, help='YYYY-MM-DD inclusive')
+@click.option('--cursor', type=int, default=None, help='Retomar después de este id')
+@click.option('--gzip', 'comprimir', is_flag=True, help='Comprimir la salida con gzip')
+@click.option('--salida', type=click.Path(dir_okay=False), default=None,
+              help='Archivo de salida (por defecto el nombre de la tabla)')
+def exportar_cli(tabla, formato, columnas, desde, hasta, cursor, comprimir, salida):
+    """Exporta libros o libros_bajas en streaming a un archivo."""
+    salida = salida or exportacion.nombre_archivo(tabla, formato, comprimir)
+    session = app.session_factory()
+    try:
+        consulta, nombres = exportacion.armar_consulta(
+            tabla,
+            columnas=[c.strip() for c in columnas.split(',') if c.strip()],
+            desde=exportacion.parsear_fecha(desde),
+            hasta=exportacion.parsear_fecha(hasta, fin_de_rango=True),
+            cursor=cursor,
+        )
+        bloques = exportacion.generar(session.execute(consulta), nombres, formato=formato, comprimir=comprimir)
+        modo = 'wb' if comprimir else 'w'
+        with open(salida, modo, **({} if comprimir else {'encoding': 'utf-8', 'newline': ''})) as archivo:
+            for bloque in bloques:
+                archivo.write(bloque)
+    except exportacion.ErrorExportacion as e:
+        raise click.UsageError(str(e))
+    finally:
+        app.session_factory.remove()
+    click.echo(f"✅ Exportación de {tabla} guardada en {salida}")
 
+@app.route('/generar-isbn', methods=['GET'])
+def generar_isbn():
+    try:
+        # Sale de un bloque ya reservado en memoria: sin consultas en el caso común
+        # y sin repetidos entre terminales (ver controllers/isbn_interno.py)
+        nuevo_isbn = app.asignador_isbn.siguiente()
         return jsonify({'isbn': nuevo_isbn}), 200
 
+    except CodigosAgotados as e:
+        return jsonify({'error': 'No quedan códigos internos', 'mensaje': str(e)}), 409
     except Exception as e:
-        print(f"Error en /generar-isbn: {str(e)}")
+        app.logger.exception("Error en /generar-isbn")
         return jsonify({'error': 'Error al generar ISBN', 'mensaje': str(e)}), 500
     
 @app.route('/api/libros/buscar')
+@con_etag('libros')
 def buscar_por_titulo_o_autor():
+    session = app.session
     # Tomamos parámetros de la URL (si no vienen, quedan en string vacío)
     titulo = request.args.get('titulo', '')
     autor = request.args.get('autor', '')
+    limite = max(1, min(request.args.get('limit', 50, type=int), 500))
 
-    # Normalizamos lo que viene del cliente: minúsculas + sin tildes
-    titulo_norm = unidecode(titulo.lower())
-    autor_norm  = unidecode(autor.lower())
-
-    # Armamos condiciones: aplicamos unaccent y lower a las columnas
-    condiciones = []
-    if titulo_norm:
-        condiciones.append(func.lower(func.unaccent(Libro.titulo)).like(f"%{titulo_norm}%"))
-    if autor_norm:
-        condiciones.append(func.lower(func.unaccent(Libro.autor)).like(f"%{autor_norm}%"))
-
-    # Ejecutamos consulta
-    q = Libro.query
-    if condiciones:
-        q = q.filter(or_(*condiciones))
+    try:
+        # En Postgres usa los índices pg_trgm sobre lower(f_unaccent(col)) y ordena
+        # por similitud; en SQLite normaliza en Python (ver controllers/busqueda.py)
+        resultados = buscar_titulo_autor(session, titulo, autor, limite=limite)
+        return jsonify({"libros": [
+            {**libro.to_dict(), 'score': round(score, 4)} for libro, score in resultados
+        ]})
+    except Exception as e:
+        return jsonify({'error': 'Error al buscar libros', 'mensaje': str(e)}), 500
 
-    libros = q.all()
+# Sugerencias mientras se escribe: /api/libros/sugerir?prefix=cien a&limit=10&orden=ventas|stock
+@app.route('/api/libros/sugerir', methods=['GET'])
+@con_etag('libros', 'libros_bajas')
+def sugerir_libros():
+    session = app.session
+    prefijo = request.args.get('prefix', '')
+    limite = max(1, min(request.args.get('limit', 10, type=int), 50))
+    orden = request.args.get('orden', 'ventas')
+    if orden not in ORDENES:
+        return jsonify({'error': f"orden inválido (opciones: {', '.join(ORDENES)})"}), 400
 
-    return jsonify({"libros": [libro.to_dict() for libro in libros]})
+    try:
+        app.sugerencias.asegurar_cargado(session)
+        ids = app.sugerencias.sugerir(prefijo, limite=limite, orden=orden)
+        if not ids:
+            return jsonify({'libros': []})
+        filas = filas_a_dicts(session.execute(
+            select(Libro.id, Libro.titulo, Libro.autor, Libro.stock).where(Libro.id.in_(ids))
+        ))
+        libros_por_id = {fila['id']: fila for fila in filas}
+        return jsonify({'libros': [libros_por_id[i] for i in ids if i in libros_por_id]})
+    except Exception as e:
+        return jsonify({'error': 'Error al sugerir libros', 'mensaje': str(e)}), 500
 
 @app.route('/api/editoriales', methods=['GET'])
+@con_etag('libros')
 def obtener_editoriales():
     """
-    Obtiene todas las editoriales únicas de la base de datos usando SQLAlchemy
+    Obtiene todas las editoriales únicas (o las que empiezan con ?prefix=)
+    desde el diccionario en memoria (ver controllers/editoriales.py)
     """
-    session = app.session
+    prefijo = request.args.get('prefix')
     try:
-        # Consulta para obtener editoriales distintas, no nulas ni vacías
-        editoriales = (
-            session.query(Libro.editorial)
-            .filter(Libro.editorial.isnot(None), Libro.editorial != "")
-            .distinct()
-            .order_by(Libro.editorial.asc())
-            .all()
-        )
-
-        lista_editoriales = [e[0] for e in editoriales]
+        app.editoriales.asegurar_cargado(app.session)
+        if prefijo is not None:
+            limite = max(1, min(request.args.get('limit', 10, type=int), 100))
+            lista_editoriales = app.editoriales.buscar(prefijo, limite=limite)
+        else:
+            lista_editoriales = app.editoriales.todas()
 
         return jsonify({
             "success": True,
@@ -552,14 +918,35 @@ def obtener_editoriales():
 
 from flask import jsonify
 
+def consulta_faltantes(columnas, eliminados, cursor=None):
+    """Del más nuevo al más viejo; cada lista usa su índice parcial (ix_faltantes_activos / _eliminados)."""
+    consulta = (
+        select(*columnas)
+        .where(Faltante.eliminado == bool(eliminados))   # queda como literal: true / false
+        .order_by(Faltante.id.desc())
+    )
+    if cursor:
+        consulta = consulta.where(Faltante.id < cursor)   # último id recibido
+    return consulta
+
+def _listar_faltantes(columnas, eliminados, convertir=None):
+    # Sin limit: el array completo de siempre. Con ?limit=&cursor=, una página (keyset por id)
+    limite = request.args.get('limit', type=int)
+    consulta = consulta_faltantes(columnas, eliminados, cursor=request.args.get('cursor', type=int))
+    if not limite:
+        return jsonify(filas_a_dicts(app.session.execute(consulta), convertir=convertir))
+    limite = max(1, min(limite, LIMITE_MAXIMO_PAGINA))
+    pagina = filas_a_dicts(app.session.execute(consulta.limit(limite)), convertir=convertir)
+    return jsonify({
+        'faltantes': pagina,
+        'siguiente': pagina[-1]['id'] if len(pagina) == limite else None
+    })
+
 @app.route('/api/faltantes', methods=['GET'])
+@con_etag('faltantes')
 def get_faltantes():
-    session = app.session
     try:
-     
-        faltantes = session.query(Faltante).filter(Faltante.eliminado == False).order_by(Faltante.id.desc()).all()
-
-        return jsonify([{"id": f.id, "descripcion": f.descripcion} for f in faltantes])
+        return _listar_faltantes((Faltante.id, Faltante.descripcion), eliminados=False)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -583,7 +970,16 @@ def crear_faltante():
 def limpiar_faltantes():
     session = app.session
     try:
-        session.query(Faltante).filter(Faltante.eliminado == False).update({"eliminado": True})
+        ids = session.execute(
+            update(Faltante)
+            .where(Faltante.eliminado == False)
+            .values(eliminado=True, fecha_eliminado=func.now())
+            .returning(Faltante.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        # UPDATE masivo: no pasa por el flush, avisamos a mano (versión de la tabla)
+        for faltante_id in ids:
+            eventos.registrar_cambio(session, Faltante, eventos.MODIFICACION, {"id": faltante_id, "eliminado": True})
         session.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -618,6 +1014,7 @@ def modificar_faltante(id):
                 return jsonify({"error": "Faltante no encontrado"}), 404
 
             faltante.eliminado = True
+            faltante.fecha_eliminado = func.now()
             session.commit()
 
             return jsonify({"success": True})
@@ -633,6 +1030,7 @@ def recuperar_faltante(id):
         if not faltante:
             return jsonify({"error": "Faltante no encontrado o no está eliminado"}), 404
         faltante.eliminado = False
+        faltante.fecha_eliminado = None
         session.commit()
         return jsonify({"success": True, "faltante": {"id": faltante.id, "descripcion": faltante.descripcion}})
     except Exception as e:
@@ -640,21 +1038,51 @@ def recuperar_faltante(id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/faltantes/eliminados', methods=['GET'])
+@con_etag('faltantes')
 def get_faltantes_eliminados():
-    session = app.session
     try:
-        eliminados = session.query(Faltante).filter(Faltante.eliminado == True).order_by(Faltante.id.desc()).all()
-        return jsonify([
-            {
-                "id": f.id,
-                "descripcion": f.descripcion,
-                "fecha_creacion": f.fecha_creacion.isoformat() if f.fecha_creacion else None
-            }
-            for f in eliminados
-        ])
+        return _listar_faltantes(
+            (Faltante.id, Faltante.descripcion, Faltante.fecha_creacion),
+            eliminados=True, convertir={'fecha_creacion': isoformat},
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.cli.command('archivar-faltantes')
+@click.option('--dias', type=int, default=None, help='Eliminados hace más de estos días (por defecto FALTANTES_ARCHIVO_DIAS)')
+@click.option('--lote', type=click.IntRange(min=1), default=None, help='Filas por transacción (por defecto FALTANTES_ARCHIVO_LOTE)')
+def archivar_faltantes_cli(dias, lote):
+    """Pasa a faltantes_archivo los faltantes eliminados hace más de N días."""
+    dias = app.config["FALTANTES_ARCHIVO_DIAS"] if dias is None else dias
+    lote = app.config["FALTANTES_ARCHIVO_LOTE"] if lote is None else lote
+    try:
+        movidos = archivo_faltantes.archivar(app.session_factory.session_factory, dias, lote=lote)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo(f"✅ Faltantes archivados: {movidos} (eliminados hace más de {dias} días)")
+
+def _resumen_pools():
+    pools = {}
+    for nombre, engine in (
+        ("primaria", app.engine),
+        ("replica", app.engine_replica),
+        ("async", getattr(app, "engine_async", None)),   # API asíncrona (asgi.py), si corre en este proceso
+    ):
+        medidas = metricas_pool(engine) if engine is not None else None
+        if medidas is not None:
+            pools[nombre] = medidas.resumen(engine.pool)
+    return pools
+
+@app.route('/metrics/pool', methods=['GET'])
+def metricas_del_pool():
+    """Estado del pool de conexiones: en uso, overflow, esperas por checkout y timeouts."""
+    return jsonify(_resumen_pools())
+
+@app.route('/metrics', methods=['GET'])
+def metricas_prometheus():
+    """Latencia, SQL por request, posibles N+1 y pool, en formato de Prometheus (de este proceso)."""
+    return metricas.respuesta_prometheus(app.metricas.texto(_resumen_pools()))
+
 if __name__ == "__main__":
     port = int(os.getenv('PORT', 5000))  # Render usa la variable PORT
     print(f"🚀 Starting app on port {port}")
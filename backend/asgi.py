@@ -0,0 +1,273 @@
+"""
+API de lectura asíncrona (ASGI) para los endpoints que más se piden:
+
+    cd backend && uvicorn asgi:app --host 0.0.0.0 --port 5000 [--workers N]
+
+- GET /libros, /libros/isbn/<isbn>, /libros/isbn?isbns=, /api/editoriales y
+  /api/faltantes se atienden con AsyncSession (asyncpg): mientras una
+  consulta espera a Postgres el mismo proceso sigue atendiendo cientos de
+  escaneos y búsquedas. Las respuestas (y los ETag) son las mismas que las
+  de la app Flask.
+- Todo lo demás (escrituras, login, admin, exportaciones...) pasa a la app
+  Flask de siempre, montada con a2wsgi y atendida en un pool de hilos.
+- Comparte con Flask los modelos, los índices y caches en memoria
+  (app.indice_libros, app.cache_isbn, app.editoriales) y las versiones de
+  los ETag: lo que escribe Flask en este proceso se ve enseguida acá.
+- Las lecturas asíncronas van a la primaria (no usan la réplica de
+  controllers/ruteo.py).
+- CORS con los mismos orígenes (CORS_ORIGINS) y opciones que Flask-CORS en
+  app.py, para todas las rutas: las asíncronas no pasan por Flask.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+from app import app as flask_app, COLUMNAS_LIBRO, LIMITE_MAXIMO_PAGINA, consulta_faltantes
+from controllers import esquema
+from controllers.serializacion import filas_a_dicts
+from controllers.streaming import TAMANIO_LOTE
+from database import crear_engine_async
+from models.libro import Faltante, Libro
+
+logger = logging.getLogger(__name__)
+
+engine = crear_engine_async(config=flask_app.config)
+Sesion = async_sessionmaker(engine, expire_on_commit=False)
+flask_app.engine_async = engine   # para /metrics/pool
+
+_cargas = {}   # estructura en memoria -> tarea que la está cargando
+
+
+def _json(datos, status=200, headers=None):
+    return Response(flask_app.json.dumps(datos), status_code=status, headers=headers,
+                    media_type="application/json")
+
+
+def _cargar_sync(estructura):
+    session = flask_app.session_factory.session_factory()
+    try:
+        estructura.asegurar_cargado(session)
+    finally:
+        session.close()
+
+
+async def _cargada(estructura):
+    """
+    Espera a que `estructura` (índice, diccionario) esté en memoria. La carga
+    corre en un hilo con una sesión sincrónica: es una sola vez y no bloquea
+    el event loop (ni se cruza con su lock si la está cargando Flask).
+    """
+    if estructura.cargado:
+        return estructura
+    tarea = _cargas.get(estructura)
+    if tarea is None or tarea.done():
+        tarea = _cargas[estructura] = asyncio.ensure_future(asyncio.to_thread(_cargar_sync, estructura))
+    await asyncio.shield(tarea)
+    return estructura
+
+
+def con_etag(*tablas):
+    """Igual que controllers.versiones.con_etag, con las versiones leídas de forma asíncrona."""
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request):
+            try:
+                etag = await flask_app.versiones.etag_async(engine, tablas)
+            except Exception:
+                logger.exception("No se pudo calcular el ETag de %s", ", ".join(tablas))
+                return await vista(request)
+
+            if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+                respuesta = Response(status_code=304)
+            else:
+                respuesta = await vista(request)
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta.headers["ETag"] = f'W/"{etag}"'
+            respuesta.headers["Cache-Control"] = "no-cache"
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def _entero(request, nombre, defecto=None):
+    try:
+        return int(request.query_params[nombre])
+    except (KeyError, ValueError):
+        return defecto
+
+
+async def _stream_libros(consulta, formato):
+    # Misma salida que controllers/streaming.respuesta_stream, leyendo con un cursor del servidor
+    dumps = flask_app.json.dumps
+    async with Sesion() as session:
+        filas = await session.stream(consulta.execution_options(yield_per=TAMANIO_LOTE))
+        if formato != "ndjson":
+            yield "["
+        primero, buffer = True, []
+        async for fila in filas:
+            texto = dumps(dict(fila._mapping))
+            buffer.append(texto + "\n" if formato == "ndjson" else ("" if primero else ",") + texto)
+            primero = False
+            if len(buffer) >= TAMANIO_LOTE:
+                yield "".join(buffer)
+                buffer = []
+        if buffer:
+            yield "".join(buffer)
+        if formato != "ndjson":
+            yield "]"
+
+
+# ============================================================
+# Endpoints
+@con_etag('libros')
+async def obtener_libros(request):
+    palabra_clave = request.query_params.get('q')
+    isbn = request.query_params.get('isbn')
+    try:
+        async with Sesion() as session:
+            if isbn:
+                libro = await session.run_sync(flask_app.cache_isbn.buscar, isbn.strip())
+                return _json([libro] if libro else [])
+
+            if palabra_clave:
+                indice = await _cargada(flask_app.indice_libros)
+                ids = indice.buscar(palabra_clave, limite=_entero(request, 'limit'))
+                if not ids:
+                    return _json([])
+                filas = filas_a_dicts(await session.execute(select(*COLUMNAS_LIBRO).where(Libro.id.in_(ids))))
+                libros_por_id = {fila['id']: fila for fila in filas}
+                return _json([libros_por_id[i] for i in ids if i in libros_por_id])
+
+            limite = _entero(request, 'limit')
+            cursor = _entero(request, 'cursor')
+            consulta = select(*COLUMNAS_LIBRO).order_by(Libro.id)
+            if cursor:
+                consulta = consulta.where(Libro.id > cursor)
+            if limite:
+                limite = max(1, min(limite, LIMITE_MAXIMO_PAGINA))
+                pagina = filas_a_dicts(await session.execute(consulta.limit(limite)))
+                return _json({
+                    'libros': pagina,
+                    'siguiente': pagina[-1]['id'] if len(pagina) == limite else None
+                })
+
+        formato = request.query_params.get('formato', 'json')
+        return StreamingResponse(
+            _stream_libros(consulta, formato),
+            media_type="application/x-ndjson" if formato == "ndjson" else "application/json",
+        )
+    except Exception as e:
+        return _json({'error': 'Ocurrió un error al obtener los libros', 'mensaje': str(e)}, 500)
+
+
+@con_etag('libros')
+async def obtener_libro_por_isbn(request):
+    try:
+        async with Sesion() as session:
+            libro = await session.run_sync(flask_app.cache_isbn.buscar, request.path_params['isbn'].strip())
+        if libro is None:
+            return _json({'error': 'Libro no encontrado'}, 404)
+        return _json(libro)
+    except Exception as e:
+        return _json({'error': 'Error al buscar el ISBN', 'mensaje': str(e)}, 500)
+
+
+@con_etag('libros')
+async def obtener_libros_por_isbn(request):
+    isbns = [i.strip() for i in request.query_params.get('isbns', '').split(',') if i.strip()]
+    if not isbns:
+        return _json({'error': 'Parámetro isbns requerido'}, 400)
+    if len(isbns) > LIMITE_MAXIMO_PAGINA:
+        return _json({'error': f'Máximo {LIMITE_MAXIMO_PAGINA} ISBN por consulta'}, 400)
+    try:
+        async with Sesion() as session:
+            encontrados = await session.run_sync(flask_app.cache_isbn.buscar_varios, isbns)
+        return _json({
+            'libros': [encontrados[i] for i in isbns if i in encontrados],
+            'no_encontrados': [i for i in isbns if i not in encontrados]
+        })
+    except Exception as e:
+        return _json({'error': 'Error al buscar los ISBN', 'mensaje': str(e)}, 500)
+
+
+@con_etag('libros')
+async def obtener_editoriales(request):
+    prefijo = request.query_params.get('prefix')
+    try:
+        editoriales = await _cargada(flask_app.editoriales)
+        if prefijo is not None:
+            limite = max(1, min(_entero(request, 'limit', 10), 100))
+            lista_editoriales = editoriales.buscar(prefijo, limite=limite)
+        else:
+            lista_editoriales = editoriales.todas()
+        return _json({"success": True, "editoriales": lista_editoriales})
+    except Exception as e:
+        return _json({"success": False, "error": str(e)}, 500)
+
+
+@con_etag('faltantes')
+async def get_faltantes(request):
+    try:
+        limite = _entero(request, 'limit')
+        consulta = consulta_faltantes((Faltante.id, Faltante.descripcion), eliminados=False,
+                                      cursor=_entero(request, 'cursor'))
+        async with Sesion() as session:
+            if not limite:
+                return _json(filas_a_dicts(await session.execute(consulta)))
+            limite = max(1, min(limite, LIMITE_MAXIMO_PAGINA))
+            pagina = filas_a_dicts(await session.execute(consulta.limit(limite)))
+        return _json({
+            'faltantes': pagina,
+            'siguiente': pagina[-1]['id'] if len(pagina) == limite else None
+        })
+    except Exception as e:
+        return _json({"error": str(e)}, 500)
+
+
+@asynccontextmanager
+async def ciclo_de_vida(_):
+    if flask_app.config["ESQUEMA_EXIGIR_AL_DIA"]:
+        # Si la base no está en la última migración uvicorn no arranca
+        await asyncio.to_thread(esquema.exigir_al_dia, flask_app.engine)
+    flask_app.iniciar_hilos()
+    # El índice de búsqueda se arma de fondo; las primeras búsquedas lo esperan
+    _cargas[flask_app.indice_libros] = asyncio.ensure_future(asyncio.to_thread(_cargar_sync, flask_app.indice_libros))
+    yield
+    await engine.dispose()
+
+
+def _opciones_cors():
+    # Los valores por defecto de Flask-CORS (ver CORS(app) en app.py)
+    origenes = flask_app.config["CORS_ORIGINS"]
+    return {
+        "allow_origins": [origenes] if isinstance(origenes, str) else list(origenes),
+        "allow_methods": ["GET", "HEAD", "POST", "OPTIONS", "PUT", "PATCH", "DELETE"],
+        "allow_headers": ["*"],
+    }
+
+
+app = Starlette(
+    routes=[
+        Route('/libros', obtener_libros, methods=['GET']),
+        Route('/libros/isbn/{isbn}', obtener_libro_por_isbn, methods=['GET']),
+        Route('/libros/isbn', obtener_libros_por_isbn, methods=['GET']),
+        Route('/api/editoriales', obtener_editoriales, methods=['GET']),
+        Route('/api/faltantes', get_faltantes, methods=['GET']),
+        # El resto de la API (y los otros métodos de estas rutas) sigue en Flask
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, **_opciones_cors())],
+    lifespan=ciclo_de_vida,
+)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tiempo de arranque de un worker: cuánto tarda `import app` (o `import asgi`)
+en un intérprete nuevo y cuánto el primer request después de eso.
+
+Cada corrida es un proceso aparte (nada queda en caché entre corridas salvo
+los .pyc y la caché de disco del sistema), contra la base de DATABASE_URL.
+Muestra mediana y p90 del import, del primer request y del total.
+
+Uso (desde backend/):
+    python benchmarks/bench_arranque.py [--corridas 15] [--modulo app|asgi]
+        [--ruta '/libros?limit=50']
+
+Para ver qué módulo pesa más en el import:
+    python -X importtime -c "import app" 2>&1 | sort -t'|' -k2 -n | tail -20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Corre en el proceso hijo: mide el import y el primer request, imprime JSON
+_HIJO = r"""
+import asyncio, json, sys, time
+
+t0 = time.perf_counter()
+modulo = __import__(sys.argv[1])
+t1 = time.perf_counter()
+ruta, _, consulta = sys.argv[2].partition("?")
+
+if sys.argv[1] == "asgi":
+    # Un request ASGI a mano (sin lifespan: igual que el primero que llega antes de las precargas)
+    async def _pedir():
+        mensajes, estado = [{"type": "http.request", "body": b""}], {}
+        async def recibir():
+            return mensajes.pop() if mensajes else {"type": "http.disconnect"}
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["status"] = mensaje["status"]
+        await modulo.app({"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                          "method": "GET", "scheme": "http", "path": ruta, "raw_path": ruta.encode(),
+                          "query_string": consulta.encode(), "root_path": "", "headers": [],
+                          "server": ("127.0.0.1", 5000), "client": ("127.0.0.1", 0)}, recibir, enviar)
+        await modulo.engine.dispose()   # si no, el hilo de aiosqlite no deja terminar al proceso
+        return estado.get("status")
+    status = asyncio.run(_pedir())
+else:
+    status = modulo.app.test_client().get(sys.argv[2]).status_code
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "request": t2 - t1, "status": status}))
+"""
+
+
+def corrida(modulo, ruta):
+    salida = subprocess.run(
+        [sys.executable, "-c", _HIJO, modulo, ruta],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def p90(valores):
+    return statistics.quantiles(valores, n=10)[-1] if len(valores) > 1 else valores[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corridas", type=int, default=15)
+    parser.add_argument("--modulo", choices=("app", "asgi"), default="app")
+    parser.add_argument("--ruta", default="/libros?limit=50")
+    args = parser.parse_args()
+
+    corrida(args.modulo, args.ruta)   # calienta .pyc y caché de disco
+    resultados = [corrida(args.modulo, args.ruta) for _ in range(args.corridas)]
+    estados = {r["status"] for r in resultados}
+    if estados != {200}:
+        print(f"⚠️  El primer request devolvió {', '.join(map(str, sorted(estados)))}")
+
+    print(f"import {args.modulo} + GET {args.ruta} ({args.corridas} procesos)")
+    for clave in ("import", "request", "total"):
+        valores = [r["import"] + r["request"] if clave == "total" else r[clave] for r in resultados]
+        print(f"{clave:<8} mediana {statistics.median(valores) * 1000:>7.0f} ms   p90 {p90(valores) * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/libros/buscar contra un Postgres local.
+
+Carga libros sintéticos (si hace falta), corre EXPLAIN ANALYZE de la consulta
+que arma controllers/busqueda.py para confirmar que el planner usa los índices
+GIN ix_libros_titulo_trgm / ix_libros_autor_trgm, y compara tiempos contra la
+consulta vieja (lower(unaccent(col)) LIKE '%x%', sin índice posible).
+
+Uso:
+    DATABASE_URL=postgresql://... python benchmarks/bench_buscar_trgm.py --filas 200000
+Requiere la base preparada con `flask --app app preparar-base` (crea o migra
+las extensiones, f_unaccent y los índices de trigramas).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, or_, select, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from config import ProductionConfig  # noqa: E402
+from database import crear_engine  # noqa: E402
+from controllers.busqueda import consulta_titulo_autor, normalizar  # noqa: E402
+from models.libro import Libro  # noqa: E402
+
+PREFIJO_ISBN = "BENCH-"
+NOMBRES = ["Gabriel", "Julio", "Jorge Luis", "Isabel", "María Elena", "Adolfo", "Ernesto", "Silvina", "Alfonsina"]
+APELLIDOS = ["García Márquez", "Cortázar", "Borges", "Allende", "Walsh", "Bioy Casares", "Sábato", "Ocampo", "Storni"]
+PALABRAS = ["cien", "años", "soledad", "amor", "cólera", "rayuela", "ficciones", "aleph", "túnel", "invención",
+            "casa", "espíritus", "operación", "masacre", "héroes", "tumbas", "noche", "jardín", "senderos", "río",
+            "canción", "pájaro", "corazón", "ciudad", "perros", "crónica", "muerte", "anunciada", "otoño", "patriarca"]
+CONSULTAS = [("soledad", ""), ("", "garcia"), ("corazon", ""), ("", "cortazar"), ("tumbas", "sabato"), ("cron", "")]
+
+
+def sembrar(engine, filas):
+    with engine.begin() as conn:
+        existentes = conn.execute(select(func.count()).select_from(Libro)).scalar()
+        faltan = filas - existentes
+        if faltan <= 0:
+            return
+        print(f"Insertando {faltan} libros sintéticos...")
+        base = existentes
+        lote = []
+        for i in range(faltan):
+            lote.append({
+                "titulo": " ".join(random.choice(PALABRAS) for _ in range(random.randint(2, 6))).capitalize(),
+                "autor": f"{random.choice(NOMBRES)} {random.choice(APELLIDOS)}",
+                "editorial": random.choice(["Sudamericana", "Planeta", "Emecé", "Alfaguara", None]),
+                "isbn": f"{PREFIJO_ISBN}{base + i}",
+                "stock": random.randint(0, 20),
+                "precio": round(random.uniform(1000, 30000), 2),
+                "ubicacion": f"E{random.randint(1, 40)}",
+            })
+            if len(lote) == 5000:
+                conn.execute(Libro.__table__.insert(), lote)
+                lote = []
+        if lote:
+            conn.execute(Libro.__table__.insert(), lote)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE stock_charles_schema.libros"))
+
+
+def consulta_vieja(titulo_norm, autor_norm):
+    condiciones = []
+    if titulo_norm:
+        condiciones.append(func.lower(func.public.unaccent(Libro.titulo)).like(f"%{titulo_norm}%"))
+    if autor_norm:
+        condiciones.append(func.lower(func.public.unaccent(Libro.autor)).like(f"%{autor_norm}%"))
+    return select(Libro).where(or_(*condiciones))
+
+
+def medir(session, armar, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        for titulo, autor in CONSULTAS:
+            stmt = armar(normalizar(titulo), normalizar(autor))
+            inicio = time.perf_counter()
+            session.execute(stmt).all()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--limpiar", action="store_true", help="borrar los libros sintéticos al terminar")
+    args = parser.parse_args()
+
+    url = os.getenv("DATABASE_URL", ProductionConfig.SQLALCHEMY_DATABASE_URI)
+    engine = crear_engine(url)
+    if engine.dialect.name != "postgresql":
+        sys.exit("Este benchmark necesita Postgres (pg_trgm + unaccent).")
+
+    random.seed(42)
+    sembrar(engine, args.filas)
+
+    with Session(engine) as session:
+        print("\n== EXPLAIN ANALYZE de la consulta nueva ==")
+        usa_indice = True
+        for titulo, autor in CONSULTAS:
+            stmt = consulta_titulo_autor(normalizar(titulo), normalizar(autor), args.limit)
+            sql = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+            plan = "\n".join(r[0] for r in session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")))
+            encontrado = "ix_libros_titulo_trgm" in plan or "ix_libros_autor_trgm" in plan
+            usa_indice &= encontrado
+            print(f"\n-- titulo={titulo!r} autor={autor!r} -> {'usa índice GIN' if encontrado else 'SIN índice'}")
+            print(plan)
+
+        nueva = medir(session, lambda t, a: consulta_titulo_autor(t, a, args.limit), args.repeticiones)
+        vieja = medir(session, consulta_vieja, args.repeticiones)
+
+    print("\n== Resultados ==")
+    print(f"filas en libros: >= {args.filas}")
+    print(f"consulta vieja (unaccent LIKE, seq scan): p50={vieja[0]:.2f} ms  p95={vieja[1]:.2f} ms")
+    print(f"consulta nueva (GIN pg_trgm + similitud): p50={nueva[0]:.2f} ms  p95={nueva[1]:.2f} ms")
+    print(f"planner usa los índices trigramas: {'sí' if usa_indice else 'NO'}")
+
+    if args.limpiar:
+        with engine.begin() as conn:
+            conn.execute(Libro.__table__.delete().where(Libro.isbn.like(f"{PREFIJO_ISBN}%")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de todas las rutas de app.py sobre un dataset sintético
+reproducible, con resultados en JSON para comparar entre commits.
+
+1. Siembra la base de DATABASE_URL (Postgres o SQLite) hasta la escala
+   pedida con seed_libros.py (misma semilla = mismos datos).
+2. Recorre cada ruta con el test client de Flask (un proceso, sin red):
+   `--repeticiones` requests por escenario, p50/p95/p99 y req/s.
+3. Con --http, además le tira carga HTTP concurrente a los GET desde varios
+   procesos cliente contra gunicorn (gunicorn.conf.py), como bench_servidor.py.
+4. Guarda todo en benchmarks/resultados/<commit>-<escala>.json y, con
+   --comparar, muestra el cociente contra otra corrida.
+
+Los escenarios de escritura modifican la base (venden, crean y borran
+libros, marcan faltantes): usar una base solo para esto.
+
+Uso (desde backend/):
+    DATABASE_URL=sqlite:///bench.db python benchmarks/bench_endpoints.py --escala 10k
+    DATABASE_URL=postgresql://... python benchmarks/bench_endpoints.py --escala 1m --http \\
+        --comparar benchmarks/resultados/<commit anterior>-1m.json
+    ... --solo 'libros|faltantes'    # solo los escenarios cuyo nombre coincide
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, select  # noqa: E402
+
+import seed_libros  # noqa: E402
+
+RESULTADOS = os.path.join(BACKEND, "benchmarks", "resultados")
+PREFIJO_ISBN = "BENCH-"
+MUESTRA = 20_000
+
+
+class Escenario:
+
+    def __init__(self, nombre, metodo, ruta, cuerpo=None, repeticiones=None, http=False, tipo=None):
+        self.nombre = nombre
+        self.metodo = metodo
+        self.ruta = ruta            # str, función(azar) -> str, o función(azar) -> (ruta, cuerpo)
+        self.cuerpo = cuerpo        # None, o función(azar) -> dict / bytes
+        self.repeticiones = repeticiones
+        self.http = http            # GET que también se mide con carga HTTP concurrente
+        self.tipo = tipo
+
+    def armar(self, azar):
+        ruta = self.ruta(azar) if callable(self.ruta) else self.ruta
+        if isinstance(ruta, tuple):
+            return ruta
+        return ruta, self.cuerpo(azar) if self.cuerpo else None
+
+
+def _muestras(engine):
+    from models.libro import Faltante, Libro
+    with engine.connect() as conn:
+        libros = conn.execute(select(Libro.id, Libro.isbn, Libro.titulo, Libro.autor, Libro.ubicacion)
+                              .order_by(Libro.id).limit(MUESTRA)).all()
+        faltantes = conn.execute(select(Faltante.id).order_by(Faltante.id.desc()).limit(MUESTRA)).scalars().all()
+    if not libros or not faltantes:
+        sys.exit("La base no tiene libros o faltantes: revisar --escala")
+    return libros, faltantes
+
+
+def escenarios(libros, faltantes, completos):
+    contador = iter(range(10**9))
+    libro = lambda azar: azar.choice(libros)  # noqa: E731
+    palabra = lambda azar: azar.choice(seed_libros.SUSTANTIVOS)  # noqa: E731
+    isbn_nuevo = lambda: f"{PREFIJO_ISBN}{next(contador)}"  # noqa: E731
+
+    def _libro_nuevo(azar):
+        return {"titulo": f"{palabra(azar).capitalize()} {palabra(azar)}", "autor": azar.choice(seed_libros.APELLIDOS),
+                "editorial": "Planeta", "isbn": isbn_nuevo(), "stock": 5, "precio": "1500", "ubicacion": "E1"}
+
+    def _actualizar(azar):
+        fila = libro(azar)
+        return f"/libros/{fila.id}", {"titulo": fila.titulo, "autor": fila.autor, "editorial": "Planeta",
+                                      "isbn": fila.isbn, "stock": azar.randint(1, 20), "precio": "2500",
+                                      "ubicacion": fila.ubicacion}
+
+    def _importar(azar):
+        return "".join(json.dumps(_libro_nuevo(azar)) + "\n" for _ in range(100)).encode()
+
+    lista = [
+        # Lecturas
+        Escenario("libros_pagina", "GET", "/libros?limit=50", http=True),
+        Escenario("libros_pagina_cursor", "GET", lambda a: f"/libros?limit=200&cursor={libro(a).id}"),
+        Escenario("libros_busqueda_indice", "GET", lambda a: f"/libros?q={palabra(a)}&limit=50", http=True),
+        Escenario("libros_por_isbn_query", "GET", lambda a: f"/libros?isbn={libro(a).isbn}"),
+        Escenario("libro_por_isbn", "GET", lambda a: f"/libros/isbn/{libro(a).isbn}", http=True),
+        Escenario("libros_por_isbns", "GET",
+                  lambda a: "/libros/isbn?isbns=" + ",".join(libro(a).isbn for _ in range(20))),
+        Escenario("buscar_titulo_autor", "GET", lambda a: f"/api/libros/buscar?titulo={palabra(a)}&limit=50",
+                  http=True),
+        Escenario("sugerir", "GET", lambda a: f"/api/libros/sugerir?prefix={palabra(a)[:3]}", http=True),
+        Escenario("editoriales", "GET", "/api/editoriales", http=True),
+        Escenario("editoriales_prefijo", "GET", lambda a: f"/api/editoriales?prefix={a.choice('PSEA')}"),
+        Escenario("dados_baja_pagina", "GET", "/libros/dados-baja?limit=100", http=True),
+        Escenario("dados_baja_por_dia", "GET", "/libros/dados-baja?por=dia&desde=2025-01-01&hasta=2025-06-30"),
+        Escenario("dados_baja_por_editorial", "GET", "/libros/dados-baja?por=editorial"),
+        Escenario("exportar_bajas_mes", "GET", "/exportar/libros_bajas?desde=2025-06-01&hasta=2025-06-30",
+                  repeticiones=20),
+        Escenario("faltantes", "GET", "/api/faltantes", http=True),
+        Escenario("faltantes_pagina", "GET", "/api/faltantes?limit=100", http=True),
+        Escenario("faltantes_eliminados", "GET", "/api/faltantes/eliminados"),
+        Escenario("faltantes_eliminados_pagina", "GET", "/api/faltantes/eliminados?limit=100"),
+        Escenario("generar_isbn", "GET", "/generar-isbn"),
+        Escenario("metricas", "GET", "/metrics"),
+        Escenario("metricas_pool", "GET", "/metrics/pool"),
+        Escenario("login", "POST", "/login", cuerpo=lambda a: {"username": "bench", "password": "bench"}),
+        # Escrituras
+        Escenario("crear_libro", "POST", "/libros", cuerpo=_libro_nuevo),
+        Escenario("importar_100_libros", "POST", "/libros/importar?formato=ndjson", cuerpo=_importar,
+                  repeticiones=20, tipo="application/x-ndjson"),
+        Escenario("actualizar_libro", "PUT", _actualizar),
+        Escenario("vender", "PUT", lambda a: f"/libros/{libro(a).id}/vender", cuerpo=lambda a: {"cantidad": 1}),
+        Escenario("ventas_3_items", "POST", "/ventas", cuerpo=lambda a: {
+            "items": [{"libro_id": libro(a).id, "cantidad": 1} for _ in range(3)]}),
+        Escenario("bajar_libro", "PUT", lambda a: f"/bajar-libro/{libro(a).id}", cuerpo=lambda a: {"cantidad": 1}),
+        Escenario("bajar_stock", "PUT", lambda a: f"/libros/{libro(a).id}/bajar-stock",
+                  cuerpo=lambda a: {"cantidad": 1}),
+        Escenario("marcar_baja", "PUT", lambda a: f"/libros/{libro(a).id}/marcar-baja",
+                  cuerpo=lambda a: {"cantidad": 1}),
+        Escenario("crear_faltante", "POST", "/api/faltantes",
+                  cuerpo=lambda a: {"descripcion": f"{palabra(a)} {palabra(a)} (bench)"}),
+        Escenario("modificar_faltante", "PUT", lambda a: f"/api/faltantes/{a.choice(faltantes)}",
+                  cuerpo=lambda a: {"descripcion": f"{palabra(a)} (bench)"}),
+        Escenario("eliminar_faltante", "DELETE", lambda a: f"/api/faltantes/{a.choice(faltantes)}"),
+        Escenario("recuperar_faltante", "PUT", lambda a: f"/api/faltantes/recuperar/{a.choice(faltantes)}"),
+        # Borra los libros que crearon los escenarios anteriores (uno por request)
+        Escenario("eliminar_libro", "DELETE", None),
+        # Marca todos los faltantes como eliminados: va al final
+        Escenario("limpiar_faltantes", "DELETE", "/api/faltantes", repeticiones=3),
+    ]
+    if completos:
+        lista[:0] = [
+            Escenario("libros_completo", "GET", "/libros", repeticiones=3),
+            Escenario("exportar_libros_completo", "GET", "/exportar/libros", repeticiones=3),
+        ]
+    return lista
+
+
+def percentiles(latencias):
+    ordenadas = sorted(latencias)
+
+    def _p(q):
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * q))] * 1000
+
+    return {"p50": statistics.median(ordenadas) * 1000, "p95": _p(0.95), "p99": _p(0.99)}
+
+
+def correr(cliente, escenario, repeticiones, azar):
+    latencias, estados = [], {}
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        ruta, cuerpo = escenario.armar(azar)
+        opciones = {"data": cuerpo, "content_type": escenario.tipo} if isinstance(cuerpo, bytes) else {"json": cuerpo}
+        t0 = time.perf_counter()
+        respuesta = cliente.open(ruta, method=escenario.metodo, **opciones)
+        respuesta.get_data()   # consume también las respuestas en streaming
+        latencias.append(time.perf_counter() - t0)
+        estados[respuesta.status_code] = estados.get(respuesta.status_code, 0) + 1
+    total = time.perf_counter() - inicio
+    return {
+        **percentiles(latencias),
+        "req_s": len(latencias) / total if total else 0,
+        "requests": len(latencias),
+        "errores": sum(n for estado, n in estados.items() if estado >= 500),
+        "estados": {str(estado): n for estado, n in sorted(estados.items())},
+    }
+
+
+def medir_http(rutas, args):
+    import bench_servidor
+    resultados = {}
+    proceso = bench_servidor.servidor("gunicorn", args)
+    try:
+        bench_servidor.esperar_puerto(bench_servidor.PUERTO, proceso)
+        for nombre, ruta in rutas:
+            bench_servidor.medir(ruta, 2, args.clientes)   # calentar índices y caches de todos los workers
+            resultados[nombre] = r = bench_servidor.medir(ruta, args.segundos, args.clientes)
+            print(f"  http {nombre:<28} {r['req_s']:>8.0f} req/s  p50 {r['p50']:>7.1f}  "
+                  f"p95 {r['p95']:>7.1f}  p99 {r['p99']:>7.1f} ms  errores {r['errores']}")
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+    return resultados
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+def comparar(actual, archivo):
+    with open(archivo, encoding="utf-8") as f:
+        anterior = json.load(f)
+    print(f"\nComparación contra {anterior['commit']} ({archivo}): p50 y req/s nuevo / anterior")
+    for modo in ("test_client", "http"):
+        for nombre, r in actual[modo].items():
+            previo = anterior.get(modo, {}).get(nombre)
+            if not previo:
+                continue
+            p50 = r["p50"] / previo["p50"] if previo["p50"] else float("inf")
+            req_s = r["req_s"] / previo["req_s"] if previo["req_s"] else float("inf")
+            marca = "  ⚠️" if p50 > 1.2 else ""
+            print(f"  {modo:<11} {nombre:<28} p50 {p50:>5.2f}x   req/s {req_s:>5.2f}x{marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=seed_libros.ESCALAS, default="10k")
+    parser.add_argument("--repeticiones", type=int, default=200, help="requests por escenario (test client)")
+    parser.add_argument("--solo", help="regex sobre el nombre de los escenarios")
+    parser.add_argument("--completos", action="store_true", help="incluye /libros y /exportar/libros enteros")
+    parser.add_argument("--http", action="store_true", help="también carga HTTP concurrente con gunicorn")
+    parser.add_argument("--segundos", type=int, default=10)
+    parser.add_argument("--clientes", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--salida", help="archivo JSON (por defecto benchmarks/resultados/<commit>-<escala>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+    if not os.getenv("DATABASE_URL"):
+        sys.exit("Definí DATABASE_URL con una base solo para benchmarks (los escenarios escriben)")
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from app import app
+    from controllers import esquema
+    from models.libro import Libro
+
+    libros_escala, bajas_escala, faltantes_escala = seed_libros.ESCALAS[args.escala]
+    esquema.preparar_base(app.engine)
+    with app.engine.connect() as conn:
+        existentes = conn.execute(select(func.count()).select_from(Libro)).scalar()
+    if existentes < libros_escala:
+        proporcion = (libros_escala - existentes) / libros_escala
+        print(f"🌱 Sembrando {libros_escala - existentes} libros...")
+        seed_libros.sembrar(app.engine, libros_escala - existentes, int(bajas_escala * proporcion),
+                            int(faltantes_escala * proporcion))
+
+    libros, faltantes = _muestras(app.engine)
+    lista = escenarios(libros, faltantes, args.completos)
+    if args.solo:
+        lista = [e for e in lista if re.search(args.solo, e.nombre)]
+
+    azar = random.Random(7)
+    cliente = app.test_client()
+    resultados = {"test_client": {}, "http": {}}
+    print(f"{app.engine.dialect.name}, escala {args.escala} ({existentes} libros antes de sembrar)")
+    for escenario in lista:
+        if escenario.nombre == "eliminar_libro":
+            with app.engine.connect() as conn:
+                creados = conn.execute(select(Libro.id).where(Libro.isbn.like(f"{PREFIJO_ISBN}%"))).scalars().all()
+            if not creados:
+                continue
+            ids = iter(creados)
+            escenario.ruta = lambda _: f"/libros/{next(ids)}"
+            repeticiones = min(len(creados), args.repeticiones)
+        else:
+            repeticiones = min(escenario.repeticiones or args.repeticiones, args.repeticiones)
+        if escenario.metodo == "GET":
+            correr(cliente, escenario, min(5, repeticiones), azar)   # calentar índices y caches
+        resultados["test_client"][escenario.nombre] = r = correr(cliente, escenario, repeticiones, azar)
+        print(f"  {escenario.metodo:<6} {escenario.nombre:<28} {r['req_s']:>8.0f} req/s  p50 {r['p50']:>7.2f}  "
+              f"p95 {r['p95']:>7.2f}  p99 {r['p99']:>7.2f} ms  estados {r['estados']}")
+
+    if args.http:
+        rutas = [(e.nombre, e.armar(azar)[0]) for e in lista if e.http]
+        resultados["http"] = medir_http(rutas, args)
+
+    salida = {
+        "commit": commit_actual(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "base": app.engine.dialect.name,
+        "escala": args.escala,
+        "nucleos": multiprocessing.cpu_count(),
+        "repeticiones": args.repeticiones,
+        **resultados,
+    }
+    archivo = args.salida or os.path.join(RESULTADOS, f"{salida['commit']}-{args.escala}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+    with open(archivo, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados en {archivo}")
+
+    if args.comparar:
+        comparar(salida, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
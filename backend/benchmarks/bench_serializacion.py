@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la serialización de listados (GET /libros, /libros/dados-baja).
+
+Compara, sobre una base SQLite en memoria con 10k y 100k filas:
+  - antes:  session.query(Modelo).all() + dicts armados a mano + json estándar de Flask
+  - ahora:  select de columnas (filas de Core) + filas_a_dicts + OrjsonProvider
+
+Uso:
+    python benchmarks/bench_serializacion.py [--filas 10000 100000] [--repeticiones 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import create_engine, desc, event, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from controllers.serializacion import OrjsonProvider, filas_a_dicts, isoformat, orjson  # noqa: E402
+from models.libro import Base, Libro, LibroBaja  # noqa: E402
+
+COLUMNAS_LIBRO = (Libro.id, Libro.titulo, Libro.autor, Libro.editorial,
+                  Libro.isbn, Libro.stock, Libro.precio, Libro.ubicacion)
+COLUMNAS_BAJA = (LibroBaja.id, LibroBaja.titulo, LibroBaja.autor, LibroBaja.editorial,
+                 LibroBaja.isbn, LibroBaja.precio, LibroBaja.ubicacion, LibroBaja.fecha_baja,
+                 LibroBaja.stock_resultante.label('cantidad'), LibroBaja.stock_resultante.label('stock'),
+                 LibroBaja.cantidad_bajada)
+
+
+def crear_base(filas):
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _schema(dbapi_conn, _):
+        dbapi_conn.execute("ATTACH DATABASE ':memory:' AS stock_charles_schema")
+
+    Base.metadata.create_all(engine)
+    ahora = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(Libro.__table__.insert(), [{
+            "id": i, "titulo": f"Título número {i} de la colección", "autor": f"Autor {i % 997}",
+            "editorial": random.choice(["Planeta", "Sudamericana", "Emecé", None]),
+            "isbn": f"978{i:010d}", "stock": i % 30, "precio": round(random.uniform(1000, 30000), 2),
+            "ubicacion": f"E{i % 40}", "fecha_alta": ahora,
+        } for i in range(1, filas + 1)])
+        conn.execute(LibroBaja.__table__.insert(), [{
+            "id": i, "libro_id": i, "fecha_baja": ahora + timedelta(minutes=i), "cantidad_bajada": 1,
+            "stock_resultante": i % 30, "titulo": f"Título número {i}", "autor": f"Autor {i % 997}",
+            "editorial": "Planeta", "isbn": f"978{i:010d}", "precio": 1500.0, "ubicacion": f"E{i % 40}",
+        } for i in range(1, filas + 1)])
+    return engine
+
+
+def libros_antes(session, app):
+    libros = session.query(Libro).all()
+    return app.json.dumps([{
+        'id': l.id, 'titulo': l.titulo, 'autor': l.autor, 'editorial': l.editorial,
+        'isbn': l.isbn, 'stock': l.stock, 'precio': l.precio, 'ubicacion': l.ubicacion,
+    } for l in libros])
+
+
+def libros_ahora(session, app):
+    return app.json.dumps(filas_a_dicts(session.execute(select(*COLUMNAS_LIBRO).order_by(Libro.id))))
+
+
+def bajas_antes(session, app):
+    bajas = session.query(LibroBaja).order_by(desc(LibroBaja.fecha_baja)).all()
+    return app.json.dumps([{
+        'id': b.id, 'titulo': b.titulo, 'autor': b.autor, 'editorial': b.editorial,
+        'isbn': b.isbn, 'precio': b.precio, 'ubicacion': b.ubicacion,
+        'fecha_baja': b.fecha_baja.isoformat(), 'cantidad': b.stock_resultante,
+        'stock': b.stock_resultante, 'cantidad_bajada': b.cantidad_bajada,
+    } for b in bajas])
+
+
+def bajas_ahora(session, app):
+    filas = session.execute(select(*COLUMNAS_BAJA).order_by(desc(LibroBaja.fecha_baja)))
+    return app.json.dumps(filas_a_dicts(filas, convertir={'fecha_baja': isoformat}))
+
+
+def medir(engine, funcion, app, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        with Session(engine) as session:
+            inicio = time.perf_counter()
+            funcion(session, app)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    app_antes = Flask("antes")
+    app_antes.json = DefaultJSONProvider(app_antes)
+    app_ahora = Flask("ahora")
+    if orjson is not None:
+        app_ahora.json = OrjsonProvider(app_ahora)
+    else:
+        print("⚠️ orjson no está instalado: 'ahora' usa el json estándar")
+
+    random.seed(42)
+    print(f"{'filas':>8} {'endpoint':<18} {'antes (ms)':>11} {'ahora (ms)':>11} {'mejora':>7}")
+    for filas in args.filas:
+        engine = crear_base(filas)
+        for nombre, antes, ahora in (("/libros", libros_antes, libros_ahora),
+                                     ("/libros/dados-baja", bajas_antes, bajas_ahora)):
+            t_antes = medir(engine, antes, app_antes, args.repeticiones)
+            t_ahora = medir(engine, ahora, app_ahora, args.repeticiones)
+            print(f"{filas:>8} {nombre:<18} {t_antes:>11.1f} {t_ahora:>11.1f} {t_antes / t_ahora:>6.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
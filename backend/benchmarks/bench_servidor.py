@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Throughput de `python app.py` (servidor de desarrollo de Flask, un proceso)
+contra gunicorn con gunicorn.conf.py (varios workers gthread) y contra la API
+asíncrona de asgi.py en uvicorn.
+
+Levanta cada servidor sobre la base de DATABASE_URL, le tira requests
+concurrentes durante `--segundos` desde varios procesos cliente (con
+keep-alive, sin If-None-Match: siempre 200 completos) y muestra req/s,
+p50/p99 y errores por ruta.
+
+Uso (desde backend/):
+    python benchmarks/bench_servidor.py [--segundos 15] [--clientes 64]
+        [--workers 2*núcleos+1] [--threads 4] [--ruta '/libros?limit=50' ...]
+        [--servidores app.run,gunicorn,uvicorn]
+
+Para comparar un solo proceso sync contra uno async con cientos de
+conexiones (lector de códigos + búsquedas):
+    python benchmarks/bench_servidor.py --servidores gunicorn,uvicorn \
+        --workers 1 --clientes 300 --ruta /libros/isbn/<isbn> --ruta '/libros?q=gar&limit=20'
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUERTO = 5099
+RUTAS = ["/libros?limit=50", "/libros?q=gar&limit=50", "/api/editoriales"]
+SERVIDORES = ("app.run", "gunicorn", "uvicorn")
+
+
+def esperar_puerto(puerto, proceso, limite=60):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            sys.exit(f"El servidor terminó al arrancar (código {proceso.returncode})")
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=2)
+            conexion.request("GET", "/api/editoriales")
+            conexion.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.3)
+    sys.exit(f"El servidor no respondió en {limite}s")
+
+
+def _cliente(ruta, segundos, hilos, cola):
+    latencias, errores = [], 0
+    lock = threading.Lock()
+    fin = time.monotonic() + segundos
+
+    def _hilo():
+        nonlocal errores
+        propias, fallidas = [], 0
+        conexion = http.client.HTTPConnection("127.0.0.1", PUERTO, timeout=30)
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            try:
+                conexion.request("GET", ruta)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status != 200:
+                    fallidas += 1
+                    continue
+                propias.append(time.perf_counter() - inicio)
+            except (OSError, http.client.HTTPException):
+                fallidas += 1
+                conexion.close()
+                conexion = http.client.HTTPConnection("127.0.0.1", PUERTO, timeout=30)
+        with lock:
+            latencias.extend(propias)
+            errores += fallidas
+
+    hilos_ = [threading.Thread(target=_hilo) for _ in range(hilos)]
+    for h in hilos_:
+        h.start()
+    for h in hilos_:
+        h.join()
+    cola.put((latencias, errores))
+
+
+def medir(ruta, segundos, clientes):
+    # Varios procesos cliente: un solo proceso Python no alcanza a saturar varios workers
+    procesos_cliente = min(clientes, multiprocessing.cpu_count() * 2)
+    cola = multiprocessing.Queue()
+    procesos = [
+        multiprocessing.Process(target=_cliente, args=(ruta, segundos, max(1, clientes // procesos_cliente), cola))
+        for _ in range(procesos_cliente)
+    ]
+    for p in procesos:
+        p.start()
+    latencias, errores = [], 0
+    for _ in procesos:
+        propias, fallidas = cola.get()
+        latencias.extend(propias)
+        errores += fallidas
+    for p in procesos:
+        p.join()
+    latencias.sort()
+    return {
+        "req_s": len(latencias) / segundos,
+        "p50": statistics.median(latencias) * 1000 if latencias else 0,
+        "p95": latencias[int(len(latencias) * 0.95)] * 1000 if latencias else 0,
+        "p99": latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0,
+        "errores": errores,
+    }
+
+
+def etiqueta(nombre, args):
+    if nombre == "gunicorn":
+        return f"gunicorn {args.workers}x{args.threads}"
+    if nombre == "uvicorn":
+        return f"uvicorn {args.workers}x async"
+    return nombre
+
+
+def servidor(nombre, args):
+    # Las bases de los benchmarks se arman con seed_libros (sin alembic_version)
+    entorno = {**os.environ, "PORT": str(PUERTO), "ESQUEMA_EXIGIR_AL_DIA": "0"}
+    if nombre == "app.run":
+        comando = [sys.executable, "app.py"]
+    elif nombre == "gunicorn":
+        entorno.update(WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads))
+        comando = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", os.devnull, "app:app"]
+    else:
+        comando = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(PUERTO),
+                   "--workers", str(args.workers), "--no-access-log", "--backlog", "4096"]
+    return subprocess.Popen(comando, cwd=BACKEND, env=entorno,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segundos", type=int, default=15)
+    parser.add_argument("--clientes", type=int, default=64, help="conexiones concurrentes")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ruta", action="append", help=f"rutas a medir (por defecto {', '.join(RUTAS)})")
+    parser.add_argument("--servidores", default="app.run,gunicorn", help=f"de {', '.join(SERVIDORES)}")
+    args = parser.parse_args()
+    rutas = args.ruta or RUTAS
+    servidores = [s for s in args.servidores.split(",") if s]
+    if not servidores or any(s not in SERVIDORES for s in servidores):
+        parser.error(f"--servidores: opciones {', '.join(SERVIDORES)}")
+
+    print(f"{multiprocessing.cpu_count()} núcleos, {args.clientes} clientes, {args.segundos}s por ruta")
+    resultados = {}
+    for nombre in servidores:
+        proceso = servidor(nombre, args)
+        try:
+            esperar_puerto(PUERTO, proceso)
+            for ruta in rutas:
+                medir(ruta, 2, args.clientes)   # calentar índices y caches de todos los workers
+                resultados[(nombre, ruta)] = r = medir(ruta, args.segundos, args.clientes)
+                print(f"{etiqueta(nombre, args):<18} {ruta:<28} {r['req_s']:>8.0f} req/s  "
+                      f"p50 {r['p50']:>7.1f} ms  p99 {r['p99']:>7.1f} ms  errores {r['errores']}")
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    print()
+    base = servidores[0]
+    for ruta in rutas:
+        for nombre in servidores[1:]:
+            anterior, nuevo = resultados[(base, ruta)]["req_s"], resultados[(nombre, ruta)]["req_s"]
+            print(f"{ruta:<28} {etiqueta(nombre, args)} / {etiqueta(base, args)}: "
+                  f"{nuevo / anterior if anterior else float('inf'):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark en memoria de /api/libros/sugerir (sin base ni HTTP).
+
+Arma IndiceLibros + SugerenciasLibros con un catálogo sintético (500k títulos
+por defecto, vocabulario de ~20k palabras con sílabas en castellano) y mide
+p50/p99 de sugerir() para prefijos de 1 a 6 letras y de dos palabras: con el
+nodo del prefijo todavía sin armar ("frío") y ya armado, mientras se simulan
+ventas que van moviendo el ranking. También mide cuánto cuesta aplicar una venta.
+
+Uso:
+    python benchmarks/bench_sugerir.py [--libros 500000] [--consultas 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers import eventos  # noqa: E402
+from controllers.busqueda import IndiceLibros, normalizar, palabras  # noqa: E402
+from controllers.sugerencias import SugerenciasLibros  # noqa: E402
+
+SILABAS = ["ca", "sa", "ma", "la", "pe", "re", "to", "mi", "no", "so", "le", "da", "ri", "bo", "gu", "ta",
+           "ne", "co", "lu", "fa", "ven", "tor", "cas", "mar", "sol", "dad", "ción", "ría", "ñu", "jo"]
+
+
+def vocabulario(cantidad):
+    palabras_ = set()
+    while len(palabras_) < cantidad:
+        palabras_.add("".join(random.choices(SILABAS, k=random.randint(2, 4))))
+    return sorted(palabras_)
+
+
+def catalogo(libros, vocab):
+    autores = [f"{random.choice(vocab).title()} {random.choice(vocab).title()}" for _ in range(20000)]
+    for libro_id in range(1, libros + 1):
+        titulo = " ".join(random.choices(vocab, k=random.randint(1, 6))).capitalize()
+        yield libro_id, titulo, random.choice(autores)
+
+
+def percentil(tiempos, p):
+    tiempos = sorted(tiempos)
+    return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--libros", type=int, default=500_000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    vocab = vocabulario(20000)
+    inicio = time.perf_counter()
+    filas = list(catalogo(args.libros, vocab))
+    indice = IndiceLibros()
+    indice.cargar(filas)
+    sugerencias = SugerenciasLibros(indice)
+    sugerencias._stock = {libro_id: random.randint(0, 20) for libro_id, _, _ in filas}
+    sugerencias._ventas = {random.randint(1, args.libros): random.randint(1, 50) for _ in range(args.libros // 10)}
+    sugerencias.cargado = True
+    print(f"📚 {args.libros} libros indexados en {time.perf_counter() - inicio:.1f}s")
+
+    def vender():
+        libro_id = random.randint(1, args.libros)
+        sugerencias.on_commit_baja(eventos.ALTA, {"libro_id": libro_id, "cantidad_bajada": 1})
+        stock = max(0, sugerencias._stock[libro_id] - 1)
+        sugerencias.on_commit_libro(eventos.MODIFICACION, {"id": libro_id, "stock": stock})
+
+    normalizadas = [palabras(normalizar(titulo)) for _, titulo, _ in random.sample(filas, 5000)]
+    print(f"{'prefijo':<16} {'nodo':<8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9}")
+    for largo in (1, 2, 3, 4, 6, "2 palabras"):
+        prefijos = []
+        for palabras_ in random.choices(normalizadas, k=args.consultas):
+            if largo == "2 palabras":
+                prefijos.append(" ".join(palabras_[:2])[:-1] if len(palabras_) > 1 else palabras_[0][:3])
+            else:
+                prefijos.append(palabras_[0][:largo])
+        for frio in (True, False):
+            if not frio:
+                for prefijo in prefijos:   # primera pasada: arma los nodos
+                    sugerencias.sugerir(prefijo, limite=10)
+            tiempos = []
+            for prefijo in prefijos:
+                if frio:
+                    sugerencias._nodos.clear()
+                    sugerencias._en_nodos.clear()
+                else:
+                    vender()
+                t0 = time.perf_counter()
+                sugerencias.sugerir(prefijo, limite=10)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            print(f"{str(largo):<16} {'frío' if frio else 'armado':<8} {statistics.median(tiempos):>9.3f} "
+                  f"{percentil(tiempos, 0.99):>9.3f} {max(tiempos):>9.3f}")
+
+    tiempos = []
+    for _ in range(args.consultas):
+        t0 = time.perf_counter()
+        vender()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    print(f"venta aplicada ({len(sugerencias._nodos)} nodos): p50 {statistics.median(tiempos):.3f} ms, "
+          f"p99 {percentil(tiempos, 0.99):.3f} ms")
+
+if __name__ == "__main__":
+    main()
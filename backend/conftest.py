@@ -0,0 +1,56 @@
+"""
+Fixtures de pytest: la app contra una base SQLite temporal.
+
+    cd backend && python -m pytest -q
+
+La app se arma al importar app.py con DATABASE_URL, así que la URL se fija
+antes de importarla. La base se prepara una vez (como `flask preparar-base`)
+y cada test crea sus propios libros con ISBN únicos.
+"""
+import itertools
+import os
+import tempfile
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="stock-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIRECTORIO, 'stock.db')}"
+os.environ["FALTANTES_ARCHIVO_DIAS"] = "0"   # sin el hilo que archiva
+
+import pytest  # noqa: E402
+
+_isbns = itertools.count(9789870000001)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+    from controllers import esquema
+
+    esquema.preparar_base(flask_app.engine)
+    yield flask_app
+    flask_app.engine.dispose()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def session(app):
+    session = app.session_factory.session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def crear_libro(session):
+    """Inserta (y confirma) un libro; devuelve su id."""
+    from models.libro import Libro
+
+    def _crear(titulo="Rayuela", autor="Julio Cortázar", editorial="Sudamericana", stock=5, precio=1000.0):
+        libro = Libro(titulo=titulo, autor=autor, editorial=editorial, isbn=str(next(_isbns)),
+                      stock=stock, precio=precio, ubicacion="A1")
+        session.add(libro)
+        session.commit()
+        return libro.id
+    return _crear
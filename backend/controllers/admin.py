@@ -0,0 +1,51 @@
+"""
+Panel de Flask-Admin en /admin, armado recién con el primer request al panel.
+
+Flask-Admin (y wtforms, pkg_resources...) es lo más pesado de importar de
+toda la app y casi nunca se usa, así que vive en una app Flask aparte
+montada en /admin con DispatcherMiddleware: importar app.py no lo carga.
+Usa la misma sesión (y pool) que el resto de la app.
+"""
+import threading
+
+from flask import Flask
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+from models.libro import Libro
+
+PREFIJO = "/admin"
+
+
+class PanelPerezoso:
+
+    def __init__(self, app, session_factory):
+        self.app = app
+        self.session_factory = session_factory
+        self._panel = None
+        self._lock = threading.Lock()
+
+    def _armar(self):
+        from flask_admin import Admin
+        from flask_admin.contrib.sqla import ModelView
+
+        panel = Flask(__name__)
+        panel.config["SECRET_KEY"] = self.app.config["SECRET_KEY"]
+        admin = Admin(panel, name="Panel de Administración", template_mode="bootstrap3", url="/")
+        admin.add_view(ModelView(Libro, self.session_factory))
+
+        @panel.teardown_appcontext
+        def remove_session(exception=None):
+            self.session_factory.remove()
+
+        return panel
+
+    def __call__(self, environ, start_response):
+        if self._panel is None:
+            with self._lock:
+                if self._panel is None:
+                    self._panel = self._armar()
+        return self._panel(environ, start_response)
+
+
+def instalar(app, session_factory):
+    app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {PREFIJO: PanelPerezoso(app, session_factory)})
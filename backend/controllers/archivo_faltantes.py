@@ -0,0 +1,100 @@
+"""
+Archivo de faltantes eliminados.
+
+Los faltantes no se borran: DELETE los marca `eliminado` (con su
+fecha_eliminado) y se pueden recuperar desde /api/faltantes/eliminados. Los
+que llevan más de `dias` eliminados pasan a faltantes_archivo de a `lote`
+filas por transacción (INSERT ... SELECT + DELETE), así la tabla faltantes
+y sus índices parciales quedan con lo que se usa.
+
+Corre en un hilo de cada proceso cada `intervalo` segundos
+(FALTANTES_ARCHIVO_DIAS=0 lo desactiva) o a mano con
+`flask archivar-faltantes`. En Postgres cada lote toma sus filas con
+FOR UPDATE SKIP LOCKED: varios workers archivando a la vez se reparten las
+filas en lugar de esperarse, y un faltante que se está recuperando en ese
+momento queda para la próxima vuelta.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from controllers import eventos
+from models.libro import Faltante, FaltanteArchivado
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ("id", "descripcion", "fecha_creacion", "fecha_eliminado")
+
+
+def archivar_lote(session, limite, lote):
+    """
+    Mueve a faltantes_archivo hasta `lote` faltantes eliminados antes de
+    `limite` (datetime). Devuelve cuántos movió. No hace commit.
+    """
+    ids = session.execute(
+        select(Faltante.id)
+        .where(Faltante.eliminado == True, Faltante.fecha_eliminado < limite)  # noqa: E712
+        .order_by(Faltante.id)
+        .limit(lote)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    origen = Faltante.__table__
+    session.execute(
+        insert(FaltanteArchivado).from_select(
+            COLUMNAS, select(*(origen.c[c] for c in COLUMNAS)).where(origen.c.id.in_(ids))
+        )
+    )
+    session.execute(delete(Faltante).where(Faltante.id.in_(ids)).execution_options(synchronize_session=False))
+    # DELETE masivo: no pasa por el flush, avisamos a mano (versión de la tabla para los ETag)
+    for faltante_id in ids:
+        eventos.registrar_cambio(session, Faltante, eventos.BAJA, {"id": faltante_id})
+    return len(ids)
+
+
+def _validar_lote(lote):
+    # Con lote 0 archivar() nunca termina (0 movidos no es menos que 0)
+    if lote < 1:
+        raise ValueError(f"El lote de archivo de faltantes tiene que ser 1 o más (FALTANTES_ARCHIVO_LOTE={lote})")
+
+
+def archivar(session_factory, dias, lote=1000, ahora=None):
+    """Archiva todo lo eliminado hace más de `dias` días, un lote por transacción. Devuelve el total."""
+    _validar_lote(lote)
+    limite = (ahora or datetime.now(timezone.utc)) - timedelta(days=dias)
+    total = 0
+    while True:
+        session = session_factory()
+        try:
+            movidos = archivar_lote(session, limite, lote)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        total += movidos
+        if movidos < lote:
+            return total
+
+
+def archivar_en_segundo_plano(session_factory, dias, lote=1000, intervalo=3600):
+    _validar_lote(lote)   # al arrancar el proceso y no en cada vuelta del hilo
+    def _ciclo():
+        # La primera vuelta en un momento al azar: los workers no arrancan todos juntos contra la base
+        time.sleep(random.uniform(0, intervalo))
+        while True:
+            try:
+                movidos = archivar(session_factory, dias, lote)
+                if movidos:
+                    logger.info("Faltantes archivados: %d (eliminados hace más de %d días)", movidos, dias)
+            except Exception:
+                logger.exception("No se pudieron archivar los faltantes eliminados")
+            time.sleep(intervalo)
+    threading.Thread(target=_ciclo, name="archivo-faltantes", daemon=True).start()
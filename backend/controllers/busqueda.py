@@ -0,0 +1,337 @@
+"""
+Índice invertido en memoria para la búsqueda de libros por título/autor.
+
+- Cada libro se normaliza con unidecode + minúsculas, así "garcia" encuentra "García".
+- Palabra -> ids de libros (postings) para resolver cada palabra de la consulta.
+- Trigrama -> palabras del vocabulario, para encontrar palabras que *contienen*
+  el texto buscado sin recorrer todo el catálogo (equivalente al LIKE '%x%').
+- Vocabulario ordenado + bisect para prefijos de 1 o 2 letras.
+
+Se construye una sola vez (la primera búsqueda) y después se actualiza
+de forma incremental con los commits sobre Libro (ver controllers/eventos.py).
+Los commits que llegan mientras se carga se guardan y se aplican al final de
+la carga: la consulta puede haber pasado ya por esa fila.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from sqlalchemy import select, or_, func
+from unidecode import unidecode
+
+from controllers import eventos
+from models.libro import Libro
+
+_separadores = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto):
+    return unidecode(texto or "").lower().strip()
+
+
+def palabras(texto_normalizado):
+    return [p for p in _separadores.split(texto_normalizado) if p]
+
+
+def trigramas(palabra):
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+class IndiceLibros:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.cargado = False
+        # Commits recibidos durante la carga (un lock aparte: el commit no espera a la carga)
+        self._lock_pendientes = threading.Lock()
+        self._cargando = False
+        self._pendientes = []
+        self._docs = {}          # id -> (titulo_norm, autor_norm)
+        self._postings = {}      # palabra -> set(ids)
+        self._trigramas = {}     # trigrama -> set(palabras)
+        self._vocabulario = []   # palabras ordenadas, para prefijos cortos
+
+    # ------------------------------------------------------------------
+    # Carga y mantenimiento
+    # ------------------------------------------------------------------
+    def cargar(self, filas):
+        """`filas` es un iterable de (id, titulo, autor)."""
+        with self._lock:
+            with self._lock_pendientes:
+                self.cargado = False
+                self._cargando = True
+            try:
+                self._docs.clear()
+                self._postings.clear()
+                self._trigramas.clear()
+                self._vocabulario = []
+                for libro_id, titulo, autor in filas:
+                    self._agregar(libro_id, titulo, autor, ordenar=False)
+                # Ordenar una sola vez al final es mucho más barato que un insort por palabra
+                self._vocabulario = sorted(self._postings)
+                self._aplicar_pendientes()
+            finally:
+                with self._lock_pendientes:
+                    self._cargando = False
+                    self._pendientes = []
+
+    def _aplicar_pendientes(self):
+        # Repetir un cambio que la carga ya había leído no cambia nada
+        while True:
+            with self._lock_pendientes:
+                pendientes, self._pendientes = self._pendientes, []
+                if not pendientes:
+                    self.cargado = True
+                    return
+            for accion, datos in pendientes:
+                self._aplicar(accion, datos)
+
+    def asegurar_cargado(self, session):
+        if self.cargado:
+            return
+        with self._lock:
+            if not self.cargado:
+                filas = session.query(Libro.id, Libro.titulo, Libro.autor).yield_per(5000)
+                self.cargar(filas)
+
+    def actualizar(self, libro_id, titulo, autor):
+        with self._lock:
+            self._quitar(libro_id)
+            self._agregar(libro_id, titulo, autor)
+
+    def quitar(self, libro_id):
+        with self._lock:
+            self._quitar(libro_id)
+
+    def on_commit(self, accion, datos):
+        """Callback para controllers.eventos: aplica el cambio confirmado."""
+        with self._lock_pendientes:
+            if not self.cargado:
+                if self._cargando:
+                    self._pendientes.append((accion, datos))
+                return   # sin carga en curso: la próxima carga ya lee el estado confirmado
+        self._aplicar(accion, datos)
+
+    def _aplicar(self, accion, datos):
+        libro_id = datos["id"]
+        if accion == eventos.BAJA:
+            self.quitar(libro_id)
+        elif "titulo" in datos or "autor" in datos:
+            with self._lock:
+                actual = self._docs.get(libro_id)
+                titulo = datos["titulo"] if "titulo" in datos else (actual[0] if actual else "")
+                autor = datos["autor"] if "autor" in datos else (actual[1] if actual else "")
+                self.actualizar(libro_id, titulo, autor)
+
+    def _agregar(self, libro_id, titulo, autor, ordenar=True):
+        titulo_n, autor_n = normalizar(titulo), normalizar(autor)
+        self._docs[libro_id] = (titulo_n, autor_n)
+        for palabra in set(palabras(titulo_n)) | set(palabras(autor_n)):
+            ids = self._postings.get(palabra)
+            if ids is None:
+                ids = self._postings[palabra] = set()
+                if ordenar:
+                    insort(self._vocabulario, palabra)
+                for tri in trigramas(palabra):
+                    self._trigramas.setdefault(tri, set()).add(palabra)
+            ids.add(libro_id)
+
+    def _quitar(self, libro_id):
+        doc = self._docs.pop(libro_id, None)
+        if doc is None:
+            return
+        for palabra in set(palabras(doc[0])) | set(palabras(doc[1])):
+            ids = self._postings.get(palabra)
+            if ids is None:
+                continue
+            ids.discard(libro_id)
+            if not ids:
+                # Palabra que ya no usa ningún libro: la sacamos del vocabulario
+                del self._postings[palabra]
+                pos = bisect_left(self._vocabulario, palabra)
+                if pos < len(self._vocabulario) and self._vocabulario[pos] == palabra:
+                    del self._vocabulario[pos]
+                for tri in trigramas(palabra):
+                    palabras_tri = self._trigramas.get(tri)
+                    if palabras_tri is not None:
+                        palabras_tri.discard(palabra)
+                        if not palabras_tri:
+                            del self._trigramas[tri]
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def _palabras_con_prefijo(self, fragmento):
+        encontradas = []
+        pos = bisect_left(self._vocabulario, fragmento)
+        while pos < len(self._vocabulario) and self._vocabulario[pos].startswith(fragmento):
+            encontradas.append(self._vocabulario[pos])
+            pos += 1
+        return encontradas
+
+    def _palabras_que_contienen(self, fragmento):
+        if len(fragmento) < 3:
+            # Fragmentos muy cortos: solo como prefijo de palabra
+            return self._palabras_con_prefijo(fragmento)
+
+        conjuntos = []
+        for tri in trigramas(fragmento):
+            palabras_tri = self._trigramas.get(tri)
+            if not palabras_tri:
+                return []
+            conjuntos.append(palabras_tri)
+        conjuntos.sort(key=len)
+        candidatas = set(conjuntos[0]).intersection(*conjuntos[1:])
+        return [p for p in candidatas if fragmento in p]
+
+    def _ids_con(self, fragmento):
+        ids = set()
+        for palabra in self._palabras_que_contienen(fragmento):
+            ids |= self._postings[palabra]
+        return ids
+
+    def doc(self, libro_id):
+        """(titulo, autor) normalizados del libro, o None si no está indexado."""
+        return self._docs.get(libro_id)
+
+    def ids_con_prefijos(self, fragmentos):
+        """
+        Ids de los libros que, para cada fragmento, tienen alguna palabra del
+        título o del autor que empieza con él (búsqueda "mientras se escribe").
+        """
+        if not fragmentos:
+            return set()
+        # El fragmento más largo va contra el vocabulario; el resto se chequea por libro
+        primero, *resto = sorted(fragmentos, key=len, reverse=True)
+        with self._lock:
+            ids = set()
+            for palabra in self._palabras_con_prefijo(primero):
+                ids |= self._postings[palabra]
+            for fragmento in resto:
+                ids = {
+                    libro_id for libro_id in ids
+                    if any(p.startswith(fragmento) for doc in self._docs[libro_id] for p in palabras(doc))
+                }
+        return ids
+
+    def buscar(self, consulta, limite=None):
+        """
+        Devuelve los ids de los libros cuyo título o autor contienen todas las
+        palabras de la consulta, ordenados por relevancia.
+        """
+        consulta_n = normalizar(consulta)
+        fragmentos = palabras(consulta_n)
+        if not fragmentos:
+            return []
+
+        with self._lock:
+            # Arrancamos por el fragmento más largo: suele ser el más selectivo
+            fragmentos.sort(key=len, reverse=True)
+            resultado = None
+            for fragmento in fragmentos:
+                ids = self._ids_con(fragmento)
+                resultado = ids if resultado is None else resultado & ids
+                if not resultado:
+                    return []
+            docs = {libro_id: self._docs[libro_id] for libro_id in resultado}
+
+        frase = " ".join(palabras(consulta_n))
+        frase_palabra = " " + frase
+
+        def puntaje(libro_id):
+            titulo_n, autor_n = docs[libro_id]
+            score = 0
+            if titulo_n == frase or autor_n == frase:
+                score += 8
+            if titulo_n.startswith(frase):
+                score += 4
+            elif frase_palabra in titulo_n:
+                score += 3   # la frase arranca una palabra del título
+            elif frase in titulo_n:
+                score += 2
+            if autor_n.startswith(frase) or frase_palabra in autor_n:
+                score += 2
+            elif frase in autor_n:
+                score += 1
+            return (-score, len(titulo_n), libro_id)
+
+        if limite:
+            return heapq.nsmallest(limite, docs, key=puntaje)
+        return sorted(docs, key=puntaje)
+
+
+# ----------------------------------------------------------------------
+# Búsqueda por título/autor en la base (/api/libros/buscar)
+# ----------------------------------------------------------------------
+# En Postgres se apoya en los índices GIN pg_trgm sobre
+# lower(f_unaccent(col)) (migración 31c8f9be01c7); en SQLite u otros motores
+# sin esas extensiones se resuelve en Python con la misma lógica.
+
+def _trigramas_pg(texto):
+    """Trigramas como los arma pg_trgm: cada palabra con 2 espacios adelante y 1 atrás."""
+    resultado = set()
+    for palabra in palabras(texto):
+        palabra = f"  {palabra} "
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+def similitud(a, b):
+    """Equivalente en Python de similarity() de pg_trgm."""
+    ta, tb = _trigramas_pg(a), _trigramas_pg(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def _columna_normalizada(columna):
+    # Misma expresión que los índices: si cambia acá, el planner deja de usarlos
+    return func.lower(func.stock_charles_schema.f_unaccent(columna))
+
+
+def consulta_titulo_autor(titulo_norm, autor_norm, limite):
+    """SELECT para Postgres: filtra con LIKE (servido por el GIN) y ordena por similitud."""
+    condiciones, puntajes = [], []
+    for columna, valor in ((Libro.titulo, titulo_norm), (Libro.autor, autor_norm)):
+        if not valor:
+            continue
+        expr = _columna_normalizada(columna)
+        condiciones.append(expr.like(f"%{valor}%"))
+        puntajes.append(func.public.similarity(expr, valor))
+
+    puntaje = puntajes[0] if len(puntajes) == 1 else func.greatest(*puntajes)
+    return (
+        select(Libro, puntaje.label("score"))
+        .where(or_(*condiciones))
+        .order_by(puntaje.desc(), Libro.id)
+        .limit(limite)
+    )
+
+
+def buscar_titulo_autor(session, titulo, autor, limite=50):
+    """
+    Devuelve [(libro, score)] ordenado de más a menos relevante. Sin título ni
+    autor devuelve todos los libros por id, con score 1 y sin `limite` (como
+    el endpoint antes de los índices de trigramas).
+    """
+    titulo_norm, autor_norm = normalizar(titulo), normalizar(autor)
+    if not titulo_norm and not autor_norm:
+        return [(libro, 1.0) for libro in session.scalars(select(Libro).order_by(Libro.id))]
+
+    if session.get_bind().dialect.name == "postgresql":
+        return [tuple(fila) for fila in session.execute(consulta_titulo_autor(titulo_norm, autor_norm, limite))]
+
+    # Fallback en Python (SQLite en desarrollo/tests)
+    resultados = []
+    for libro in session.query(Libro).yield_per(1000):
+        puntajes = []
+        for valor_libro, valor in ((libro.titulo, titulo_norm), (libro.autor, autor_norm)):
+            if valor:
+                valor_libro = normalizar(valor_libro)
+                if valor in valor_libro:
+                    puntajes.append(similitud(valor_libro, valor))
+        if puntajes:
+            resultados.append((libro, max(puntajes)))
+    resultados.sort(key=lambda r: (-r[1], r[0].id))
+    return resultados[:limite]
@@ -0,0 +1,163 @@
+"""
+Mapa en memoria isbn -> fila de Libro para el escaneo de códigos de barra.
+
+- Se precarga al arrancar (en un hilo aparte) y se mantiene con los commits
+  sobre Libro (controllers/eventos.py), sin ida a la base por escaneo.
+- Los ISBN inexistentes se recuerdan unos segundos (cache negativo), así un
+  lector que repite el mismo código no pega contra la base cada vez.
+- Con varios workers cada proceso tiene su propio mapa; los commits de los
+  demás llegan por controllers/difusion.py, así que las entradas no vencen.
+  `ttl_positivo` (0 = nunca) solo hace falta si la base se toca por fuera
+  de la app.
+- Las filas que trae una carga o una consulta se descartan si sobre ese
+  libro (o ISBN) llegó un commit mientras la consulta estaba en vuelo: cada
+  on_commit anota en qué número de cambio tocó cada id e ISBN.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import select
+
+from controllers import eventos
+from models.libro import Libro
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ("id", "titulo", "autor", "editorial", "isbn", "stock", "precio", "ubicacion")
+
+
+def _consulta():
+    return select(*(getattr(Libro, c) for c in COLUMNAS))
+
+
+class CacheIsbn:
+
+    def __init__(self, ttl_positivo=0, ttl_negativo=5):
+        self.ttl_positivo = ttl_positivo
+        self.ttl_negativo = ttl_negativo
+        self.cargado = False
+        self._lock = threading.Lock()
+        self._filas = {}       # isbn -> (fila, vence)
+        self._isbn_por_id = {}
+        self._negativos = {}   # isbn -> vence
+        self._cambios = 0              # commits aplicados (se incrementa en on_commit)
+        self._cambio_por_id = {}       # id -> número del último cambio que lo tocó
+        self._cambio_por_isbn = {}     # isbn -> ídem
+
+    def _vencimiento(self):
+        return time.monotonic() + self.ttl_positivo if self.ttl_positivo else float("inf")
+
+    def _cambio_desde(self, inicio, libro_id=None, isbn=None):
+        """True si `libro_id` o `isbn` cambió después del cambio número `inicio` (lectura vieja)."""
+        return (self._cambio_por_id.get(libro_id, -1) >= inicio
+                or self._cambio_por_isbn.get(isbn, -1) >= inicio)
+
+    # ------------------------------------------------------------------
+    # Carga y mantenimiento
+    # ------------------------------------------------------------------
+    def cargar(self, session):
+        with self._lock:
+            inicio = self._cambios
+        vence = self._vencimiento()
+        filas = {}
+        for fila in session.execute(_consulta().execution_options(yield_per=5000)):
+            filas[fila.isbn] = (dict(fila._mapping), vence)
+        with self._lock:
+            # Lo que cambió durante la carga ya está aplicado en el mapa anterior: manda ese
+            for isbn, (fila, _) in list(filas.items()):
+                if self._cambio_desde(inicio, fila["id"], isbn):
+                    del filas[isbn]
+            for libro_id, numero in self._cambio_por_id.items():
+                isbn = self._isbn_por_id.get(libro_id)
+                if numero >= inicio and isbn is not None:
+                    filas[isbn] = self._filas[isbn]
+            self._filas = filas
+            self._isbn_por_id = {fila["id"]: isbn for isbn, (fila, _) in filas.items()}
+            self._negativos.clear()
+            self.cargado = True
+        logger.info("Cache de ISBN cargado con %d libros", len(filas))
+
+    def precargar_en_segundo_plano(self, session_factory):
+        def _precargar():
+            session = session_factory()
+            try:
+                self.cargar(session)
+            except Exception:
+                logger.exception("No se pudo precargar el cache de ISBN; se resuelve contra la base")
+            finally:
+                session.close()
+        threading.Thread(target=_precargar, name="precarga-isbn", daemon=True).start()
+
+    def _guardar(self, fila):
+        anterior = self._isbn_por_id.get(fila["id"])
+        if anterior is not None and anterior != fila["isbn"]:
+            self._filas.pop(anterior, None)
+        self._filas[fila["isbn"]] = (fila, self._vencimiento())
+        self._isbn_por_id[fila["id"]] = fila["isbn"]
+        self._negativos.pop(fila["isbn"], None)
+
+    def on_commit(self, accion, datos):
+        """Callback para controllers.eventos: aplica el cambio confirmado."""
+        with self._lock:
+            libro_id = datos["id"]
+            isbn_actual = self._isbn_por_id.get(libro_id)
+            self._cambios += 1
+            self._cambio_por_id[libro_id] = self._cambios
+            for isbn in (isbn_actual, datos.get("isbn")):
+                if isbn is not None:
+                    self._cambio_por_isbn[isbn] = self._cambios
+            if accion == eventos.BAJA:
+                self._isbn_por_id.pop(libro_id, None)
+                if isbn_actual is not None:
+                    self._filas.pop(isbn_actual, None)
+                return
+            if isbn_actual is not None:
+                fila = {**self._filas[isbn_actual][0], **{c: datos[c] for c in COLUMNAS if c in datos}}
+            elif all(c in datos for c in COLUMNAS):
+                fila = {c: datos[c] for c in COLUMNAS}
+            else:
+                # Cambio parcial de un libro que no tenemos: que lo traiga la próxima consulta
+                return
+            self._guardar(fila)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def buscar_varios(self, session, isbns):
+        """Devuelve {isbn: fila} para los ISBN que existen (una sola consulta para los no cacheados)."""
+        ahora = time.monotonic()
+        encontrados, pendientes = {}, []
+        for isbn in isbns:
+            entrada = self._filas.get(isbn)
+            if entrada is not None and entrada[1] > ahora:
+                encontrados[isbn] = entrada[0]
+            elif self._negativos.get(isbn, 0) > ahora:
+                continue
+            else:
+                pendientes.append(isbn)
+
+        if pendientes:
+            with self._lock:
+                inicio = self._cambios
+            filas = session.execute(_consulta().where(Libro.isbn.in_(pendientes))).all()
+            with self._lock:
+                for fila in filas:
+                    fila = dict(fila._mapping)
+                    encontrados[fila["isbn"]] = fila
+                    # Un commit llegó entre el SELECT y acá: el mapa ya tiene algo más nuevo
+                    if not self._cambio_desde(inicio, fila["id"], fila["isbn"]):
+                        self._guardar(fila)
+                vence = ahora + self.ttl_negativo
+                for isbn in pendientes:
+                    if isbn in encontrados or self._cambio_desde(inicio, isbn=isbn):
+                        continue
+                    self._negativos[isbn] = vence
+                    # Si estaba cacheado y ya no existe (lo borró otro worker)
+                    entrada = self._filas.pop(isbn, None)
+                    if entrada is not None:
+                        self._isbn_por_id.pop(entrada[0]["id"], None)
+        return encontrados
+
+    def buscar(self, session, isbn):
+        return self.buscar_varios(session, [isbn]).get(isbn)
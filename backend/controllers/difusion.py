@@ -0,0 +1,156 @@
+"""
+Difusión de commits entre workers con LISTEN/NOTIFY de Postgres.
+
+Con varios procesos (gunicorn, ver gunicorn.conf.py) cada worker tiene sus
+propias estructuras en memoria (IndiceLibros, SugerenciasLibros,
+DiccionarioEditoriales, CacheIsbn) y `controllers/eventos.py` solo ve los
+commits de su proceso. Justo antes de cada COMMIT el worker publica los
+cambios (modelo, accion, datos) en el canal CANAL con pg_notify sobre la
+misma conexión de la transacción, y un hilo por worker los escucha y los
+aplica con `eventos.aplicar_remotos`, salvo los que publicó él mismo.
+
+Postgres entrega el NOTIFY recién cuando la transacción se confirma (y lo
+descarta si hay rollback): el aviso no necesita otra conexión del pool y no
+se pierde aunque el worker muera después del commit. Si el hilo de escucha
+pierde la conexión, lo que llegue durante el corte no se aplica hasta
+reiniciar (el cache de ISBN igual se revalida por TTL).
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, text
+
+from controllers import eventos
+
+logger = logging.getLogger(__name__)
+
+CANAL = "stock_cambios"
+MAXIMO_PAYLOAD = 7500      # Postgres corta en 8000 bytes
+ESPERA_RECONEXION = 5      # segundos
+
+
+def _a_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} no es serializable")
+
+
+class Difusor:
+
+    def __init__(self, engine, modelos):
+        self.engine = engine
+        self._por_tabla = {modelo.__tablename__: modelo for modelo in modelos}
+        self._fechas = {
+            modelo: {
+                c.key: (datetime.fromisoformat if isinstance(c.type, DateTime) else date.fromisoformat)
+                for c in modelo.__table__.columns if isinstance(c.type, (Date, DateTime))
+            }
+            for modelo in modelos
+        }
+        self._pid = None
+        self._conexion = None
+        self.recibidos = 0
+
+    @staticmethod
+    def origen():
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+    def _mensajes(self, cambios):
+        origen = self.origen()
+        lote, tamanio = [], 0
+        for modelo, accion, datos in cambios:
+            if modelo.__tablename__ not in self._por_tabla:
+                continue
+            cambio = json.dumps([modelo.__tablename__, accion, datos], default=_a_json, separators=(",", ":"))
+            if lote and tamanio + len(cambio) > MAXIMO_PAYLOAD:
+                yield f'{{"o":"{origen}","c":[{",".join(lote)}]}}'
+                lote, tamanio = [], 0
+            lote.append(cambio)
+            tamanio += len(cambio) + 1
+        if lote:
+            yield f'{{"o":"{origen}","c":[{",".join(lote)}]}}'
+
+    def publicar(self, session, cambios):
+        """Callback para eventos.publicar_con: en la transacción que se está confirmando."""
+        for mensaje in self._mensajes(cambios):
+            session.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": CANAL, "payload": mensaje})
+
+    # ------------------------------------------------------------------
+    # Escucha
+    # ------------------------------------------------------------------
+    def _decodificar(self, payload):
+        mensaje = json.loads(payload)
+        if mensaje["o"] == self.origen():
+            return []
+        cambios = []
+        for tabla, accion, datos in mensaje["c"]:
+            modelo = self._por_tabla[tabla]
+            for clave, convertir in self._fechas[modelo].items():
+                if datos.get(clave) is not None:
+                    datos[clave] = convertir(datos[clave])
+            cambios.append((modelo, accion, datos))
+        return cambios
+
+    def _recibir(self, payload):
+        try:
+            cambios = self._decodificar(payload)
+        except Exception:
+            logger.exception("Aviso de cambios inválido en %s", CANAL)
+            return
+        if cambios:
+            self.recibidos += len(cambios)
+            eventos.aplicar_remotos(cambios)
+
+    def _escuchar(self):
+        conectado_antes = False
+        while True:
+            try:
+                conexion = self.engine.raw_connection()
+                conexion.detach()   # la conexión queda fuera del pool mientras viva el worker
+                self._conexion = pg = conexion.driver_connection
+                pg.autocommit = True
+                with pg.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CANAL}")
+                if conectado_antes:
+                    logger.warning("Escucha de %s reconectada: los cambios de otros workers "
+                                   "durante el corte no se aplicaron", CANAL)
+                conectado_antes = True
+                while True:
+                    if select.select([pg], [], [], 60) == ([], [], []):
+                        continue
+                    pg.poll()
+                    while pg.notifies:
+                        self._recibir(pg.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Se cortó la escucha de %s; reintento en %ss", CANAL, ESPERA_RECONEXION)
+                try:
+                    self._conexion.close()
+                except Exception:
+                    pass
+                time.sleep(ESPERA_RECONEXION)
+
+    def iniciar(self):
+        """Arranca el hilo de escucha de este proceso (una vez por worker)."""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._escuchar, name="difusion-cambios", daemon=True).start()
+
+
+def instalar(app, engine, modelos):
+    """Solo con Postgres; con SQLite (desarrollo, un proceso) no hace falta."""
+    app.difusion = None
+    if engine.dialect.name != "postgresql":
+        return None
+    app.difusion = Difusor(engine, modelos)
+    eventos.publicar_con(app.difusion.publicar)
+    return app.difusion
@@ -0,0 +1,163 @@
+"""
+Diccionario en memoria de editoriales para los formularios (/api/editoriales).
+
+- Se arma una sola vez al arrancar (en un hilo aparte) con id -> editorial y
+  un contador de libros por editorial.
+- Los commits sobre Libro (controllers/eventos.py) ajustan los contadores:
+  cuando una editorial llega a 0 libros sale de la lista, y una nueva entra
+  en su lugar con insort, sin volver a ordenar.
+- La lista se mantiene ordenada por la editorial normalizada (unidecode +
+  minúsculas), así el autocompletado por prefijo es un bisect.
+- Los commits que llegan durante la carga se guardan y se aplican al
+  terminarla (como en controllers/busqueda.py).
+"""
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+
+from sqlalchemy import select
+
+from controllers import eventos
+from controllers.busqueda import normalizar
+from models.libro import Libro
+
+logger = logging.getLogger(__name__)
+
+
+class DiccionarioEditoriales:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.cargado = False
+        # Commits recibidos durante la carga (un lock aparte: el commit no espera a la carga)
+        self._lock_pendientes = threading.Lock()
+        self._cargando = False
+        self._pendientes = []
+        self._por_id = {}      # libro_id -> editorial
+        self._conteos = {}     # editorial -> cantidad de libros
+        self._ordenadas = []   # [(editorial normalizada, editorial)]
+
+    # ------------------------------------------------------------------
+    # Carga y mantenimiento
+    # ------------------------------------------------------------------
+    def cargar(self, filas):
+        """`filas` es un iterable de (id, editorial)."""
+        with self._lock:
+            with self._lock_pendientes:
+                self.cargado = False
+                self._cargando = True
+            try:
+                por_id, conteos, canonicas = {}, {}, {}
+                for libro_id, editorial in filas:
+                    if not editorial:
+                        continue
+                    # Una sola instancia de cada string aunque la repitan miles de libros
+                    editorial = canonicas.setdefault(editorial, editorial)
+                    conteos[editorial] = conteos.get(editorial, 0) + 1
+                    por_id[libro_id] = editorial
+                self._por_id = por_id
+                self._conteos = conteos
+                self._ordenadas = sorted((normalizar(e), e) for e in conteos)
+                self._aplicar_pendientes()
+            finally:
+                with self._lock_pendientes:
+                    self._cargando = False
+                    self._pendientes = []
+        logger.info("Diccionario de editoriales cargado con %d editoriales", len(self._conteos))
+
+    def _aplicar_pendientes(self):
+        # Repetir un cambio que la carga ya había leído no cambia nada
+        while True:
+            with self._lock_pendientes:
+                pendientes, self._pendientes = self._pendientes, []
+                if not pendientes:
+                    self.cargado = True
+                    return
+            for accion, datos in pendientes:
+                self._aplicar(accion, datos)
+
+    def asegurar_cargado(self, session):
+        if self.cargado:
+            return
+        with self._lock:
+            if not self.cargado:
+                self.cargar(session.execute(
+                    select(Libro.id, Libro.editorial).execution_options(yield_per=5000)
+                ))
+
+    def precargar_en_segundo_plano(self, session_factory):
+        def _precargar():
+            session = session_factory()
+            try:
+                self.asegurar_cargado(session)
+            except Exception:
+                logger.exception("No se pudo precargar el diccionario de editoriales")
+            finally:
+                session.close()
+        threading.Thread(target=_precargar, name="precarga-editoriales", daemon=True).start()
+
+    def _sumar(self, editorial):
+        cantidad = self._conteos.get(editorial, 0)
+        if cantidad == 0:
+            insort(self._ordenadas, (normalizar(editorial), editorial))
+        self._conteos[editorial] = cantidad + 1
+
+    def _restar(self, editorial):
+        cantidad = self._conteos.get(editorial, 0) - 1
+        if cantidad > 0:
+            self._conteos[editorial] = cantidad
+            return
+        self._conteos.pop(editorial, None)
+        entrada = (normalizar(editorial), editorial)
+        pos = bisect_left(self._ordenadas, entrada)
+        if pos < len(self._ordenadas) and self._ordenadas[pos] == entrada:
+            del self._ordenadas[pos]
+
+    def on_commit(self, accion, datos):
+        """Callback para controllers.eventos: aplica el cambio confirmado."""
+        with self._lock_pendientes:
+            if not self.cargado:
+                if self._cargando:
+                    self._pendientes.append((accion, datos))
+                return   # sin carga en curso: la próxima carga ya lee el estado confirmado
+        self._aplicar(accion, datos)
+
+    def _aplicar(self, accion, datos):
+        libro_id = datos["id"]
+        with self._lock:
+            if accion != eventos.BAJA and "editorial" not in datos:
+                return   # cambio parcial (stock, precio...) que no toca la editorial
+            anterior = self._por_id.pop(libro_id, None)
+            nueva = None if accion == eventos.BAJA else (datos["editorial"] or None)
+            if anterior == nueva:
+                if nueva:
+                    self._por_id[libro_id] = nueva
+                return
+            if anterior:
+                self._restar(anterior)
+            if nueva:
+                self._sumar(nueva)
+                self._por_id[libro_id] = nueva
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def todas(self):
+        with self._lock:
+            return [editorial for _, editorial in self._ordenadas]
+
+    def buscar(self, prefijo, limite=10):
+        """
+        Editoriales cuyo nombre normalizado empieza con `prefijo`, las que
+        tienen más libros primero.
+        """
+        prefijo = normalizar(prefijo)
+        with self._lock:
+            pos = bisect_left(self._ordenadas, (prefijo,))
+            candidatas = []
+            while pos < len(self._ordenadas) and self._ordenadas[pos][0].startswith(prefijo):
+                editorial = self._ordenadas[pos][1]
+                candidatas.append((-self._conteos[editorial], pos, editorial))
+                pos += 1
+        return [editorial for _, _, editorial in heapq.nsmallest(limite, candidatas)]
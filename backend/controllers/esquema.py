@@ -0,0 +1,152 @@
+"""
+Esquema de la base frente a las migraciones de migrations/versions.
+
+La app no crea tablas al importarse: el esquema se arma y se actualiza con
+    flask --app app preparar-base
+que corre en cada deploy antes de levantar el servidor (release del
+Procfile, startCommand de render.yaml / nixpacks.toml):
+    - base vacía: schema + tablas (create_all) + lo que create_all no sabe
+      crear (extensiones, f_unaccent e índices de trigramas de la migración
+      31c8f9be01c7) + alembic_version en la última migración;
+    - base creada por el create_all que hacía la app al arrancar (tablas sin
+      alembic_version): stamp REVISION_CREATE_ALL + upgrade;
+    - base migrada: upgrade (no hace nada si ya está al día).
+
+gunicorn (on_starting) y asgi.py (lifespan) no arrancan si la base quedó
+atrás de la última migración (`exigir_al_dia`); con `python app.py` solo se
+avisa en el log, en un hilo aparte. Las revisiones se leen de los archivos
+con una regex, sin importar alembic (que tarda más que todo el arranque de
+la app).
+"""
+import logging
+import os
+import re
+import threading
+from glob import glob
+
+from sqlalchemy import inspect, text
+
+from models.libro import Base
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "stock_charles_schema"
+VERSIONES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations", "versions")
+
+# Hasta esta revisión el esquema lo armaba create_all al arrancar la app; las
+# migraciones siguientes tienen en cuenta que sus tablas ya pueden existir
+REVISION_CREATE_ALL = "c4d97dbef3fb"
+
+# Lo mismo que crea la migración 31c8f9be01c7 para /api/libros/buscar (ver controllers/busqueda.py)
+_DDL_BUSQUEDA_POSTGRES = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA public",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public",
+    f"""
+    CREATE OR REPLACE FUNCTION {SCHEMA}.f_unaccent(text)
+    RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_libros_titulo_trgm ON {SCHEMA}.libros
+    USING gin (lower({SCHEMA}.f_unaccent(titulo)) public.gin_trgm_ops)
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_libros_autor_trgm ON {SCHEMA}.libros
+    USING gin (lower({SCHEMA}.f_unaccent(autor)) public.gin_trgm_ops)
+    """,
+)
+
+_REVISION = re.compile(r"^revision\s*=\s*['\"](\w+)['\"]", re.M)
+_ANTERIOR = re.compile(r"^down_revision\s*=\s*(.+)$", re.M)
+
+
+def heads(directorio=VERSIONES):
+    """Revisiones de las que no depende ninguna otra (normalmente una)."""
+    revisiones, anteriores = set(), set()
+    for archivo in glob(os.path.join(directorio, "*.py")):
+        with open(archivo, encoding="utf-8") as f:
+            codigo = f.read()
+        revision = _REVISION.search(codigo)
+        if revision:
+            revisiones.add(revision.group(1))
+        anterior = _ANTERIOR.search(codigo)
+        if anterior:
+            anteriores.update(re.findall(r"['\"](\w+)['\"]", anterior.group(1)))
+    return revisiones - anteriores
+
+
+def revisiones_en_base(conn):
+    """Contenido de alembic_version, o None si la base nunca se migró."""
+    if not inspect(conn).has_table("alembic_version"):
+        return None
+    return {fila[0] for fila in conn.execute(text("SELECT version_num FROM alembic_version"))}
+
+
+def verificar(engine):
+    """Devuelve (revisiones en la base, heads de migrations/versions)."""
+    with engine.connect() as conn:
+        return revisiones_en_base(conn), heads()
+
+
+class EsquemaDesactualizado(RuntimeError):
+    pass
+
+
+def _mensaje(en_base, ultimas):
+    return (
+        f"La base está en la revisión {', '.join(sorted(en_base)) if en_base else 'ninguna'} "
+        f"y las migraciones en {', '.join(sorted(ultimas))}: correr `flask --app app preparar-base`"
+    )
+
+
+def exigir_al_dia(engine):
+    """Lanza EsquemaDesactualizado si la base no está en la última migración."""
+    en_base, ultimas = verificar(engine)
+    if en_base != ultimas:
+        raise EsquemaDesactualizado(_mensaje(en_base, ultimas))
+
+
+def verificar_en_segundo_plano(engine):
+    def _verificar():
+        try:
+            en_base, ultimas = verificar(engine)
+        except Exception:
+            logger.exception("No se pudo verificar la versión del esquema")
+            return
+        if en_base != ultimas:
+            logger.error(_mensaje(en_base, ultimas))
+    threading.Thread(target=_verificar, name="verificar-esquema", daemon=True).start()
+
+
+def marcar(conn, revisiones):
+    """Lo mismo que `flask db stamp`, sin importar alembic."""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL, "
+        "CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))"
+    ))
+    conn.execute(text("DELETE FROM alembic_version"))
+    for revision in sorted(revisiones):
+        conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:r)"), {"r": revision})
+
+
+def preparar_base(engine):
+    """
+    Si la base no tiene ninguna tabla de la app, crea el schema, las tablas
+    (create_all) y los objetos de búsqueda de Postgres, la marca en la última
+    migración y devuelve "creada". Si no, no toca nada y devuelve "migrada" o
+    "sin_version" (tablas del create_all de antes, sin alembic_version: se
+    marca REVISION_CREATE_ALL y se migra).
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+        existentes = set(inspect(conn).get_table_names(schema=SCHEMA))
+        if not existentes & {tabla.name for tabla in Base.metadata.sorted_tables}:
+            Base.metadata.create_all(conn)
+            if engine.dialect.name == "postgresql":
+                for sentencia in _DDL_BUSQUEDA_POSTGRES:
+                    conn.execute(text(sentencia))
+            marcar(conn, heads())
+            return "creada"
+        return "migrada" if revisiones_en_base(conn) else "sin_version"
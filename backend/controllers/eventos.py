@@ -0,0 +1,148 @@
+"""
+Hooks de sesión para mantener sincronizadas las estructuras en memoria
+(índices, caches) con lo que realmente se confirma en la base.
+
+Los cambios se juntan en `after_flush` y recién se despachan en `after_commit`,
+así un rollback nunca deja un índice apuntando a filas que no existen. Lo que
+tiene que grabarse junto con los datos (versiones de tabla, el NOTIFY a los
+otros workers) corre en `before_commit`, dentro de la misma transacción.
+"""
+import logging
+from collections import defaultdict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+ALTA = "alta"
+MODIFICACION = "modificacion"
+BAJA = "baja"
+
+_suscriptores = defaultdict(list)   # modelo -> [callback(accion, datos)]
+_antes_de_commit = []               # [(modelos, callback(session, modelos tocados))]
+_publicadores = []                  # [callback(session, cambios)] (ver controllers/difusion.py)
+_instalado = False
+
+
+def suscribir(modelo, callback):
+    """Registra `callback(accion, datos)` para los commits que tocan `modelo`."""
+    _suscriptores[modelo].append(callback)
+
+
+def suscribir_antes_de_commit(modelos, callback):
+    """
+    Registra `callback(session, tocados)` que se llama una sola vez por commit,
+    dentro de la transacción y justo antes del COMMIT, con el conjunto de
+    `modelos` que ese commit modificó (útil para versiones de tabla, donde mil
+    filas importadas cuentan como un único cambio). Lo que escriba se confirma
+    o se descarta junto con los datos; si falla, el commit falla. Si devuelve
+    una función, se llama después del commit (nunca tras un rollback).
+    """
+    modelos = frozenset(modelos)
+    for modelo in modelos:
+        _suscriptores[modelo]   # así _after_flush junta los cambios de estos modelos
+    _antes_de_commit.append((modelos, callback))
+
+
+def publicar_con(callback):
+    """
+    Registra `callback(session, cambios)` que recibe, justo antes de cada
+    COMMIT y dentro de la transacción, la lista de (modelo, accion, datos)
+    que se va a confirmar, para reenviarla a otros procesos. Como los
+    callbacks de suscribir_antes_de_commit: si falla, el commit falla.
+    """
+    _publicadores.append(callback)
+
+
+def registrar_cambio(session, modelo, accion, datos):
+    """
+    Anota un cambio hecho por fuera del ORM (UPDATE/INSERT de Core) para que
+    se despache junto con el resto en el próximo commit de la sesión.
+    `datos` puede ser parcial en una MODIFICACION (por ejemplo solo id y stock).
+    """
+    session.info.setdefault("cambios_pendientes", []).append((modelo, accion, datos))
+
+
+def _columnas(obj):
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _after_flush(session, flush_context):
+    for obj, accion in (
+        *((o, ALTA) for o in session.new),
+        *((o, MODIFICACION) for o in session.dirty),
+        *((o, BAJA) for o in session.deleted),
+    ):
+        modelo = type(obj)
+        if modelo not in _suscriptores:
+            continue
+        if accion == MODIFICACION and not session.is_modified(obj, include_collections=False):
+            continue
+        registrar_cambio(session, modelo, accion, _columnas(obj))
+
+
+def _notificar(cambios):
+    for modelo, accion, datos in cambios:
+        for callback in _suscriptores.get(modelo, ()):
+            try:
+                callback(accion, datos)
+            except Exception:
+                # Un índice desactualizado no tiene que romper la respuesta del endpoint
+                logger.exception("Error sincronizando %s tras el commit", modelo.__name__)
+
+
+def aplicar_remotos(cambios):
+    """
+    Aplica cambios confirmados por otro proceso (otro worker): solo los
+    suscriptores por modelo; las versiones de tabla ya las grabó quien hizo
+    el commit y no se vuelven a publicar.
+    """
+    _notificar([c for c in cambios if c[0] in _suscriptores])
+
+
+def _before_commit(session):
+    if not _antes_de_commit and not _publicadores:
+        return
+    session.flush()   # lo que el ORM todavía no mandó también cuenta como tocado
+    cambios = session.info.get("cambios_pendientes")
+    if not cambios:
+        return
+    for callback in _publicadores:
+        callback(session, cambios)
+    # Lo último antes del COMMIT: las filas que bloquean (versiones) quedan tomadas lo menos posible
+    tocados = {modelo for modelo, _, _ in cambios}
+    for modelos, callback in _antes_de_commit:
+        if modelos & tocados:
+            despues = callback(session, modelos & tocados)
+            if despues is not None:
+                session.info.setdefault("tras_commit", []).append(despues)
+
+
+def _after_commit(session):
+    tras_commit = session.info.pop("tras_commit", ())
+    cambios = session.info.pop("cambios_pendientes", None)
+    for callback in tras_commit:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Error después del commit en %r", callback)
+    if cambios:
+        _notificar(cambios)
+
+
+def _after_rollback(session):
+    session.info.pop("cambios_pendientes", None)
+    session.info.pop("tras_commit", None)
+
+
+def instalar():
+    """Engancha los listeners a todas las sesiones (incluida la de Flask-Admin)."""
+    global _instalado
+    if _instalado:
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    _instalado = True
@@ -0,0 +1,138 @@
+"""
+Exportación masiva de libros y libros_bajas en CSV, NDJSON o columnar.
+
+Todo sale de un cursor del servidor (yield_per) y se escribe de a bloques,
+así exportar años de movimientos usa memoria constante. Las filas se
+ordenan por id: si una descarga se corta, se retoma con cursor=<último id>.
+
+El formato "columnar" es NDJSON por bloques de columnas (estilo row groups
+de Parquet): una primera línea con los nombres de columna y después una
+línea por bloque con una lista de valores por columna.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from models.libro import Libro, LibroBaja
+
+TAMANIO_BLOQUE = 5000
+
+# tabla -> (modelo, columna de fecha para desde/hasta)
+TABLAS = {
+    "libros": (Libro, Libro.fecha_alta),
+    "libros_bajas": (LibroBaja, LibroBaja.fecha_baja),
+}
+
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "columnar": ("application/x-ndjson", "columnar.ndjson"),
+}
+
+
+class ErrorExportacion(ValueError):
+    pass
+
+
+def parsear_fecha(valor, fin_de_rango=False):
+    """Acepta YYYY-MM-DD o ISO completo. Con solo fecha, `hasta` incluye ese día entero."""
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise ErrorExportacion(f"Fecha inválida: {valor!r} (usar YYYY-MM-DD)")
+    if fin_de_rango and len(valor) == 10:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+def armar_consulta(tabla, columnas=None, desde=None, hasta=None, cursor=None):
+    if tabla not in TABLAS:
+        raise ErrorExportacion(f"Tabla inválida: {tabla!r} (opciones: {', '.join(TABLAS)})")
+    modelo, columna_fecha = TABLAS[tabla]
+    disponibles = modelo.__table__.c
+
+    nombres = columnas or list(disponibles.keys())
+    invalidas = [c for c in nombres if c not in disponibles]
+    if invalidas:
+        raise ErrorExportacion(f"Columnas inválidas: {', '.join(invalidas)}")
+    if "id" not in nombres:
+        nombres = ["id", *nombres]   # hace falta para poder retomar
+
+    consulta = select(*(disponibles[c] for c in nombres)).order_by(disponibles.id)
+    if desde:
+        consulta = consulta.where(columna_fecha >= desde)
+    if hasta:
+        consulta = consulta.where(columna_fecha < hasta)
+    if cursor:
+        consulta = consulta.where(disponibles.id > cursor)
+    return consulta.execution_options(yield_per=TAMANIO_BLOQUE), nombres
+
+
+def _valor(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _bloques(filas, tamanio=TAMANIO_BLOQUE):
+    bloque = []
+    for fila in filas:
+        bloque.append(tuple(_valor(v) for v in fila))
+        if len(bloque) >= tamanio:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def _csv(filas, nombres):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(nombres)
+    for bloque in _bloques(filas):
+        escritor.writerows(bloque)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson(filas, nombres):
+    for bloque in _bloques(filas):
+        yield "".join(json.dumps(dict(zip(nombres, fila)), ensure_ascii=False) + "\n" for fila in bloque)
+
+
+def _columnar(filas, nombres):
+    yield json.dumps({"columnas": nombres}, ensure_ascii=False) + "\n"
+    for bloque in _bloques(filas):
+        columnas = dict(zip(nombres, (list(col) for col in zip(*bloque))))
+        yield json.dumps({"filas": len(bloque), **columnas}, ensure_ascii=False) + "\n"
+
+
+def _gzip(bloques):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits=31 -> formato gzip
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque.encode("utf-8"))
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def generar(filas, nombres, formato="csv", comprimir=False):
+    """Itera los pedazos (str, o bytes si `comprimir`) del archivo exportado."""
+    if formato not in FORMATOS:
+        raise ErrorExportacion(f"Formato inválido: {formato!r} (opciones: {', '.join(FORMATOS)})")
+    codificador = {"csv": _csv, "ndjson": _ndjson, "columnar": _columnar}[formato]
+    bloques = codificador(filas, nombres)
+    return _gzip(bloques) if comprimir else bloques
+
+
+def nombre_archivo(tabla, formato, comprimir=False):
+    return f"{tabla}.{FORMATOS[formato][1]}" + (".gz" if comprimir else "")
@@ -0,0 +1,145 @@
+"""
+Importación masiva del catálogo (listas de proveedores) desde CSV o NDJSON.
+
+Las filas se leen de a una desde el stream, se validan con las mismas reglas
+que POST /libros y se guardan por lotes con un único
+    INSERT ... ON CONFLICT (isbn) DO UPDATE ... RETURNING
+por lote, en lugar de un SELECT + commit por libro.
+"""
+import csv
+import io
+import json
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from controllers import eventos
+from models.libro import Libro
+
+TAMANIO_LOTE = 1000
+CAMPOS_ACTUALIZABLES = ("titulo", "autor", "editorial", "stock", "precio", "ubicacion")
+COLUMNAS_DEVUELTAS = ("id", "isbn", *CAMPOS_ACTUALIZABLES)
+
+
+def _texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+
+def _largo_maximo(campo):
+    return Libro.__table__.c[campo].type.length
+
+
+def validar_fila(data):
+    """Devuelve (fila, None) si es válida o (None, mensaje de error)."""
+    fila = {campo: _texto(data.get(campo)) for campo in ("titulo", "autor", "editorial", "isbn", "ubicacion")}
+
+    if not fila["titulo"] or not fila["autor"]:
+        return None, "Faltan campos obligatorios (titulo o autor)"
+    if not fila["isbn"]:
+        return None, "El ISBN es obligatorio"
+    if not fila["ubicacion"]:
+        return None, "La ubicación es obligatoria"
+    for campo, valor in fila.items():
+        if len(valor) > _largo_maximo(campo):
+            return None, f"{campo} supera los {_largo_maximo(campo)} caracteres"
+    fila["editorial"] = fila["editorial"] or None
+
+    precio = data.get("precio")
+    try:
+        fila["precio"] = float(precio) if precio not in (None, "", "null") else None
+    except (TypeError, ValueError):
+        return None, f"Precio inválido: {precio!r}"
+    if fila["precio"] is None and not Libro.__table__.c.precio.nullable:
+        return None, "El precio es obligatorio"
+
+    stock = data.get("stock")
+    try:
+        fila["stock"] = int(stock) if stock not in (None, "") else 0
+    except (TypeError, ValueError):
+        return None, f"Stock inválido: {stock!r}"
+    if fila["stock"] < 0:
+        return None, "El stock no puede ser negativo"
+
+    return fila, None
+
+
+def leer_filas(stream, formato):
+    """Itera dicts desde un stream binario CSV (con encabezado) o NDJSON."""
+    texto = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        yield from csv.DictReader(texto)
+        return
+    for linea in texto:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError as e:
+            yield {"__error__": f"JSON inválido: {e}"}
+
+
+def _upsert(dialecto):
+    # Sin .values(): se ejecuta como executemany, que SQLAlchemy agrupa en INSERTs
+    # multi-fila ("insertmanyvalues") reutilizando la sentencia compilada
+    modulo = postgresql if dialecto == "postgresql" else sqlite
+    stmt = modulo.insert(Libro.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[Libro.__table__.c.isbn],
+        set_={campo: stmt.excluded[campo] for campo in CAMPOS_ACTUALIZABLES},
+    ).returning(*(Libro.__table__.c[c] for c in COLUMNAS_DEVUELTAS))
+
+
+def _guardar_lote(session, lote, reporte):
+    # Si el mismo ISBN viene dos veces en el lote queda la última aparición
+    # (ON CONFLICT no puede tocar la misma fila dos veces en una sentencia)
+    por_isbn = {}
+    for numero, fila in lote:
+        por_isbn[fila["isbn"]] = (numero, fila)
+    for numero, fila in lote:
+        usada = por_isbn[fila["isbn"]][0]
+        if usada != numero:
+            reporte["errores"].append({
+                "fila": numero, "isbn": fila["isbn"],
+                "error": f"ISBN repetido en el archivo, se usó la fila {usada}",
+            })
+    try:
+        resultado = session.execute(
+            _upsert(session.get_bind().dialect.name), [fila for _, fila in por_isbn.values()]
+        )
+        for fila in resultado:
+            # Para que el índice de búsqueda y el cache de ISBN se enteren en el commit
+            eventos.registrar_cambio(session, Libro, eventos.MODIFICACION, dict(fila._mapping))
+        session.commit()
+        reporte["importadas"] += len(por_isbn)
+    except SQLAlchemyError as e:
+        session.rollback()
+        mensaje = str(e.orig if getattr(e, "orig", None) else e).splitlines()[0]
+        reporte["errores"].extend({"fila": numero, "error": mensaje} for numero, _ in por_isbn.values())
+
+
+def importar(session, filas, tamanio_lote=TAMANIO_LOTE):
+    """
+    Valida y hace upsert de `filas` por lotes. Cada lote se confirma por separado,
+    así un error de base solo invalida las filas de su lote.
+    """
+    reporte = {"procesadas": 0, "importadas": 0, "errores": []}
+    lote = []
+    for numero, data in enumerate(filas, start=1):
+        reporte["procesadas"] += 1
+        if not isinstance(data, dict) or "__error__" in data:
+            error = data.get("__error__") if isinstance(data, dict) else "La fila no es un objeto"
+            reporte["errores"].append({"fila": numero, "error": error})
+            continue
+        fila, error = validar_fila(data)
+        if error:
+            reporte["errores"].append({"fila": numero, "isbn": _texto(data.get("isbn")) or None, "error": error})
+            continue
+        lote.append((numero, fila))
+        if len(lote) >= tamanio_lote:
+            _guardar_lote(session, lote, reporte)
+            lote = []
+    if lote:
+        _guardar_lote(session, lote, reporte)
+    reporte["con_error"] = len(reporte["errores"])
+    return reporte
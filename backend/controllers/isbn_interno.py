@@ -0,0 +1,91 @@
+"""
+Asignador de códigos internos de 5 dígitos para libros sin ISBN (/generar-isbn).
+
+Cada worker reserva un bloque de códigos con un único
+    UPDATE contadores SET valor = valor + :bloque ... RETURNING valor
+(la fila queda bloqueada durante el UPDATE, así dos workers nunca reciben el
+mismo bloque) y después los entrega desde memoria sin tocar la base.
+
+El UPDATE solo suma si el bloque entra hasta MAXIMO (99999); si no entra
+entero se reserva lo que queda, y sin códigos libres `siguiente` levanta
+CodigosAgotados.
+"""
+import threading
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.libro import Contador, Libro
+
+NOMBRE_CONTADOR = "isbn_interno"
+DIGITOS = 5
+MAXIMO = 10 ** DIGITOS - 1
+
+
+class CodigosAgotados(RuntimeError):
+    """Ya se entregaron todos los códigos internos de DIGITOS dígitos."""
+
+
+def formatear(numero):
+    return f"{numero:0{DIGITOS}d}"
+
+
+class AsignadorIsbn:
+
+    def __init__(self, engine, tamanio_bloque=20):
+        self.engine = engine
+        self.tamanio_bloque = tamanio_bloque
+        self._lock = threading.Lock()
+        self._disponibles = []
+
+    def _ultimo_codigo_existente(self, conn):
+        # Comparación numérica en Python: ORDER BY isbn sobre el string no sirve
+        codigos = conn.execute(select(Libro.isbn).where(Libro.isbn.like("_" * DIGITOS))).scalars()
+        return max((int(c) for c in codigos if c.isdigit()), default=0)
+
+    def _sumar(self, cantidad):
+        """Reserva `cantidad` códigos y devuelve el último, o None si no entran (o no hay contador)."""
+        reservar = (
+            update(Contador)
+            .where(Contador.nombre == NOMBRE_CONTADOR, Contador.valor + cantidad <= MAXIMO)
+            .values(valor=Contador.valor + cantidad)
+            .returning(Contador.valor)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(reservar).scalar()
+
+    def _reservar_bloque(self):
+        cantidad = self.tamanio_bloque
+        while (hasta := self._sumar(cantidad)) is None:
+            with self.engine.connect() as conn:
+                valor = conn.execute(select(Contador.valor).where(Contador.nombre == NOMBRE_CONTADOR)).scalar()
+            if valor is None:
+                # Primera vez (base creada con create_all): arrancamos desde el último código usado
+                try:
+                    with self.engine.begin() as conn:
+                        conn.execute(insert(Contador).values(
+                            nombre=NOMBRE_CONTADOR, valor=self._ultimo_codigo_existente(conn)
+                        ))
+                except IntegrityError:
+                    pass  # otro worker lo creó al mismo tiempo
+                continue
+            # El bloque no entra entero: lo que queda hasta MAXIMO
+            cantidad = min(self.tamanio_bloque, MAXIMO - valor)
+            if cantidad <= 0:
+                raise CodigosAgotados(
+                    f"No quedan códigos internos libres: ya se usaron todos hasta {formatear(MAXIMO)}"
+                )
+
+        desde = hasta - cantidad + 1
+        with self.engine.connect() as conn:
+            # Salteamos códigos del bloque que alguien haya cargado a mano
+            usados = set(conn.execute(
+                select(Libro.isbn).where(Libro.isbn.in_([formatear(n) for n in range(desde, hasta + 1)]))
+            ).scalars())
+        return [formatear(n) for n in range(hasta, desde - 1, -1) if formatear(n) not in usados]
+
+    def siguiente(self):
+        with self._lock:
+            while not self._disponibles:
+                self._disponibles = self._reservar_bloque()
+            return self._disponibles.pop()
@@ -0,0 +1,244 @@
+"""
+Métricas por endpoint en formato de texto de Prometheus (GET /metrics).
+
+Por cada request de la app Flask se registra, con el nombre de la vista
+(`obtener_libros`, `crear_libro`, `marcar_baja`...):
+    - la latencia (histograma) y la cantidad de requests por código de estado;
+    - cuántas sentencias SQL ejecutó y cuánto tiempo pasó esperando a la base,
+      medido con los eventos before/after_cursor_execute de cada engine;
+    - posibles N+1: la misma sentencia (mismo SQL, otros parámetros) ejecutada
+      `umbral_n_mas_1` veces o más en un mismo request. Se cuenta en
+      stock_sql_n_mas_1_total y se avisa en el log una vez por vista y sentencia.
+
+La latencia va desde el primer before_request hasta que la vista devuelve la
+respuesta: en las respuestas en streaming no incluye el envío del cuerpo.
+Las sentencias que corren fuera de un request (precargas, hilos) no se
+cuentan. Las rutas asíncronas de asgi.py no pasan por acá.
+
+Cada proceso tiene sus propios contadores: con varios workers de gunicorn
+cada scrape ve los de uno solo (el label `proceso` los distingue).
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import Response, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "stock"
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SENTENCIAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIN_RUTA = "sin_ruta"   # 404 y métodos no permitidos: no se abren series por URL
+
+_request_actual = ContextVar("metricas_request", default=None)
+
+
+class Histograma:
+    """Buckets acumulados + suma + cantidad por combinación de labels."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observar(self, labels, valor):
+        serie = self._series.get(labels)
+        if serie is None:
+            serie = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        indice = bisect.bisect_left(self.buckets, valor)
+        if indice < len(self.buckets):
+            serie[0][indice] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def lineas(self, nombre, claves, extra):
+        for labels, (cuentas, suma, cantidad) in sorted(self._series.items()):
+            base = f"{_labels(claves, labels)},{extra}"
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets, cuentas):
+                acumulado += cuenta
+                yield f'{nombre}_bucket{{{base},le="{_numero(limite)}"}} {acumulado}'
+            yield f'{nombre}_bucket{{{base},le="+Inf"}} {cantidad}'
+            yield f"{nombre}_sum{{{base}}} {_numero(suma)}"
+            yield f"{nombre}_count{{{base}}} {cantidad}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(claves, valores):
+    return ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in zip(claves, valores))
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Request:
+    __slots__ = ("inicio", "sentencias", "tiempo_sql", "repetidas", "estado")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sentencias = 0
+        self.tiempo_sql = 0.0
+        self.repetidas = {}   # SQL -> veces en este request
+        self.estado = 500
+
+
+class MetricasRequests:
+
+    def __init__(self, umbral_n_mas_1=5):
+        self.umbral_n_mas_1 = umbral_n_mas_1
+        self._lock = threading.Lock()
+        self._limpiar()
+
+    def _limpiar(self):
+        self.proceso = str(os.getpid())
+        self._latencia = Histograma(BUCKETS_LATENCIA)
+        self._sentencias = Histograma(BUCKETS_SENTENCIAS)
+        self._requests = {}          # (vista, método, estado) -> cantidad
+        self._tiempo_sql = {}        # (vista, método) -> segundos
+        self._n_mas_1 = {}           # (vista, método) -> requests con N+1
+        self._avisados = set()       # (vista, SQL) ya logueados
+
+    def reiniciar(self):
+        """Después de un fork: cada worker arranca de cero con su propio pid."""
+        with self._lock:
+            self._limpiar()
+
+    # ------------------------------------------------------------
+    # Request
+
+    def empezar(self):
+        _request_actual.set(_Request())
+
+    def terminar(self, vista, metodo):
+        actual = _request_actual.get()
+        if actual is None:
+            return
+        _request_actual.set(None)
+        duracion = time.perf_counter() - actual.inicio
+        claves = (vista or SIN_RUTA, metodo)
+        repetidas = [(sql, n) for sql, n in actual.repetidas.items() if n >= self.umbral_n_mas_1]
+
+        with self._lock:
+            self._latencia.observar(claves, duracion)
+            self._sentencias.observar(claves, actual.sentencias)
+            clave_estado = claves + (actual.estado,)
+            self._requests[clave_estado] = self._requests.get(clave_estado, 0) + 1
+            self._tiempo_sql[claves] = self._tiempo_sql.get(claves, 0.0) + actual.tiempo_sql
+            if repetidas:
+                self._n_mas_1[claves] = self._n_mas_1.get(claves, 0) + 1
+            nuevas = [(sql, n) for sql, n in repetidas if (claves[0], sql) not in self._avisados]
+            self._avisados.update((claves[0], sql) for sql, _ in nuevas)
+
+        for sql, veces in nuevas:
+            logger.warning("Posible N+1 en %s %s: la misma sentencia %d veces en un request: %s",
+                           metodo, claves[0], veces, " ".join(sql.split())[:300])
+
+    # ------------------------------------------------------------
+    # SQL
+
+    def instalar_en(self, engine):
+        event.listen(engine, "before_cursor_execute", self._antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", self._despues_de_ejecutar)
+
+    @staticmethod
+    def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        if _request_actual.get() is not None:
+            conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @staticmethod
+    def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        actual = _request_actual.get()
+        inicios = conn.info.get("metricas_inicio")
+        if actual is None or not inicios:
+            return
+        actual.tiempo_sql += time.perf_counter() - inicios.pop()
+        actual.sentencias += 1
+        actual.repetidas[statement] = actual.repetidas.get(statement, 0) + 1
+
+    # ------------------------------------------------------------
+    # Exposición
+
+    def texto(self, pools=None):
+        """Todo en formato de texto de Prometheus 0.0.4."""
+        proceso = f'proceso="{self.proceso}"'
+        claves = ("vista", "metodo")
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda):
+            lineas.append(f"# HELP {PREFIJO}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {PREFIJO}_{nombre} {tipo}")
+            return f"{PREFIJO}_{nombre}"
+
+        with self._lock:
+            nombre = metrica("http_requests_total", "counter", "Requests atendidos por vista, método y estado.")
+            for valores, cantidad in sorted(self._requests.items()):
+                lineas.append(f"{nombre}{{{_labels(claves + ('estado',), valores)},{proceso}}} {cantidad}")
+
+            nombre = metrica("http_request_duration_seconds", "histogram", "Latencia de cada request por vista.")
+            lineas.extend(self._latencia.lineas(nombre, claves, proceso))
+
+            nombre = metrica("sql_sentencias_por_request", "histogram", "Sentencias SQL ejecutadas en cada request.")
+            lineas.extend(self._sentencias.lineas(nombre, claves, proceso))
+
+            nombre = metrica("sql_segundos_total", "counter", "Tiempo esperando a la base dentro de requests.")
+            for valores, segundos in sorted(self._tiempo_sql.items()):
+                lineas.append(f"{nombre}{{{_labels(claves, valores)},{proceso}}} {_numero(segundos)}")
+
+            nombre = metrica("sql_n_mas_1_total", "counter",
+                             f"Requests que repitieron una misma sentencia {self.umbral_n_mas_1} veces o más.")
+            for valores, cantidad in sorted(self._n_mas_1.items()):
+                lineas.append(f"{nombre}{{{_labels(claves, valores)},{proceso}}} {cantidad}")
+
+        for clave, tipo, ayuda in (
+            ("en_uso", "gauge", "Conexiones del pool prestadas ahora."),
+            ("libres", "gauge", "Conexiones abiertas esperando en el pool."),
+            ("overflow", "gauge", "Conexiones abiertas por encima de pool_size."),
+            ("checkouts", "counter", "Conexiones pedidas al pool."),
+            ("timeouts", "counter", "Pedidos al pool que vencieron pool_timeout."),
+        ):
+            nombre = metrica(f"pool_{clave}" + ("_total" if tipo == "counter" else ""), tipo, ayuda)
+            for pool, resumen in sorted((pools or {}).items()):
+                lineas.append(f'{nombre}{{pool="{_escapar(pool)}",{proceso}}} {resumen[clave]}')
+
+        return "\n".join(lineas) + "\n"
+
+
+def instalar(app, engines, umbral_n_mas_1=5):
+    """
+    Mide cada request de `app` y las sentencias de `engines`. Se instala antes
+    que los demás before_request para que la latencia los incluya.
+    """
+    metricas = MetricasRequests(umbral_n_mas_1)
+    for engine in engines:
+        if engine is not None:
+            metricas.instalar_en(engine)
+
+    @app.before_request
+    def _empezar_medicion():
+        metricas.empezar()
+
+    @app.after_request
+    def _anotar_estado(respuesta):
+        actual = _request_actual.get()
+        if actual is not None:
+            actual.estado = respuesta.status_code
+        return respuesta
+
+    @app.teardown_request
+    def _terminar_medicion(exception=None):
+        metricas.terminar(request.endpoint, request.method)
+
+    app.metricas = metricas
+    return metricas
+
+
+def respuesta_prometheus(texto):
+    return Response(texto, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,186 @@
+"""
+Logs en JSON (una línea por registro) sin escribir a stdout desde los
+hilos que atienden requests.
+
+    - Todos los loggers van al root, que tiene un solo QueueHandler: loguear
+      es encolar. Un QueueListener (hilo propio del proceso) formatea y
+      escribe a stdout. Después de un fork el hilo no existe en el hijo, así
+      que se vuelve a levantar (os.register_at_fork).
+    - Nivel general LOG_LEVEL y niveles por logger con LOG_NIVELES
+      ("controllers.metricas=WARNING,sqlalchemy.engine=INFO").
+    - Los DEBUG se muestrean (LOG_MUESTREO_DEBUG, de 0 a 1): sirven para
+      volcar requests enteros sin llenar el log.
+    - SQL: SQLALCHEMY_ECHO=1 lo loguea todo (logger sqlalchemy.engine, por
+      la misma cola). Para un solo request alcanza con el header
+      `X-Debug-SQL: 1` si LOG_SQL_POR_REQUEST=1: sus sentencias salen en el
+      logger stock.sql con parámetros y duración.
+
+Campos de cada línea: ts, nivel, logger, msg, pid, y vista/metodo/ruta si
+el registro se generó dentro de un request. Lo que se pase en
+`extra={"datos": {...}}` sale tal cual en "datos". Se codifican con orjson
+si está instalado y si no con json.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional (como en controllers/serializacion.py)
+    orjson = None
+
+HEADER_SQL = "X-Debug-SQL"
+logger_sql = logging.getLogger("stock.sql")
+
+_sql_del_request = ContextVar("sql_del_request", default=False)
+_estado = {"listener": None, "cola": None}
+_TRACEBACK = logging.Formatter()
+
+
+class FormatoJSON(logging.Formatter):
+
+    def format(self, record):
+        linea = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for campo in ("vista", "metodo", "ruta", "datos"):
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                linea[campo] = valor
+        if record.exc_text:
+            linea["error"] = record.exc_text
+        if orjson is None:
+            return json.dumps(linea, default=str, ensure_ascii=False, separators=(",", ":"))
+        return orjson.dumps(linea, default=str).decode()
+
+
+class ContextoRequest(logging.Filter):
+    """Agrega vista/método/ruta en el hilo que loguea (el listener ya no tiene el request)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.vista = request.endpoint
+            record.metodo = request.method
+            record.ruta = request.path
+        return True
+
+
+class MuestreoDebug(logging.Filter):
+
+    def __init__(self, tasa):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.tasa
+
+
+class ColaConContexto(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        # Solo se resuelve el mensaje (los args pueden cambiar después) y el traceback; el JSON se arma en el listener
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _TRACEBACK.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _iniciar_listener(salida):
+    cola = queue.SimpleQueue()
+    manejador = logging.StreamHandler(salida)
+    manejador.setFormatter(FormatoJSON())
+    listener = logging.handlers.QueueListener(cola, manejador, respect_handler_level=False)
+    listener.start()
+    _estado.update(listener=listener, cola=cola)
+    return cola
+
+
+def _tras_fork():
+    # El hilo del listener no pasa al hijo: cola y hilo nuevos (lo que quedó en la vieja se pierde)
+    if _estado["listener"] is None:
+        return
+    cola = _iniciar_listener(_estado["listener"].handlers[0].stream)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, ColaConContexto):
+            handler.queue = cola
+
+
+def _detener():
+    if _estado["listener"] is not None:
+        _estado["listener"].stop()   # vacía la cola antes de salir
+
+
+def parsear_niveles(texto):
+    """'a=INFO, b.c=WARNING' -> {'a': 'INFO', 'b.c': 'WARNING'}"""
+    niveles = {}
+    for parte in (texto or "").split(","):
+        nombre, _, nivel = parte.partition("=")
+        if nombre.strip() and nivel.strip():
+            niveles[nombre.strip()] = nivel.strip().upper()
+    return niveles
+
+
+def configurar(nivel="INFO", niveles=None, muestreo_debug=1.0, echo_sql=False, salida=None):
+    """Instala la cola en el root logger (una sola vez por proceso)."""
+    if _estado["listener"] is not None:
+        return
+    raiz = logging.getLogger()
+    cola = _iniciar_listener(salida or sys.stdout)
+    handler = ColaConContexto(cola)
+    handler.addFilter(ContextoRequest())
+    handler.addFilter(MuestreoDebug(muestreo_debug))
+    raiz.handlers = [handler]
+    raiz.setLevel(nivel)
+
+    # El SQL sale por la cola; echo=True del engine agregaría su propio StreamHandler sincrónico
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if echo_sql else logging.WARNING)
+    # Checkouts, dispose y recreate del pool: solo si se piden con LOG_NIVELES=sqlalchemy.pool=DEBUG
+    logging.getLogger("sqlalchemy.pool").setLevel(logging.WARNING)
+    for nombre, nivel_logger in (niveles or {}).items():
+        logging.getLogger(nombre).setLevel(nivel_logger)
+
+    os.register_at_fork(after_in_child=_tras_fork)
+    atexit.register(_detener)
+
+
+def instalar_sql_por_request(app, engines):
+    """`X-Debug-SQL: 1` loguea las sentencias de ese request en stock.sql."""
+    @app.before_request
+    def _sql_por_request():
+        _sql_del_request.set(request.headers.get(HEADER_SQL) == "1")
+
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if _sql_del_request.get():
+            conn.info.setdefault("registro_inicio", []).append(time.perf_counter())
+
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("registro_inicio")
+        if not _sql_del_request.get() or not inicios:
+            return
+        duracion_ms = (time.perf_counter() - inicios.pop()) * 1000
+        logger_sql.info(" ".join(statement.split()), extra={"datos": {
+            "parametros": repr(parameters)[:1000], "ms": round(duracion_ms, 3), "varias_filas": executemany,
+        }})
+
+    for engine in engines:
+        if engine is not None:
+            event.listen(engine, "before_cursor_execute", _antes)
+            event.listen(engine, "after_cursor_execute", _despues)
@@ -0,0 +1,118 @@
+"""
+Consultas de reporte sobre libros_bajas (/libros/dados-baja).
+
+- `desde`/`hasta` filtran por fecha_baja (columna indexada), así un reporte
+  mensual solo lee las filas de ese mes.
+- El listado se pagina por keyset sobre (fecha_baja, id) descendente: el
+  cursor es "<fecha_baja iso>|<id>" del último movimiento recibido.
+- `por=` agrupa en SQL (unidades, movimientos e importe por día, editorial,
+  ubicación o isbn) y devuelve solo las filas ya agregadas. Con rangos de
+  días enteros sale del resumen bajas_diarias en lugar de libros_bajas.
+"""
+from datetime import date, datetime, time
+
+from sqlalchemy import desc, func, literal_column, select, tuple_
+
+from models.libro import BajaDiaria, LibroBaja
+
+
+class ErrorReporte(ValueError):
+    pass
+
+
+def _dia(valor):
+    # Postgres devuelve date, SQLite el string 'YYYY-MM-DD'
+    return valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+
+
+def _agrupamientos(modelo):
+    # por -> (expresión de agrupamiento, columnas extra, conversión de la clave)
+    if modelo is BajaDiaria:
+        return {
+            "dia": (BajaDiaria.dia, (), _dia),
+            "editorial": (func.nullif(BajaDiaria.editorial, literal_column("''")), (), None),
+            "ubicacion": (BajaDiaria.ubicacion, (), None),
+            "isbn": (BajaDiaria.isbn, (func.max(BajaDiaria.titulo).label("titulo"),), None),
+        }
+    return {
+        "dia": (func.date(LibroBaja.fecha_baja), (), _dia),
+        "editorial": (LibroBaja.editorial, (), None),
+        "ubicacion": (LibroBaja.ubicacion, (), None),
+        "isbn": (LibroBaja.isbn, (func.max(LibroBaja.titulo).label("titulo"),), None),
+    }
+
+
+AGRUPAMIENTOS = tuple(_agrupamientos(LibroBaja))
+
+
+def armar_cursor(fila):
+    return f"{fila['fecha_baja']}|{fila['id']}"
+
+
+def leer_cursor(cursor):
+    try:
+        fecha, movimiento_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(fecha), int(movimiento_id)
+    except ValueError:
+        raise ErrorReporte(f"Cursor inválido: {cursor!r}")
+
+
+def _filtrar_fechas(consulta, desde, hasta):
+    if desde:
+        consulta = consulta.where(LibroBaja.fecha_baja >= desde)
+    if hasta:
+        consulta = consulta.where(LibroBaja.fecha_baja < hasta)
+    return consulta
+
+
+def consulta_movimientos(columnas, desde=None, hasta=None, cursor=None):
+    """SELECT de movimientos, del más reciente al más viejo (desempata el id)."""
+    consulta = select(*columnas).order_by(desc(LibroBaja.fecha_baja), desc(LibroBaja.id))
+    consulta = _filtrar_fechas(consulta, desde, hasta)
+    if cursor:
+        consulta = consulta.where(tuple_(LibroBaja.fecha_baja, LibroBaja.id) < tuple_(*leer_cursor(cursor)))
+    return consulta
+
+
+def _dia_completo(fecha):
+    return fecha is None or fecha.time() == time.min
+
+
+def _totales(modelo):
+    if modelo is BajaDiaria:
+        return (
+            func.sum(BajaDiaria.unidades).label("unidades"),
+            func.sum(BajaDiaria.movimientos).label("movimientos"),
+            func.coalesce(func.sum(BajaDiaria.importe), 0).label("importe"),
+        )
+    return (
+        func.sum(LibroBaja.cantidad_bajada).label("unidades"),
+        func.count(LibroBaja.id).label("movimientos"),
+        func.coalesce(func.sum(LibroBaja.cantidad_bajada * LibroBaja.precio), 0).label("importe"),
+    )
+
+
+def consulta_agrupada(por, desde=None, hasta=None):
+    """
+    Devuelve (SELECT, conversiones) con una fila por valor de `por`:
+    clave, unidades, movimientos e importe (cantidad_bajada * precio del snapshot).
+
+    Si el rango son días enteros se lee del resumen diario (bajas_diarias,
+    ver controllers/resumen_bajas.py); con horas, de los movimientos.
+    """
+    if por not in AGRUPAMIENTOS:
+        raise ErrorReporte(f"Agrupamiento inválido: {por!r} (opciones: {', '.join(AGRUPAMIENTOS)})")
+    modelo = BajaDiaria if _dia_completo(desde) and _dia_completo(hasta) else LibroBaja
+    clave, extras, convertir = _agrupamientos(modelo)[por]
+    unidades, movimientos, importe = _totales(modelo)
+    consulta = select(clave.label(por), unidades, movimientos, importe, *extras).group_by(clave)
+    if modelo is BajaDiaria:
+        if desde:
+            consulta = consulta.where(BajaDiaria.dia >= desde.date())
+        if hasta:
+            consulta = consulta.where(BajaDiaria.dia < hasta.date())
+    else:
+        consulta = _filtrar_fechas(consulta, desde, hasta)
+    # Por día en orden cronológico; el resto, lo que más se movió primero
+    consulta = consulta.order_by(clave) if por == "dia" else consulta.order_by(desc(unidades), clave)
+    return consulta, ({por: convertir} if convertir else None)
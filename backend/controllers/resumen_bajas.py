@@ -0,0 +1,95 @@
+"""
+Resumen diario de libros_bajas en la tabla bajas_diarias.
+
+Cada movimiento suma sus unidades, su importe (cantidad_bajada * precio del
+snapshot) y 1 movimiento a la fila día × isbn × editorial × ubicación con un
+    INSERT ... ON CONFLICT DO UPDATE SET unidades = unidades + excluded.unidades ...
+ejecutado en la misma transacción que el movimiento: si se hace rollback del
+movimiento, también del resumen.
+
+`reconstruir` vuelve a armar el resumen desde libros_bajas (backfill o
+reparación) para todo el historial o un rango de días.
+"""
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.libro import BajaDiaria, LibroBaja
+
+_tabla = BajaDiaria.__table__
+CLAVE = ("dia", "isbn", "editorial", "ubicacion")
+
+
+def _upsert(dialecto):
+    modulo = postgresql if dialecto == "postgresql" else sqlite
+    stmt = modulo.insert(_tabla)
+    return stmt.on_conflict_do_update(
+        index_elements=[_tabla.c[c] for c in CLAVE],
+        set_={
+            "titulo": stmt.excluded.titulo,
+            "unidades": _tabla.c.unidades + stmt.excluded.unidades,
+            "movimientos": _tabla.c.movimientos + stmt.excluded.movimientos,
+            "importe": _tabla.c.importe + stmt.excluded.importe,
+        },
+    )
+
+
+def _dia(fecha):
+    return fecha.date() if isinstance(fecha, datetime) else fecha
+
+
+def sumar(session, movimientos):
+    """
+    Suma `movimientos` (dicts con fecha_baja, isbn, editorial, ubicacion,
+    titulo, cantidad_bajada y precio) al resumen. No hace commit.
+    """
+    filas = {}
+    for mov in movimientos:
+        clave = (_dia(mov["fecha_baja"]), mov["isbn"], mov.get("editorial") or "", mov["ubicacion"])
+        fila = filas.get(clave)
+        if fila is None:
+            fila = filas[clave] = {**dict(zip(CLAVE, clave)), "unidades": 0, "movimientos": 0, "importe": 0.0}
+        fila["titulo"] = mov.get("titulo")
+        fila["unidades"] += mov["cantidad_bajada"]
+        fila["movimientos"] += 1
+        fila["importe"] += mov["cantidad_bajada"] * (mov.get("precio") or 0)
+    if filas:
+        # Siempre en el mismo orden: dos transacciones que tocan las mismas filas no se bloquean en cruz
+        session.execute(_upsert(session.get_bind().dialect.name), [filas[c] for c in sorted(filas)])
+
+
+def reconstruir(session, desde=None, hasta=None):
+    """
+    Borra y vuelve a calcular el resumen de los días [desde, hasta] (date,
+    ambos inclusive; None = sin límite). Devuelve las filas del resumen en ese
+    rango. No hace commit.
+    """
+    borrar = delete(BajaDiaria)
+    contar = select(func.count()).select_from(BajaDiaria)
+    movimientos = select(
+        func.date(LibroBaja.fecha_baja).label("dia"),
+        LibroBaja.isbn,
+        func.coalesce(LibroBaja.editorial, literal_column("''")).label("editorial"),
+        LibroBaja.ubicacion,
+        func.max(LibroBaja.titulo).label("titulo"),
+        func.sum(LibroBaja.cantidad_bajada).label("unidades"),
+        func.count(LibroBaja.id).label("movimientos"),
+        func.coalesce(func.sum(LibroBaja.cantidad_bajada * LibroBaja.precio), 0).label("importe"),
+    ).group_by(
+        func.date(LibroBaja.fecha_baja), LibroBaja.isbn,
+        func.coalesce(LibroBaja.editorial, literal_column("''")), LibroBaja.ubicacion,
+    )
+    if desde:
+        borrar = borrar.where(BajaDiaria.dia >= desde)
+        contar = contar.where(BajaDiaria.dia >= desde)
+        movimientos = movimientos.where(LibroBaja.fecha_baja >= datetime.combine(desde, time.min))
+    if hasta:
+        borrar = borrar.where(BajaDiaria.dia <= hasta)
+        contar = contar.where(BajaDiaria.dia <= hasta)
+        movimientos = movimientos.where(LibroBaja.fecha_baja < datetime.combine(hasta + timedelta(days=1), time.min))
+
+    session.execute(borrar)
+    columnas = ["dia", "isbn", "editorial", "ubicacion", "titulo", "unidades", "movimientos", "importe"]
+    session.execute(insert(BajaDiaria).from_select(columnas, movimientos))
+    return session.execute(contar).scalar()
@@ -0,0 +1,127 @@
+"""
+Ruteo primaria / réplica de lectura.
+
+`SesionRuteada` decide el engine de cada sentencia (Session.get_bind):
+    - GET/HEAD (`session.info["solo_lectura"]`): SELECTs a la réplica;
+    - escrituras, flush, SELECT ... FOR UPDATE y todo lo que venga después
+      de una escritura en la misma sesión: primaria;
+    - si la réplica está caída o atrasada más de `lag_maximo` segundos
+      (`MonitorReplica`), todo a la primaria.
+
+Para leer lo que uno mismo acaba de escribir, después de cada escritura
+exitosa se manda la cookie `ESCRITURA_RECIENTE` (dura `ventana` segundos) y
+los GET que la traen van a la primaria.
+
+Sin DATABASE_REPLICA_URL no se arma nada de esto y todo va a la primaria.
+Para probarlo en local alcanza con dos bases: una que no es standby se
+considera al día (lag 0).
+"""
+import logging
+import threading
+import time
+
+from flask import request
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+ESCRITURA_RECIENTE = "escritura_reciente"
+METODOS_LECTURA = ("GET", "HEAD")
+
+# En un standby: 0 si ya aplicó todo lo recibido, si no la antigüedad de la última transacción aplicada
+_LAG_POSTGRES = text("""
+    SELECT pg_is_in_recovery(),
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+           END
+""")
+
+
+class MonitorReplica:
+
+    def __init__(self, engine, lag_maximo=5, intervalo=1):
+        self.engine = engine
+        self.lag_maximo = lag_maximo
+        self.intervalo = intervalo
+        self.lag = None          # segundos; None = no se pudo medir
+        self.disponible = False
+        self._proximo_chequeo = 0
+        self._lock = threading.Lock()
+
+    def _medir(self):
+        with self.engine.connect() as conn:
+            if self.engine.dialect.name != "postgresql":
+                conn.execute(select(1))
+                return 0.0
+            en_recuperacion, lag = conn.execute(_LAG_POSTGRES).one()
+            if not en_recuperacion:
+                return 0.0   # no es un standby (por ejemplo, una segunda base local)
+            return float(lag) if lag is not None else None
+
+    def chequear(self):
+        try:
+            self.lag = self._medir()
+        except Exception as e:
+            self.lag = None
+            if self.disponible:
+                logger.warning("Réplica no disponible, se lee de la primaria: %s", e)
+        disponible = self.lag is not None and self.lag <= self.lag_maximo
+        if self.disponible and not disponible and self.lag is not None:
+            logger.warning("Réplica atrasada %.1fs, se lee de la primaria", self.lag)
+        self.disponible = disponible
+        self._proximo_chequeo = time.monotonic() + self.intervalo
+
+    def usable(self):
+        """True si conviene leer de la réplica (mide de nuevo cada `intervalo` segundos)."""
+        if time.monotonic() >= self._proximo_chequeo and self._lock.acquire(blocking=False):
+            # Un solo hilo mide; el resto usa el último estado conocido
+            try:
+                self.chequear()
+            finally:
+                self._lock.release()
+        return self.disponible
+
+
+class SesionRuteada(Session):
+
+    def __init__(self, *args, replica=None, monitor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self.monitor = monitor
+
+    def lee_de_replica(self):
+        return (
+            self.replica is not None
+            and self.info.get("solo_lectura", False)
+            and not self.info.get("escribio", False)
+            and self.monitor.usable()
+        )
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        escritura = self._flushing or (clause is not None and (
+            getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None
+        ))
+        if escritura:
+            self.info["escribio"] = True   # lo que siga en esta sesión también va a la primaria
+        elif self.lee_de_replica():
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def instalar(app, session_factory, ventana=5):
+    """
+    Marca la sesión de cada request como de solo lectura (GET/HEAD sin la
+    cookie de escritura reciente) y pone la cookie después de cada escritura.
+    """
+    @app.before_request
+    def _elegir_base():
+        session_factory().info["solo_lectura"] = (
+            request.method in METODOS_LECTURA and ESCRITURA_RECIENTE not in request.cookies
+        )
+
+    @app.after_request
+    def _marcar_escritura(respuesta):
+        if request.method not in METODOS_LECTURA and respuesta.status_code < 400:
+            respuesta.set_cookie(ESCRITURA_RECIENTE, "1", max_age=ventana, httponly=True, samesite="Lax")
+        return respuesta
@@ -0,0 +1,69 @@
+"""
+Serialización compartida para los endpoints de listado.
+
+- Las consultas seleccionan solo las columnas que se devuelven (filas de Core,
+  sin hidratar objetos del ORM) y `filas_a_dicts` las pasa a dicts.
+- `OrjsonProvider` reemplaza al proveedor JSON de Flask por orjson, así
+  jsonify() y app.json.dumps() codifican varias veces más rápido. Si orjson
+  no está instalado se sigue usando el proveedor por defecto.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def filas_a_dicts(resultado, convertir=None):
+    """
+    Convierte un Result de SQLAlchemy en una lista de dicts.
+    `convertir` es un dict opcional columna -> función para ajustar valores
+    (por ejemplo fechas a isoformat).
+    """
+    claves = tuple(resultado.keys())
+    if not convertir:
+        return [dict(zip(claves, fila)) for fila in resultado]
+    posiciones = [(claves.index(col), fn) for col, fn in convertir.items()]
+    filas = []
+    for fila in resultado:
+        fila = list(fila)
+        for pos, fn in posiciones:
+            if fila[pos] is not None:
+                fila[pos] = fn(fila[pos])
+        filas.append(dict(zip(claves, fila)))
+    return filas
+
+
+def isoformat(valor):
+    return valor.isoformat()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Fechas y demás tipos no nativos se siguen resolviendo con el `default` de
+    # Flask (OPT_PASSTHROUGH_DATETIME), así la salida es la misma que antes.
+    opciones = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Alguien pidió opciones del json estándar (indent, etc.)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.opciones).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.opciones),
+            mimetype=self.mimetype,
+        )
+
+
+def instalar_json(app):
+    """Activa OrjsonProvider en la app si orjson está disponible."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,199 @@
+"""
+Descuento de stock atómico.
+
+El chequeo "hay stock suficiente" y el descuento van en el mismo UPDATE:
+    UPDATE libros SET stock = stock - :n WHERE id = :id AND stock >= :n RETURNING ...
+así dos terminales vendiendo el último ejemplar no pueden dejar stock negativo
+ni pisarse el descuento (no hay lectura previa en Python).
+"""
+from sqlalchemy import case, insert, literal, select, update
+
+from controllers import eventos, resumen_bajas
+from models.libro import Libro, LibroBaja
+
+MAXIMO_ITEMS_VENTA = 500
+
+
+class StockInsuficiente(Exception):
+    """`faltantes` es una lista de {libro_id, pedido, disponible} (disponible None si no existe)."""
+
+    def __init__(self, faltantes):
+        super().__init__("No hay suficiente stock disponible")
+        self.faltantes = faltantes
+
+
+def _avisar(session, filas):
+    # El UPDATE no pasa por el flush del ORM: avisamos a índices/caches a mano
+    for fila in filas:
+        eventos.registrar_cambio(session, Libro, eventos.MODIFICACION, {"id": fila.id, "stock": fila.stock})
+
+
+def _stock_actual(session, ids):
+    filas = session.execute(select(Libro.id, Libro.stock).where(Libro.id.in_(ids))).all()
+    return {fila.id: fila.stock for fila in filas}
+
+
+def descontar(session, libro_id, cantidad):
+    """
+    Descuenta `cantidad` del libro en un solo UPDATE ... RETURNING.
+    Devuelve la fila (id, titulo, stock, ubicacion) con el stock resultante,
+    o levanta StockInsuficiente. No hace commit.
+    """
+    fila = session.execute(
+        update(Libro)
+        .where(Libro.id == libro_id, Libro.stock >= cantidad)
+        .values(stock=Libro.stock - cantidad)
+        .returning(Libro.id, Libro.titulo, Libro.stock, Libro.ubicacion)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if fila is None:
+        disponible = _stock_actual(session, [libro_id]).get(libro_id)
+        raise StockInsuficiente([{"libro_id": libro_id, "pedido": cantidad, "disponible": disponible}])
+    _avisar(session, [fila])
+    return fila
+
+
+# Columnas del libro que se copian al movimiento (snapshot al momento de la venta)
+COLUMNAS_SNAPSHOT = ("titulo", "autor", "editorial", "isbn", "precio", "ubicacion")
+
+
+def _update_venta(libro_id, cantidad, fecha):
+    # fecha_baja del libro solo se marca cuando el stock llega a 0
+    # (dentro del SET, Libro.stock es el valor anterior al descuento)
+    return (
+        update(Libro)
+        .where(Libro.id == libro_id, Libro.stock >= cantidad)
+        .values(
+            stock=Libro.stock - cantidad,
+            fecha_baja=case((Libro.stock - cantidad == 0, fecha), else_=Libro.fecha_baja),
+        )
+        .returning(Libro.id, Libro.stock, Libro.fecha_baja, *(getattr(Libro, c) for c in COLUMNAS_SNAPSHOT))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _vender_postgres(session, libro_id, cantidad, fecha):
+    # Una sola sentencia: WITH upd AS (UPDATE ... RETURNING), mov AS (INSERT ... SELECT FROM upd RETURNING)
+    upd = _update_venta(libro_id, cantidad, fecha).cte("upd")
+    columnas_mov = ["libro_id", "fecha_baja", "cantidad_bajada", "stock_resultante", *COLUMNAS_SNAPSHOT]
+    mov = (
+        insert(LibroBaja)
+        .from_select(columnas_mov, select(
+            upd.c.id, literal(fecha), literal(cantidad), upd.c.stock,
+            *(upd.c[c] for c in COLUMNAS_SNAPSHOT),
+        ))
+        .returning(LibroBaja.id)
+        .cte("mov")
+    )
+    return session.execute(
+        select(upd, mov.c.id.label("movimiento_id")).select_from(upd.join(mov, literal(True)))
+    ).mappings().first()
+
+
+def _vender_generico(session, libro_id, cantidad, fecha):
+    # Motores sin DML dentro de CTE (SQLite): UPDATE ... RETURNING + INSERT ... RETURNING
+    libro = session.execute(_update_venta(libro_id, cantidad, fecha)).mappings().first()
+    if libro is None:
+        return None
+    movimiento_id = session.execute(
+        insert(LibroBaja).values(
+            libro_id=libro["id"],
+            fecha_baja=fecha,
+            cantidad_bajada=cantidad,
+            stock_resultante=libro["stock"],
+            **{c: libro[c] for c in COLUMNAS_SNAPSHOT},
+        ).returning(LibroBaja.id)
+    ).scalar()
+    return {**libro, "movimiento_id": movimiento_id}
+
+
+def vender(session, libro_id, cantidad, fecha):
+    """
+    Descuenta stock y registra el movimiento en libros_bajas con el stock
+    resultante real (el que devolvió el UPDATE, no uno leído antes).
+    Devuelve un dict con las columnas del libro + movimiento_id. No hace commit.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        venta = _vender_postgres(session, libro_id, cantidad, fecha)
+    else:
+        venta = _vender_generico(session, libro_id, cantidad, fecha)
+
+    if venta is None:
+        disponible = _stock_actual(session, [libro_id]).get(libro_id)
+        raise StockInsuficiente([{"libro_id": libro_id, "pedido": cantidad, "disponible": disponible}])
+
+    eventos.registrar_cambio(session, Libro, eventos.MODIFICACION,
+                             {"id": venta["id"], "stock": venta["stock"], "fecha_baja": venta["fecha_baja"]})
+    movimiento = {
+        "id": venta["movimiento_id"],
+        "libro_id": venta["id"],
+        "fecha_baja": fecha,
+        "cantidad_bajada": cantidad,
+        "stock_resultante": venta["stock"],
+        **{c: venta[c] for c in COLUMNAS_SNAPSHOT},
+    }
+    eventos.registrar_cambio(session, LibroBaja, eventos.ALTA, movimiento)
+    resumen_bajas.sumar(session, [movimiento])
+    return venta
+
+
+def descontar_varios(session, cantidades):
+    """
+    Descuenta {libro_id: cantidad} en un único UPDATE (CASE por id).
+    Antes bloquea las filas en orden de id (SELECT ... ORDER BY id FOR
+    UPDATE): dos ventas con libros en común se esperan en vez de trabarse en
+    cruz. Si algún libro no alcanza levanta StockInsuficiente sin haber
+    descontado nada; el rollback queda a cargo de quien llama.
+    Devuelve {libro_id: fila} con el stock resultante. No hace commit.
+    """
+    disponibles = dict(session.execute(
+        select(Libro.id, Libro.stock)
+        .where(Libro.id.in_(list(cantidades)))
+        .order_by(Libro.id)
+        .with_for_update()
+    ).all())
+    sin_stock = [libro_id for libro_id, cantidad in cantidades.items()
+                 if disponibles.get(libro_id) is None or disponibles[libro_id] < cantidad]
+    if sin_stock:
+        raise StockInsuficiente([
+            {"libro_id": libro_id, "pedido": cantidades[libro_id], "disponible": disponibles.get(libro_id)}
+            for libro_id in sin_stock
+        ])
+
+    cantidad_por_id = case(cantidades, value=Libro.id)
+    filas = session.execute(
+        update(Libro)
+        .where(Libro.id.in_(list(cantidades)), Libro.stock >= cantidad_por_id)
+        .values(stock=Libro.stock - cantidad_por_id)
+        .returning(Libro.id, Libro.titulo, Libro.stock, Libro.ubicacion)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if len(filas) != len(cantidades):
+        # Con las filas bloqueadas no debería pasar (motores sin FOR UPDATE, como SQLite)
+        actualizados = {fila.id for fila in filas}
+        raise StockInsuficiente([
+            {"libro_id": libro_id, "pedido": cantidad, "disponible": disponibles.get(libro_id)}
+            for libro_id, cantidad in cantidades.items() if libro_id not in actualizados
+        ])
+
+    _avisar(session, filas)
+    return {fila.id: fila for fila in filas}
+
+
+def agrupar_items(items):
+    """Valida [{libro_id, cantidad}] y suma cantidades repetidas. Levanta ValueError."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("Se requiere una lista de items")
+    if len(items) > MAXIMO_ITEMS_VENTA:
+        raise ValueError(f"Máximo {MAXIMO_ITEMS_VENTA} items por venta")
+    cantidades = {}
+    for item in items:
+        try:
+            libro_id = int(item["libro_id"])
+            cantidad = int(item.get("cantidad", 1))
+        except (TypeError, KeyError, ValueError):
+            raise ValueError(f"Item inválido: {item!r}")
+        if cantidad <= 0:
+            raise ValueError(f"Cantidad inválida para el libro {libro_id}")
+        cantidades[libro_id] = cantidades.get(libro_id, 0) + cantidad
+    return cantidades
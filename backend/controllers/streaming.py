@@ -0,0 +1,48 @@
+"""
+Helpers para devolver listados grandes de a pedazos (respuestas chunked),
+sin armar la lista completa en memoria antes de responder.
+"""
+from flask import Response, current_app, stream_with_context
+
+TAMANIO_LOTE = 1000   # filas por ida al cursor del servidor (yield_per)
+
+
+def _lotes_json_array(filas, serializar):
+    dumps = current_app.json.dumps
+    yield "["
+    primero = True
+    buffer = []
+    for fila in filas:
+        buffer.append(("" if primero else ",") + dumps(serializar(fila)))
+        primero = False
+        if len(buffer) >= TAMANIO_LOTE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+    yield "]"
+
+
+def _lotes_ndjson(filas, serializar):
+    dumps = current_app.json.dumps
+    buffer = []
+    for fila in filas:
+        buffer.append(dumps(serializar(fila)) + "\n")
+        if len(buffer) >= TAMANIO_LOTE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def respuesta_stream(filas, serializar=lambda fila: dict(fila._mapping), formato="json"):
+    """
+    Devuelve un Response que va escribiendo `filas` a medida que llegan del cursor.
+    `formato` puede ser "json" (un array JSON, igual que jsonify) o "ndjson".
+    """
+    if formato == "ndjson":
+        cuerpo, mimetype = _lotes_ndjson(filas, serializar), "application/x-ndjson"
+    else:
+        cuerpo, mimetype = _lotes_json_array(filas, serializar), "application/json"
+    # stream_with_context mantiene viva la sesión del request mientras se genera
+    return Response(stream_with_context(cuerpo), mimetype=mimetype)
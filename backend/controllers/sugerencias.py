@@ -0,0 +1,264 @@
+"""
+Sugerencias "mientras se escribe" para /api/libros/sugerir.
+
+Los candidatos salen del vocabulario ordenado de IndiceLibros (bisect por
+prefijo sobre las palabras normalizadas de título y autor, ver
+controllers/busqueda.py). Para ordenarlos se guarda el stock de cada libro y
+las unidades dadas de baja en los últimos `dias_ventas` días.
+
+Con prefijos cortos los candidatos pueden ser cientos de miles, así que cada
+prefijo consultado guarda su top-`TOPE` ya ordenado (un nodo). El nodo se
+arma la primera vez que se pide y después se mantiene con cada commit:
+    - si un libro del nodo cambia de puntaje se reubica; si queda por debajo
+      del último se saca (lo que no está en el nodo nunca supera al último);
+    - si un libro de afuera supera al último, entra y sale el último.
+Cuando un nodo queda con menos libros que el `limite` pedido se vuelve a armar.
+
+Los commits que llegan mientras se carga (o se recarga la ventana de ventas)
+se guardan y se aplican al terminar, como en IndiceLibros: el stock se pisa
+con el valor confirmado y las ventas de esos libros se vuelven a leer, así
+una venta que la carga ya había contado no se suma dos veces.
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from controllers import eventos
+from controllers.busqueda import normalizar, palabras
+from models.libro import Libro, LibroBaja
+
+logger = logging.getLogger(__name__)
+
+ORDENES = ("ventas", "stock")
+TOPE = 50                # libros por nodo (= máximo `limit` del endpoint)
+MAXIMO_NODOS = 20000
+RECARGA_VENTAS = 3600    # segundos: la ventana de ventas se corre una vez por hora
+TZ_ARGENTINA = timezone(timedelta(hours=-3))   # fecha_baja se guarda en hora local, sin tz (ver app.py)
+
+
+class _Nodo:
+    __slots__ = ("ids", "completo")
+
+    def __init__(self, ids, completo):
+        self.ids = ids              # ordenados por puntaje, de mayor a menor
+        self.completo = completo    # True si tiene a todos los candidatos del prefijo
+
+
+class SugerenciasLibros:
+
+    def __init__(self, indice, dias_ventas=30):
+        self.indice = indice
+        self.dias_ventas = dias_ventas
+        self.cargado = False
+        self._lock = threading.RLock()
+        # Commits recibidos durante la carga (un lock aparte: el commit no espera a la carga)
+        self._lock_pendientes = threading.Lock()
+        self._cargando = False
+        self._pendientes = []   # [(modelo, accion, datos)]
+        self._stock = {}       # libro_id -> stock
+        self._ventas = {}      # libro_id -> unidades en la ventana
+        self._ventas_vencen = 0
+        self._ventas_desde = None
+        self._recargas_ventas = 0
+        self._nodos = {}       # (orden, prefijo) -> _Nodo
+        self._en_nodos = {}    # libro_id -> {(orden, prefijo)} donde figura
+
+    # ------------------------------------------------------------------
+    # Puntajes
+    # ------------------------------------------------------------------
+    def _puntaje(self, orden):
+        stock, ventas = self._stock, self._ventas
+        if orden == "stock":
+            return lambda libro_id: (stock.get(libro_id, 0), ventas.get(libro_id, 0), -libro_id)
+        return lambda libro_id: (ventas.get(libro_id, 0), stock.get(libro_id, 0), -libro_id)
+
+    # ------------------------------------------------------------------
+    # Carga y mantenimiento
+    # ------------------------------------------------------------------
+    def _consulta_ventas(self, desde):
+        return (
+            select(LibroBaja.libro_id, func.sum(LibroBaja.cantidad_bajada))
+            .where(LibroBaja.fecha_baja >= desde)
+            .group_by(LibroBaja.libro_id)
+        )
+
+    def _cargar_ventas(self, session):
+        desde = datetime.now(TZ_ARGENTINA).replace(tzinfo=None) - timedelta(days=self.dias_ventas)
+        filas = session.execute(self._consulta_ventas(desde))
+        self._ventas = {libro_id: int(cantidad) for libro_id, cantidad in filas}
+        self._ventas_desde = desde
+        self._recargas_ventas += 1
+        # Cambian todos los puntajes a la vez: los nodos se rearman a medida que se piden
+        self._nodos.clear()
+        self._en_nodos.clear()
+
+    def _releer_ventas(self, session, libro_ids):
+        filas = dict(session.execute(
+            self._consulta_ventas(self._ventas_desde).where(LibroBaja.libro_id.in_(libro_ids))
+        ).all())
+        for libro_id in libro_ids:
+            if filas.get(libro_id):
+                self._ventas[libro_id] = int(filas[libro_id])
+            else:
+                self._ventas.pop(libro_id, None)
+            self._actualizar(libro_id)
+
+    def _cargar(self, session):
+        # Llamar con self._lock tomado
+        with self._lock_pendientes:
+            self._cargando = True
+        try:
+            if not self.cargado:
+                filas = session.execute(select(Libro.id, Libro.stock).execution_options(yield_per=5000))
+                self._stock = {libro_id: stock for libro_id, stock in filas}
+            self._cargar_ventas(session)
+            self._aplicar_pendientes(session)
+            self._ventas_vencen = time.monotonic() + RECARGA_VENTAS
+        finally:
+            with self._lock_pendientes:
+                self._cargando = False
+                self._pendientes = []
+
+    def _aplicar_pendientes(self, session):
+        while True:
+            with self._lock_pendientes:
+                pendientes, self._pendientes = self._pendientes, []
+                if not pendientes:
+                    self.cargado = True
+                    self._cargando = False
+                    return
+            vendidos = set()
+            for modelo, accion, datos in pendientes:
+                if modelo is Libro:
+                    self._aplicar_libro(accion, datos)
+                elif accion == eventos.ALTA:
+                    vendidos.add(datos["libro_id"])
+            if vendidos:
+                self._releer_ventas(session, vendidos)
+
+    def asegurar_cargado(self, session):
+        self.indice.asegurar_cargado(session)
+        if self.cargado and self._ventas_vencen >= time.monotonic():
+            return
+        with self._lock:
+            if not self.cargado or self._ventas_vencen < time.monotonic():
+                self._cargar(session)
+
+    def _sacar(self, libro_id):
+        for clave in self._en_nodos.pop(libro_id, ()):
+            nodo = self._nodos.get(clave)
+            if nodo is not None:
+                nodo.ids.remove(libro_id)
+
+    def _ubicar(self, libro_id):
+        # Se llama después de que IndiceLibros aplicó el cambio: usa las palabras nuevas
+        doc = self.indice.doc(libro_id)
+        if doc is None:
+            return
+        prefijos = {p[:i] for texto in doc for p in palabras(texto) for i in range(1, len(p) + 1)}
+        puntajes = {}
+        for orden in ORDENES:
+            for prefijo in prefijos:
+                clave = (orden, prefijo)
+                nodo = self._nodos.get(clave)
+                if nodo is None:
+                    continue
+                puntaje = puntajes.get(orden) or puntajes.setdefault(orden, self._puntaje(orden))
+                valor = puntaje(libro_id)
+                if not nodo.completo and (not nodo.ids or valor <= puntaje(nodo.ids[-1])):
+                    continue
+                pos = 0
+                while pos < len(nodo.ids) and puntaje(nodo.ids[pos]) > valor:
+                    pos += 1
+                nodo.ids.insert(pos, libro_id)
+                self._en_nodos.setdefault(libro_id, set()).add(clave)
+                if len(nodo.ids) > TOPE:
+                    ultimo = nodo.ids.pop()
+                    self._en_nodos[ultimo].discard(clave)
+                    nodo.completo = False
+
+    def _actualizar(self, libro_id):
+        self._sacar(libro_id)
+        self._ubicar(libro_id)
+
+    def _encolar(self, modelo, accion, datos):
+        """True si el cambio quedó para después de la carga (o si no hace falta aplicarlo)."""
+        with self._lock_pendientes:
+            if self._cargando:
+                self._pendientes.append((modelo, accion, datos))
+                return True
+            # Sin carga en curso ni hecha: la próxima carga ya lee el estado confirmado
+            return not self.cargado
+
+    def on_commit_libro(self, accion, datos):
+        """Callback para controllers.eventos (Libro). Suscribir después de IndiceLibros."""
+        if not self._encolar(Libro, accion, datos):
+            self._aplicar_libro(accion, datos)
+
+    def _aplicar_libro(self, accion, datos):
+        libro_id = datos["id"]
+        with self._lock:
+            if accion == eventos.BAJA:
+                self._stock.pop(libro_id, None)
+                self._ventas.pop(libro_id, None)
+                self._sacar(libro_id)
+                return
+            if "stock" in datos:
+                self._stock[libro_id] = datos["stock"] or 0
+            if "stock" in datos or "titulo" in datos or "autor" in datos:
+                self._actualizar(libro_id)
+
+    def on_commit_baja(self, accion, datos):
+        """Callback para controllers.eventos (LibroBaja): suma la venta a la ventana."""
+        if accion != eventos.ALTA:
+            return
+        recargas = self._recargas_ventas
+        if self._encolar(LibroBaja, accion, datos):
+            return
+        libro_id = datos["libro_id"]
+        with self._lock:
+            if self._recargas_ventas != recargas:
+                return   # la ventana se recargó después de este commit: ya cuenta la venta
+            self._ventas[libro_id] = self._ventas.get(libro_id, 0) + (datos.get("cantidad_bajada") or 0)
+            self._actualizar(libro_id)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def _armar_nodo(self, orden, prefijo):
+        candidatos = self.indice.ids_con_prefijos([prefijo])
+        ids = heapq.nlargest(TOPE, candidatos, key=self._puntaje(orden))
+        if len(self._nodos) >= MAXIMO_NODOS:
+            self._nodos.clear()
+            self._en_nodos.clear()
+        clave = (orden, prefijo)
+        nodo = self._nodos.get(clave)
+        if nodo is not None:
+            for libro_id in nodo.ids:
+                self._en_nodos[libro_id].discard(clave)
+        nodo = self._nodos[clave] = _Nodo(ids, completo=len(candidatos) <= TOPE)
+        for libro_id in ids:
+            self._en_nodos.setdefault(libro_id, set()).add(clave)
+        return nodo
+
+    def sugerir(self, prefijo, limite=10, orden="ventas"):
+        """Ids de los libros que matchean `prefijo`, los más vendidos (o con más stock) primero."""
+        fragmentos = palabras(normalizar(prefijo))
+        if not fragmentos:
+            return []
+        limite = min(limite, TOPE)
+
+        with self._lock:
+            if len(fragmentos) == 1:
+                nodo = self._nodos.get((orden, fragmentos[0]))
+                if nodo is None or (not nodo.completo and len(nodo.ids) < limite):
+                    nodo = self._armar_nodo(orden, fragmentos[0])
+                return nodo.ids[:limite]
+
+            # Varias palabras ("cien a"): la primera completa ya suele acotar bastante
+            candidatos = self.indice.ids_con_prefijos(fragmentos)
+            return heapq.nlargest(limite, candidatos, key=self._puntaje(orden))
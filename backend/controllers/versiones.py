@@ -0,0 +1,169 @@
+"""
+Versiones por tabla para responder GET con ETag / 304 sin ir a la base.
+
+Cada commit que toca Libro, Faltante o LibroBaja (ORM, Core con
+eventos.registrar_cambio o Flask-Admin) incrementa la fila
+"version:<tabla>" de `contadores` en la misma transacción, con un solo
+INSERT ... ON CONFLICT DO UPDATE ... RETURNING justo antes del COMMIT: o se
+confirman los datos y la versión nueva, o ninguno. Los endpoints de lectura
+arman un ETag débil con esas versiones y, si coincide con If-None-Match,
+contestan 304 sin abrir sesión.
+
+Contención: el UPDATE de la fila deja esa fila bloqueada hasta el COMMIT,
+así que dos commits que tocan la misma tabla se confirman de a uno. Para
+que la espera sea corta hay una fila por tabla (un commit de faltantes no
+espera a una venta de libros) y el upsert es lo último que se ejecuta antes
+del COMMIT (ver eventos._before_commit): el bloqueo dura lo que tarda el
+COMMIT, no la transacción. Sumar después del commit, en otra sentencia,
+quitaría la espera, pero una suma perdida (el worker muere entre las dos)
+dejaría la versión vieja hasta el próximo cambio de la tabla, y los 304 con
+datos viejos no se corrigen con el `ttl`, que revalida contra esa misma fila.
+
+La versión se lee de memoria: el worker que hizo el commit la publica
+después del commit y los demás la revalidan contra la base cada `ttl`
+segundos (una lectura por PK), así un cambio hecho en otro worker tarda
+como mucho eso en invalidar los ETag.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from controllers import eventos
+from models.libro import Contador
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "version:"
+
+
+class VersionesTablas:
+
+    def __init__(self, engine, modelos, ttl=2):
+        self.engine = engine
+        self.ttl = ttl
+        self._tablas = {modelo: modelo.__tablename__ for modelo in modelos}
+        self._lock = threading.Lock()
+        self._versiones = {}   # tabla -> (version, vence)
+
+    @staticmethod
+    def _consulta(tablas):
+        return select(Contador.nombre, Contador.valor).where(Contador.nombre.in_([PREFIJO + t for t in tablas]))
+
+    @staticmethod
+    def _por_tabla(filas):
+        return {nombre[len(PREFIJO):]: valor for nombre, valor in filas}
+
+    def _leer(self, tablas, conn=None):
+        if conn is None:
+            with self.engine.connect() as conn:
+                return self._por_tabla(conn.execute(self._consulta(tablas)).all())
+        return self._por_tabla(conn.execute(self._consulta(tablas)).all())
+
+    @staticmethod
+    def _sumar(dialecto, tablas):
+        modulo = postgresql if dialecto == "postgresql" else sqlite
+        # Siempre en el mismo orden: dos commits que tocan las mismas tablas no se bloquean en cruz
+        stmt = modulo.insert(Contador).values([{"nombre": PREFIJO + t, "valor": 1} for t in sorted(tablas)])
+        return stmt.on_conflict_do_update(
+            index_elements=[Contador.nombre], set_={"valor": Contador.valor + 1}
+        ).returning(Contador.nombre, Contador.valor)
+
+    def antes_de_commit(self, session, modelos):
+        """Callback para eventos.suscribir_antes_de_commit: una vez por commit, en su transacción."""
+        tablas = {self._tablas[modelo] for modelo in modelos}
+        nuevas = self._por_tabla(session.execute(self._sumar(session.get_bind().dialect.name, tablas)).all())
+
+        def publicar():
+            vence = time.monotonic() + self.ttl
+            with self._lock:
+                for tabla, version in nuevas.items():
+                    self._versiones[tabla] = (version, vence)
+        return publicar
+
+    def _en_memoria(self, tablas):
+        ahora = time.monotonic()
+        resultado, vencidas = {}, []
+        for tabla in tablas:
+            entrada = self._versiones.get(tabla)
+            if entrada is not None and entrada[1] > ahora:
+                resultado[tabla] = entrada[0]
+            else:
+                vencidas.append(tabla)
+        return resultado, vencidas
+
+    def _guardar(self, resultado, vencidas, leidas):
+        vence = time.monotonic() + self.ttl
+        with self._lock:
+            for tabla in vencidas:
+                resultado[tabla] = leidas.get(tabla, 0)
+                self._versiones[tabla] = (resultado[tabla], vence)
+        return resultado
+
+    def versiones(self, tablas):
+        resultado, vencidas = self._en_memoria(tablas)
+        if vencidas:
+            self._guardar(resultado, vencidas, self._leer(vencidas))
+        return resultado
+
+    def _formatear(self, versiones, tablas):
+        return "-".join(f"{t}.{versiones.get(t, 0)}" for t in tablas)
+
+    def etag(self, tablas):
+        return self._formatear(self.versiones(tablas), tablas)
+
+    async def etag_async(self, engine_async, tablas):
+        """Como etag(), pero revalida con un AsyncEngine (API asíncrona, asgi.py)."""
+        resultado, vencidas = self._en_memoria(tablas)
+        if vencidas:
+            async with engine_async.connect() as conn:
+                filas = (await conn.execute(self._consulta(vencidas))).all()
+            self._guardar(resultado, vencidas, self._por_tabla(filas))
+        return self._formatear(resultado, tablas)
+
+    def etag_en(self, session, tablas):
+        """ETag con las versiones que ve `session` (por ejemplo, leyendo de una réplica)."""
+        return self._formatear(self._leer(tablas, conn=session), tablas)
+
+
+def instalar(app, engine, modelos, ttl=2):
+    app.versiones = VersionesTablas(engine, modelos, ttl=ttl)
+    eventos.suscribir_antes_de_commit(modelos, app.versiones.antes_de_commit)
+    return app.versiones
+
+
+def con_etag(*tablas):
+    """
+    Decorador para GET: contesta 304 si If-None-Match coincide con la versión
+    actual de `tablas`; si no, ejecuta la vista y le agrega el ETag.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            try:
+                etag = current_app.versiones.etag(tablas)
+            except Exception:
+                logger.exception("No se pudo calcular el ETag de %s", ", ".join(tablas))
+                return vista(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                respuesta = current_app.response_class(status=304)
+            else:
+                session = current_app.session()
+                if getattr(session, "lee_de_replica", None) and session.lee_de_replica():
+                    # La réplica puede estar atrasada: el ETag sale de las versiones que
+                    # ve ella, leídas antes que los datos (nunca más nuevo que la respuesta)
+                    etag = current_app.versiones.etag_en(session, tablas)
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta.set_etag(etag, weak=True)
+            # El navegador guarda la respuesta pero revalida siempre con If-None-Match
+            respuesta.headers["Cache-Control"] = "no-cache"
+            return respuesta
+        return envoltura
+    return decorador
@@ -1,14 +1,242 @@
-from sqlalchemy import create_engine
+"""
+Único lugar donde se crean engines (app, réplica, scripts y benchmarks).
+
+`crear_engine` aplica Config.SQLALCHEMY_ENGINE_OPTIONS (pool_size,
+max_overflow, pool_recycle, pool_timeout, connect_args...), el
+statement_timeout de Postgres y deja el pool midiendo cuánto se espera
+por una conexión (`metricas_pool`, expuesto en /metrics/pool).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
 from config import ProductionConfig  # usamos configuración de producción desde .env
 from models.libro import Base
 
+# Opciones de pool que SQLite en memoria no acepta (usa SingletonThreadPool)
+_OPCIONES_DE_COLA = ("pool_size", "max_overflow", "pool_timeout", "pool_use_lifo")
+MUESTRAS_ESPERA = 1000
+
+
+class MetricasPool:
+    """Esperas por checkout, timeouts e invalidaciones de un pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._esperas = deque(maxlen=MUESTRAS_ESPERA)   # segundos, las últimas N
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.timeouts = 0
+        self.invalidadas = 0
+
+    def reiniciar(self):
+        self.__init__()
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self._esperas.append(segundos)
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def registrar_invalidacion(self, *_):
+        with self._lock:
+            self.invalidadas += 1
+
+    def _percentil(self, ordenadas, p):
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] if ordenadas else 0.0
+
+    def resumen(self, pool):
+        with self._lock:
+            ordenadas = sorted(self._esperas)
+            esperas = {
+                "promedio": self.espera_total / self.checkouts if self.checkouts else 0.0,
+                "p50": self._percentil(ordenadas, 0.50),
+                "p95": self._percentil(ordenadas, 0.95),
+                "p99": self._percentil(ordenadas, 0.99),
+                "maxima": self.espera_maxima,
+            }
+            return {
+                "tamanio": pool.size(),
+                "en_uso": pool.checkedout(),
+                "libres": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "maximo_overflow": pool._max_overflow,
+                "timeout_segundos": pool.timeout(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidadas": self.invalidadas,
+                # en milisegundos, sobre los últimos MUESTRAS_ESPERA checkouts (promedio y máxima: desde el arranque)
+                "espera_ms": {k: round(v * 1000, 3) for k, v in esperas.items()},
+            }
+
+
+def _pool_medido(metricas, base=QueuePool):
+    # Subclase por engine: dispose()/recreate() arman el pool nuevo con
+    # self.__class__, así las métricas siguen siendo las mismas
+    class PoolMedido(base):
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                conexion = super()._do_get()
+            except exc.TimeoutError:
+                metricas.registrar_timeout()
+                raise
+            metricas.registrar_espera(time.perf_counter() - inicio)
+            return conexion
+
+    PoolMedido.metricas = metricas
+    # SQLAlchemy nombra el logger del pool con el módulo de la clase: así queda bajo
+    # sqlalchemy.pool (y sus niveles, ver controllers/registro.py) y no en "database"
+    PoolMedido.__module__ = base.__module__
+    return PoolMedido
+
+
+def _valor(config, clave, defecto=None):
+    # Acepta app.config (dict) o una clase de config.py
+    if isinstance(config, dict):
+        return config.get(clave, defecto)
+    return getattr(config, clave, defecto)
+
+
+def _opciones(url, config, opciones, pool_base):
+    en_memoria = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+    opciones = {**(_valor(config, "SQLALCHEMY_ENGINE_OPTIONS") or {}), **opciones}
+    opciones.setdefault("echo", bool(_valor(config, "SQLALCHEMY_ECHO", False)))
+    if url.get_backend_name() != "postgresql":
+        # connect_timeout/application_name son de psycopg2
+        opciones.pop("connect_args", None)
+    if en_memoria:
+        for clave in _OPCIONES_DE_COLA:
+            opciones.pop(clave, None)
+    else:
+        opciones.setdefault("poolclass", _pool_medido(MetricasPool(), pool_base))
+    return opciones
+
+
+def _schemas_sqlite(engine, url):
+    """
+    SQLite no tiene schemas: cada schema de los modelos (stock_charles_schema)
+    es otra base adjunta en cada conexión, un archivo al lado del principal
+    (app.db -> app.stock_charles_schema.db) o en memoria.
+    """
+    schemas = sorted({tabla.schema for tabla in Base.metadata.tables.values() if tabla.schema})
+    base, extension = os.path.splitext(url.database or "")
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        for schema in schemas:
+            archivo = ":memory:" if base in ("", ":memory:") else f"{base}.{schema}{extension or '.db'}"
+            cursor.execute(f"ATTACH DATABASE '{archivo}' AS {schema}")
+        cursor.close()
+
+
+def _medir_invalidaciones(engine):
+    metricas = metricas_pool(engine)
+    if metricas is not None:
+        event.listen(engine.pool, "invalidate", metricas.registrar_invalidacion)
+
+
+def crear_engine(url=None, config=ProductionConfig, **opciones):
+    """
+    Crea un engine con las opciones de `config` (app.config o una clase de
+    config.py). `opciones` pisa cualquiera de SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    url = make_url(url or _valor(config, "SQLALCHEMY_DATABASE_URI"))
+    es_postgres = url.get_backend_name() == "postgresql"
+    engine = create_engine(url, **_opciones(url, config, opciones, QueuePool))
+    _medir_invalidaciones(engine)
+    if url.get_backend_name() == "sqlite":
+        _schemas_sqlite(engine, url)
+
+    timeout_ms = int(_valor(config, "SQLALCHEMY_STATEMENT_TIMEOUT_MS", 0) or 0)
+    if es_postgres and timeout_ms:
+        @event.listens_for(engine, "connect")
+        def _statement_timeout(dbapi_conn, _):
+            # Una consulta colgada no retiene la conexión del pool para siempre
+            cursor = dbapi_conn.cursor()
+            cursor.execute(f"SET statement_timeout = {timeout_ms}")
+            cursor.close()
+            dbapi_conn.commit()
+
+    return engine
+
+
+def crear_engine_async(url=None, config=ProductionConfig, **opciones):
+    """
+    Igual que crear_engine pero un AsyncEngine (asyncpg / aiosqlite) para la
+    API asíncrona (asgi.py). Las opciones de libpq de la URL (?options=-c...),
+    connect_args y el statement_timeout pasan a server_settings de asyncpg.
+    """
+    url = make_url(url or _valor(config, "SQLALCHEMY_DATABASE_URI"))
+    opciones = _opciones(url, config, opciones, AsyncAdaptedQueuePool)
+    if url.get_backend_name() == "postgresql":
+        ajustes = {}
+        for parametro in (url.query.get("options") or "").split():
+            clave, _, valor = parametro.removeprefix("-c").partition("=")
+            if clave and valor:
+                ajustes[clave] = valor
+        url = url.difference_update_query(["options"]).set(drivername="postgresql+asyncpg")
+        conexion = opciones.pop("connect_args", {})
+        if conexion.get("application_name"):
+            ajustes["application_name"] = conexion["application_name"]
+        timeout_ms = int(_valor(config, "SQLALCHEMY_STATEMENT_TIMEOUT_MS", 0) or 0)
+        if timeout_ms:
+            ajustes["statement_timeout"] = str(timeout_ms)
+        opciones["connect_args"] = {"server_settings": ajustes}
+        if conexion.get("connect_timeout"):
+            opciones["connect_args"]["timeout"] = conexion["connect_timeout"]
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    engine = create_async_engine(url, **opciones)
+    _medir_invalidaciones(engine.sync_engine)
+    if url.get_backend_name() == "sqlite":
+        _schemas_sqlite(engine.sync_engine, url)
+    return engine
+
+
+def metricas_pool(engine):
+    """MetricasPool del engine, o None si su pool no es medido (SQLite en memoria)."""
+    return getattr(engine.pool, "metricas", None)
+
+
+def reiniciar_tras_fork(engine):
+    """
+    Para el proceso hijo de un fork (gunicorn --preload): descarta las
+    conexiones heredadas sin cerrarlas (siguen siendo del padre) y arranca
+    las métricas del pool de cero.
+    """
+    engine.dispose(close=False)
+    metricas = metricas_pool(engine)
+    if metricas is not None:
+        metricas.reiniciar()
+
+
 # Crear el motor de base de datos utilizando la URI definida en el archivo config.py
 def get_engine():
-    return create_engine(ProductionConfig.SQLALCHEMY_DATABASE_URI, echo=True)
+    return crear_engine()
 
-# Crear la sesión de la base de datos
-Session = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+def __getattr__(nombre):
+    # `Session` (sesión de la base) se arma recién cuando alguien lo usa: importar
+    # este módulo no crea engines
+    if nombre == "Session":
+        global Session
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+        return Session
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 # Función para crear las tablas (solo las que aún no existen)
 def init_db():
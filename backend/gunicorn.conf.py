@@ -0,0 +1,70 @@
+"""
+Configuración de gunicorn para producción (Procfile / render.yaml):
+
+    cd backend && gunicorn -c gunicorn.conf.py app:app
+
+Un master que forkea WEB_CONCURRENCY workers (por defecto 2 × núcleos + 1),
+cada uno con GUNICORN_THREADS hilos (worker gthread). Cada worker tiene su
+pool de conexiones: workers × (pool_size + max_overflow) no puede pasar el
+max_connections de Postgres (ver SQLALCHEMY_ENGINE_OPTIONS en config.py).
+
+Recarga sin cortar requests: `kill -HUP <pid del master>` levanta workers
+nuevos con el código actual y cierra los viejos cuando terminan lo que
+están atendiendo (hasta graceful_timeout). Con GUNICORN_PRELOAD=1 la app se
+importa una sola vez en el master (arranque más rápido, memoria compartida)
+pero un HUP ya no recarga el código: hay que reiniciar el servicio.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Reciclar cada worker después de N requests (0 = nunca); el jitter evita que se reinicien todos juntos
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # En el master, antes de forkear: con la base atrás de la última migración no se levanta nada
+    from config import ProductionConfig
+    if not ProductionConfig.ESQUEMA_EXIGIR_AL_DIA:
+        return
+    from controllers import esquema
+    from database import crear_engine
+    engine = crear_engine(echo=False)
+    try:
+        esquema.exigir_al_dia(engine)
+    finally:
+        engine.dispose()
+
+
+def post_fork(server, worker):
+    # Sin preload cada worker importa la app recién después del fork y no hay nada heredado
+    modulo = sys.modules.get("app")
+    if modulo is None:
+        return
+    # Si el master llegó a abrir conexiones, no se comparten entre procesos
+    from database import reiniciar_tras_fork
+    for engine in (modulo.app.engine, modulo.app.engine_replica):
+        if engine is not None:
+            reiniciar_tras_fork(engine)
+    modulo.app.metricas.reiniciar()   # contadores propios y label `proceso` con el pid del worker
+    server.log.info("Worker %s: pool reiniciado tras el fork", worker.pid)
+
+
+def post_worker_init(worker):
+    # Precargas y escucha de cambios antes del primer request (la app ya está importada)
+    modulo = sys.modules.get("app")
+    if modulo is not None:
+        modulo.app.iniciar_hilos()
@@ -0,0 +1,50 @@
+"""indices trigramas (pg_trgm + unaccent) en titulo y autor
+
+Revision ID: 31c8f9be01c7
+Revises: c4d97dbef3fb
+Create Date: 2026-10-18 10:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '31c8f9be01c7'
+down_revision = 'c4d97dbef3fb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las extensiones van a public: la conexión de la app usa search_path=stock_charles_schema,
+    # por eso todo lo de las extensiones se referencia calificado con public.
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA public")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public")
+
+    # unaccent() es STABLE (depende del diccionario), así que no se puede usar en un índice.
+    # Este wrapper fija el diccionario y se declara IMMUTABLE.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION stock_charles_schema.f_unaccent(text)
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+
+    # La expresión tiene que ser idéntica a la que arma controllers/busqueda.py
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_libros_titulo_trgm
+        ON stock_charles_schema.libros
+        USING gin (lower(stock_charles_schema.f_unaccent(titulo)) public.gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_libros_autor_trgm
+        ON stock_charles_schema.libros
+        USING gin (lower(stock_charles_schema.f_unaccent(autor)) public.gin_trgm_ops)
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS stock_charles_schema.ix_libros_autor_trgm")
+    op.execute("DROP INDEX IF EXISTS stock_charles_schema.ix_libros_titulo_trgm")
+    op.execute("DROP FUNCTION IF EXISTS stock_charles_schema.f_unaccent(text)")
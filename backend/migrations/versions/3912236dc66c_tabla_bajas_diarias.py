@@ -0,0 +1,54 @@
+"""tabla bajas_diarias (resumen diario de libros_bajas)
+
+Revision ID: 3912236dc66c
+Revises: 854bc56b9e8e
+Create Date: 2026-10-18 15:40:12.204718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3912236dc66c'
+down_revision = '854bc56b9e8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las bases del create_all al arrancar (ver controllers/esquema.py) pueden tenerla ya,
+    # con las ventas de desde entonces: se vacía y se rearma entera con el backfill
+    if sa.inspect(op.get_bind()).has_table('bajas_diarias', schema='stock_charles_schema'):
+        op.execute("DELETE FROM stock_charles_schema.bajas_diarias")
+    else:
+        _crear_tabla()
+
+    # Backfill con el historial existente (lo mismo que `flask reconstruir-bajas-diarias`)
+    op.execute("""
+        INSERT INTO stock_charles_schema.bajas_diarias
+            (dia, isbn, editorial, ubicacion, titulo, unidades, movimientos, importe)
+        SELECT date(fecha_baja), isbn, COALESCE(editorial, ''), ubicacion, MAX(titulo),
+               SUM(cantidad_bajada), COUNT(id), COALESCE(SUM(cantidad_bajada * precio), 0)
+        FROM stock_charles_schema.libros_bajas
+        GROUP BY date(fecha_baja), isbn, COALESCE(editorial, ''), ubicacion
+    """)
+
+
+def _crear_tabla():
+    op.create_table('bajas_diarias',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('isbn', sa.String(length=20), nullable=False),
+    sa.Column('editorial', sa.String(length=100), nullable=False),
+    sa.Column('ubicacion', sa.String(length=40), nullable=False),
+    sa.Column('titulo', sa.String(length=250), nullable=True),
+    sa.Column('unidades', sa.Integer(), nullable=False),
+    sa.Column('movimientos', sa.Integer(), nullable=False),
+    sa.Column('importe', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'isbn', 'editorial', 'ubicacion'),
+    schema='stock_charles_schema'
+    )
+
+
+def downgrade():
+    op.drop_table('bajas_diarias', schema='stock_charles_schema')
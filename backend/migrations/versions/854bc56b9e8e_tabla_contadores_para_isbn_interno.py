@@ -0,0 +1,40 @@
+"""tabla contadores para isbn interno
+
+Revision ID: 854bc56b9e8e
+Revises: 31c8f9be01c7
+Create Date: 2026-10-18 11:02:17.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '854bc56b9e8e'
+down_revision = '31c8f9be01c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las bases del create_all al arrancar (ver controllers/esquema.py) pueden tenerla ya
+    if not sa.inspect(op.get_bind()).has_table('contadores', schema='stock_charles_schema'):
+        op.create_table('contadores',
+        sa.Column('nombre', sa.String(length=50), nullable=False),
+        sa.Column('valor', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('nombre'),
+        schema='stock_charles_schema'
+        )
+
+    # Arranca desde el mayor código interno de 5 dígitos ya cargado (comparación numérica)
+    op.execute("""
+        INSERT INTO stock_charles_schema.contadores (nombre, valor)
+        SELECT 'isbn_interno', COALESCE(MAX(CAST(isbn AS INTEGER)), 0)
+        FROM stock_charles_schema.libros
+        WHERE isbn ~ '^[0-9]{5}$'
+        ON CONFLICT (nombre) DO NOTHING
+    """)
+
+
+def downgrade():
+    op.drop_table('contadores', schema='stock_charles_schema')
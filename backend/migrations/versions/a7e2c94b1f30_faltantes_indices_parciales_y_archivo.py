@@ -0,0 +1,72 @@
+"""faltantes: fecha_eliminado, índices parciales y tabla faltantes_archivo
+
+Revision ID: a7e2c94b1f30
+Revises: 3912236dc66c
+Create Date: 2026-10-18 18:22:07.513920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e2c94b1f30'
+down_revision = '3912236dc66c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las bases del create_all (ver controllers/esquema.py) pueden tener ya columna, índices y tabla
+    inspector = sa.inspect(op.get_bind())
+    columnas = {c['name'] for c in inspector.get_columns('faltantes', schema='stock_charles_schema')}
+    indices = {i['name'] for i in inspector.get_indexes('faltantes', schema='stock_charles_schema')}
+
+    if 'fecha_eliminado' not in columnas:
+        op.add_column('faltantes',
+            sa.Column('fecha_eliminado', sa.DateTime(timezone=True), nullable=True),
+            schema='stock_charles_schema'
+        )
+    # Los ya eliminados no tienen fecha: cuentan desde la migración, así tienen todo el plazo
+    # de FALTANTES_ARCHIVO_DIAS para recuperarlos antes de que pasen al archivo
+    op.execute("""
+        UPDATE stock_charles_schema.faltantes
+        SET fecha_eliminado = now()
+        WHERE eliminado = true AND fecha_eliminado IS NULL
+    """)
+
+    # La condición es la misma que arma SQLAlchemy para Faltante.eliminado == False / True
+    if 'ix_faltantes_activos' not in indices:
+        op.create_index('ix_faltantes_activos', 'faltantes', [sa.text('id DESC')],
+                        schema='stock_charles_schema', postgresql_where=sa.text('eliminado = false'))
+    if 'ix_faltantes_eliminados' not in indices:
+        op.create_index('ix_faltantes_eliminados', 'faltantes', [sa.text('id DESC')],
+                        schema='stock_charles_schema', postgresql_where=sa.text('eliminado = true'))
+
+    if not inspector.has_table('faltantes_archivo', schema='stock_charles_schema'):
+        _crear_tabla()
+
+
+def _crear_tabla():
+    op.create_table('faltantes_archivo',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('descripcion', sa.String(), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_eliminado', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_archivado', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='stock_charles_schema'
+    )
+
+
+def downgrade():
+    # Lo archivado vuelve a faltantes como eliminado
+    op.execute("""
+        INSERT INTO stock_charles_schema.faltantes (id, descripcion, eliminado, fecha_creacion)
+        SELECT id, descripcion, true, fecha_creacion
+        FROM stock_charles_schema.faltantes_archivo
+    """)
+    op.drop_table('faltantes_archivo', schema='stock_charles_schema')
+    op.drop_index('ix_faltantes_eliminados', table_name='faltantes', schema='stock_charles_schema')
+    op.drop_index('ix_faltantes_activos', table_name='faltantes', schema='stock_charles_schema')
+    op.drop_column('faltantes', 'fecha_eliminado', schema='stock_charles_schema')
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, String, Float, DateTime, func, Boolean, ForeignKey
-from datetime import datetime
+from sqlalchemy import Integer, BigInteger, String, Float, Date, DateTime, func, Boolean, ForeignKey, Index
+from datetime import date, datetime
 
 
 class Base(DeclarativeBase):
@@ -22,6 +22,18 @@ class Libro(Base):
     fecha_alta: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     fecha_baja: Mapped[datetime] = mapped_column(DateTime, nullable=True)
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'titulo': self.titulo,
+            'autor': self.autor,
+            'editorial': self.editorial,
+            'isbn': self.isbn,
+            'stock': self.stock,
+            'precio': self.precio,
+            'ubicacion': self.ubicacion
+        }
+
     def __repr__(self):
         return f"<Libro {self.titulo}>"
 
@@ -34,11 +46,36 @@ class Faltante(Base):
     descripcion: Mapped[str] = mapped_column(String, nullable=False)
     eliminado: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     fecha_creacion: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Cuándo se marcó eliminado (None mientras está activo); a los N días pasa a faltantes_archivo
+    fecha_eliminado: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
 
     def __repr__(self):
         return f"<Faltante {self.descripcion[:20]}...>"
 
 
+# Índices parciales: /api/faltantes y /api/faltantes/eliminados recorren (y paginan por id)
+# solo su parte de la tabla. La condición tiene que ser la misma que usan las consultas.
+Index("ix_faltantes_activos", Faltante.id.desc(),
+      postgresql_where=Faltante.eliminado == False, sqlite_where=Faltante.eliminado == False)
+Index("ix_faltantes_eliminados", Faltante.id.desc(),
+      postgresql_where=Faltante.eliminado == True, sqlite_where=Faltante.eliminado == True)
+
+
+# Faltantes eliminados hace más de FALTANTES_ARCHIVO_DIAS (ver controllers/archivo_faltantes.py)
+class FaltanteArchivado(Base):
+    __tablename__ = "faltantes_archivo"
+    __table_args__ = {'schema': 'stock_charles_schema'}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)   # el mismo id que tenía en faltantes
+    descripcion: Mapped[str] = mapped_column(String, nullable=False)
+    fecha_creacion: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    fecha_eliminado: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    fecha_archivado: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<FaltanteArchivado {self.descripcion[:20]}...>"
+
+
 class LibroBaja(Base):
     __tablename__ = "libros_bajas"
     __table_args__ = {'schema': 'stock_charles_schema'}
@@ -70,3 +107,35 @@ class LibroBaja(Base):
 
     def __repr__(self):
         return f"<LibroBaja {self.titulo} - {self.fecha_baja}>"
+
+
+# Contadores atómicos (por ejemplo, el último código interno de ISBN entregado)
+class Contador(Base):
+    __tablename__ = "contadores"
+    __table_args__ = {'schema': 'stock_charles_schema'}
+
+    nombre: Mapped[str] = mapped_column(String(50), primary_key=True)
+    valor: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Contador {self.nombre}={self.valor}>"
+
+
+# Resumen diario de libros_bajas (se actualiza en la misma transacción que cada
+# movimiento, ver controllers/resumen_bajas.py). editorial '' = sin editorial.
+class BajaDiaria(Base):
+    __tablename__ = "bajas_diarias"
+    __table_args__ = {'schema': 'stock_charles_schema'}
+
+    dia: Mapped[date]       = mapped_column(Date,        primary_key=True)
+    isbn: Mapped[str]       = mapped_column(String(20),  primary_key=True)
+    editorial: Mapped[str]  = mapped_column(String(100), primary_key=True, default="")
+    ubicacion: Mapped[str]  = mapped_column(String(40),  primary_key=True)
+
+    titulo: Mapped[str]     = mapped_column(String(250), nullable=True)   # último título visto
+    unidades: Mapped[int]   = mapped_column(Integer, nullable=False, default=0)
+    movimientos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    importe: Mapped[float]  = mapped_column(Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<BajaDiaria {self.dia} {self.isbn} x{self.unidades}>"
@@ -1,11 +1,10 @@
 # reset_db.py
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
-from config import ProductionConfig
+from database import crear_engine
 from models.libro import Base, Libro
 
 # Crear engine igual que en app.py
-engine = create_engine(ProductionConfig.SQLALCHEMY_DATABASE_URI, echo=True)
+engine = crear_engine()
 
 # Crear sesión scoped para la base
 Session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
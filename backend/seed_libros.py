@@ -1,23 +1,325 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+"""
+Generador de datos sintéticos para desarrollo y benchmarks: libros,
+libros_bajas (con su resumen bajas_diarias) y faltantes, siempre los mismos
+para la misma semilla.
+
+    python seed_libros.py                      # 10k libros
+    python seed_libros.py --escala 1m          # 1M libros, 1M bajas, 50k faltantes
+    python seed_libros.py --libros 500 --bajas 0 --faltantes 0
+
+- Títulos y autores en castellano (con tildes), editoriales y ubicaciones
+  con una distribución despareja como la del local (pocas concentran casi
+  todo), ISBN-13 válidos y únicos.
+- Ventas con estacionalidad: más en diciembre, marzo (vuelta a clases) y
+  julio, menos los domingos, en horario de local; cada venta va en orden
+  cronológico (los ids crecen con la fecha, como en producción).
+- Carga por lotes de `--lote` filas: COPY ... FROM STDIN en Postgres y
+  executemany de tuplas en SQLite, con el avance y las filas por minuto.
+
+Usa DATABASE_URL (Postgres, o SQLite: sqlite:///bench.db). Si la base está
+vacía la deja como `flask preparar-base`: tablas, índices de búsqueda y
+marcada en la última migración. Los libros nuevos siguen a los que ya haya (ids e ISBN no se pisan).
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
 from config import Config
-from models.libro import Libro, Base
-
-# Crear el engine y la sesión
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
-Session = sessionmaker(bind=engine)
-session = Session()
-
-# Crear algunos libros de ejemplo
-libros = [
-    Libro(titulo="Cien años de soledad", autor="Gabriel García Márquez", editorial="Sudamericana", isbn="1234567890", stock=10, precio=1500.00),
-    Libro(titulo="El principito", autor="Antoine de Saint-Exupéry", editorial="EMECE", isbn="0987654321", stock=5, precio=1200.00),
-    Libro(titulo="1984", autor="George Orwell", editorial="Planeta", isbn="1111222233", stock=7, precio=1800.00),
+from controllers import esquema, resumen_bajas
+from database import crear_engine
+from models.libro import Faltante, Libro, LibroBaja
+
+# libros, bajas, faltantes
+ESCALAS = {
+    "10k": (10_000, 10_000, 500),
+    "100k": (100_000, 100_000, 5_000),
+    "1m": (1_000_000, 1_000_000, 50_000),
+}
+LOTE = 20_000
+LIBROS_CON_VENTAS = 20_000   # catálogo del que salen las ventas (repartido en todo el rango de ids)
+DIAS_DE_HISTORIA = 2 * 365
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+NOMBRES = ["Gabriel", "Julio", "Jorge Luis", "Isabel", "María Elena", "Adolfo", "Ernesto", "Silvina",
+           "Alfonsina", "Mariana", "Samanta", "Claudia", "Ricardo", "Rodolfo", "Inés", "Martín", "Sebastián",
+           "Beatriz", "Andrés", "Olga", "Leopoldo", "Felisberto", "Josefina", "Tomás Eloy", "Rubén", "Begoña",
+           "Íñigo", "Camila", "Elvira", "Agustín", "Lucía", "Hebe", "Álvaro", "Verónica", "Germán"]
+APELLIDOS = ["García Márquez", "Cortázar", "Borges", "Allende", "Walsh", "Bioy Casares", "Sábato", "Ocampo",
+             "Storni", "Enríquez", "Schweblin", "Piñeiro", "Piglia", "Fontanarrosa", "Pizarnik", "Kohan", "Saer",
+             "Martínez", "Benedetti", "Galeano", "Lugones", "Arlt", "Hernández", "Quiroga", "Gelman", "Muñoz Molina",
+             "Pérez-Reverte", "Marías", "Vargas Llosa", "Rulfo", "Paz", "Fuentes", "Bolaño", "Ibarbourou", "Cámara"]
+# Los títulos combinan sustantivos femeninos (SUSTANTIVOS), masculinos y plurales masculinos
+SUSTANTIVOS = ["soledad", "cólera", "rayuela", "invención", "casa", "operación", "masacre", "noche",
+               "canción", "ciudad", "crónica", "muerte", "distancia", "viuda", "pampa", "memoria",
+               "isla", "frontera", "estación", "herida", "lección", "mañana", "tormenta", "señal", "razón"]
+SUSTANTIVOS_M = ["amor", "túnel", "aleph", "río", "pájaro", "corazón", "otoño", "patriarca", "invierno", "silencio",
+                 "camino", "viaje", "héroe", "sueño", "jardín", "espejo", "desierto", "océano", "último verano"]
+PLURALES = ["espíritus", "héroes", "perros", "peligros", "pájaros", "senderos", "años", "ríos", "ojos",
+            "cuentos", "días", "árboles", "inviernos", "ausentes", "náufragos", "búhos", "caminos"]
+ADJETIVOS = ["perdida", "infinita", "anunciada", "oscura", "última", "invisible", "salvaje", "dormida",
+             "secreta", "íntima", "rota", "lejana", "furiosa"]
+TITULOS = [
+    "{S} de los {p}", "{S} {a}", "El {m} de la {s}", "Crónica de una {s} {a}", "La {s} y el {m}",
+    "Cien años de {s}", "Cuentos de {s}, de {p} y de {m}", "Los {p} del {m}", "Sobre {p} y {p2}",
+    "{M}", "Manual de {s}", "Historia de la {s}", "Diario del {m}", "Los {p} de la {s}",
 ]
+# editorial -> peso (None = sin editorial cargada)
+EDITORIALES = {
+    "Planeta": 18, "Sudamericana": 16, "Alfaguara": 10, "Emecé": 9, "Anagrama": 8, "Seix Barral": 6,
+    "Tusquets": 5, "Siglo XXI": 5, "Salamandra": 4, "Eudeba": 4, "Fondo de Cultura Económica": 4,
+    "Adriana Hidalgo": 3, "Interzona": 2, "Eterna Cadencia": 2, "Sigilo": 2, None: 8,
+}
+# Estanterías E1..E40: las del frente (números bajos) tienen mucho más; más algunas ubicaciones especiales
+UBICACIONES = {**{f"E{n}": 40 / n ** 0.5 for n in range(1, 41)},
+               "Mesa novedades": 12, "Vidriera": 4, "Depósito": 20, "Infantil": 8}
+# Estacionalidad de las ventas
+PESO_MES = {1: 0.7, 2: 1.1, 3: 1.5, 4: 0.9, 5: 0.9, 6: 0.9, 7: 1.3, 8: 1.0, 9: 0.9, 10: 1.0, 11: 1.1, 12: 1.9}
+PESO_DIA_SEMANA = (1.0, 1.0, 1.0, 1.05, 1.2, 1.4, 0.3)   # lunes..domingo
+PESO_HORA = {9: 0.4, 10: 0.8, 11: 1.2, 12: 1.3, 13: 1.0, 14: 0.7, 15: 0.7, 16: 0.9, 17: 1.2, 18: 1.4, 19: 1.2, 20: 0.6}
+
+COLUMNAS_LIBRO = ("id", "titulo", "autor", "editorial", "isbn", "stock", "precio", "ubicacion", "fecha_alta")
+COLUMNAS_BAJA = ("id", "libro_id", "fecha_baja", "cantidad_bajada", "stock_resultante",
+                 "titulo", "autor", "editorial", "isbn", "precio", "ubicacion")
+COLUMNAS_FALTANTE = ("id", "descripcion", "eliminado", "fecha_creacion", "fecha_eliminado")
+
+
+def isbn13(numero):
+    """ISBN-13 válido (prefijo 978, dígito verificador) a partir de un número de 9 dígitos."""
+    cuerpo = f"978{numero % 1_000_000_000:09d}"
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(cuerpo))
+    return cuerpo + str((10 - suma % 10) % 10)
+
+
+class _Sorteo:
+    """random.choices con los pesos acumulados una sola vez."""
+
+    def __init__(self, pesos):
+        self.opciones = list(pesos)
+        self.acumulados = list(accumulate(pesos.values()))
+
+    def __call__(self, azar, k=1):
+        return azar.choices(self.opciones, cum_weights=self.acumulados, k=k)
+
+
+_EDITORIAL = _Sorteo(EDITORIALES)
+_UBICACION = _Sorteo(UBICACIONES)
+_HORA = _Sorteo(PESO_HORA)
+
+
+def titulo(azar):
+    p, p2 = azar.sample(PLURALES, 2)
+    return azar.choice(TITULOS).format(
+        S=azar.choice(SUSTANTIVOS).capitalize(), s=azar.choice(SUSTANTIVOS), m=azar.choice(SUSTANTIVOS_M),
+        M=azar.choice(SUSTANTIVOS_M).capitalize(), p=p, p2=p2, a=azar.choice(ADJETIVOS),
+    )
+
+
+def generar_libros(azar, cantidad, primer_id, ahora):
+    editoriales = _EDITORIAL(azar, cantidad)
+    ubicaciones = _UBICACION(azar, cantidad)
+    for i, libro_id in enumerate(range(primer_id, primer_id + cantidad)):
+        autor = f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}"
+        stock = 0 if azar.random() < 0.15 else int(azar.expovariate(1 / 4)) + 1
+        precio = round(azar.lognormvariate(9.3, 0.5), -1)   # mediana ~11.000
+        fecha_alta = ahora - timedelta(days=azar.randint(0, 3 * 365), minutes=azar.randint(0, 1439))
+        yield (libro_id, titulo(azar), autor, editoriales[i], isbn13(libro_id), stock, precio,
+               ubicaciones[i], fecha_alta.strftime(FORMATO_FECHA))
+
+
+def _ventas_por_dia(cantidad, ahora):
+    """Reparte `cantidad` ventas en los últimos DIAS_DE_HISTORIA días según mes y día de la semana."""
+    primero = ahora.date() - timedelta(days=DIAS_DE_HISTORIA - 1)
+    dias = [primero + timedelta(days=n) for n in range(DIAS_DE_HISTORIA)]
+    # crecimiento suave: el último año vende ~20% más que el anterior
+    pesos = [PESO_MES[d.month] * PESO_DIA_SEMANA[d.weekday()] * (1 + 0.2 * n / DIAS_DE_HISTORIA)
+             for n, d in enumerate(dias)]
+    total = sum(pesos)
+    cuotas = [cantidad * peso / total for peso in pesos]
+    enteras = [int(c) for c in cuotas]
+    # lo que se perdió al redondear va a los días con mayor resto
+    for n in sorted(range(len(dias)), key=lambda n: cuotas[n] - enteras[n], reverse=True)[:cantidad - sum(enteras)]:
+        enteras[n] += 1
+    return zip(dias, enteras)
+
+
+def generar_bajas(azar, cantidad, libros, primer_id, ahora):
+    baja_id = primer_id
+    stock_actual = {}
+    for dia, ventas in _ventas_por_dia(cantidad, ahora):
+        if not ventas:
+            continue
+        horas = _HORA(azar, ventas)
+        momentos = sorted(datetime(dia.year, dia.month, dia.day, hora, azar.randint(0, 59), azar.randint(0, 59))
+                          for hora in horas)
+        for momento in momentos:
+            libro = libros[int(azar.paretovariate(1.1)) % len(libros)]   # pocos libros se venden mucho
+            cantidad_bajada = 1 if azar.random() < 0.85 else azar.randint(2, 5)
+            restante = stock_actual.get(libro[0], 20) - cantidad_bajada
+            if restante < 0:
+                restante = azar.randint(3, 20)   # se repuso
+            stock_actual[libro[0]] = restante
+            yield (baja_id, libro[0], momento.strftime(FORMATO_FECHA), cantidad_bajada, restante,
+                   libro[1], libro[2], libro[3], libro[4], libro[6], libro[7])
+            baja_id += 1
+
+
+def generar_faltantes(azar, cantidad, primer_id, ahora):
+    for faltante_id in range(primer_id, primer_id + cantidad):
+        pedido = titulo(azar) if azar.random() < 0.7 else f"algo de {azar.choice(APELLIDOS)}"
+        creado = ahora - timedelta(days=azar.randint(0, 365), minutes=azar.randint(0, 1439))
+        eliminado = None
+        if azar.random() < 0.3:
+            eliminado = creado + (ahora - creado) * azar.random()
+        yield (faltante_id, f"{pedido} - {azar.choice(APELLIDOS)} (pedido por cliente)",
+               0 if eliminado is None else 1, creado.strftime(FORMATO_FECHA),
+               eliminado.strftime(FORMATO_FECHA) if eliminado else None)
+
+
+class Progreso:
+
+    def __init__(self, activo=True):
+        self.activo = activo
+        self.inicio = time.perf_counter()
+        self.filas = 0
+        self._ultimo = 0.0
+
+    def avanzar(self, tabla, hechas, total, filas):
+        self.filas += filas
+        ahora = time.perf_counter()
+        if not self.activo or (ahora - self._ultimo < 0.5 and hechas < total):
+            return
+        self._ultimo = ahora
+        por_minuto = self.filas / max(ahora - self.inicio, 1e-9) * 60
+        fin = "\n" if hechas >= total or not sys.stdout.isatty() else ""
+        sys.stdout.write(f"\r  {tabla:<13} {hechas:>10,}/{total:,} ({hechas / total:>4.0%})  "
+                         f"{por_minuto:>12,.0f} filas/min{fin}")
+        sys.stdout.flush()
+
+
+def _lotes(filas, tamanio):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == tamanio:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _copiar(cursor, tabla, columnas, lote):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(lote)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insertar(conn, modelo, columnas, filas, total, lote, progreso):
+    """Carga `filas` (tuplas en el orden de `columnas`) de a `lote`: COPY en Postgres, executemany si no."""
+    tabla = f"{esquema.SCHEMA}.{modelo.__tablename__}"
+    cursor = conn.connection.dbapi_connection.cursor()
+    insertar = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+    hechas = 0
+    try:
+        for filas_lote in _lotes(filas, lote):
+            if conn.dialect.name == "postgresql":
+                _copiar(cursor, tabla, columnas, filas_lote)
+            else:
+                cursor.executemany(insertar, filas_lote)
+            hechas += len(filas_lote)
+            progreso.avanzar(modelo.__tablename__, hechas, total, len(filas_lote))
+    finally:
+        cursor.close()
+    return hechas
+
+
+def _siguiente_id(conn, modelo):
+    return (conn.execute(select(func.max(modelo.id))).scalar() or 0) + 1
+
+
+def _ajustar_secuencias(conn):
+    # Con ids explícitos la secuencia de Postgres no avanza sola
+    for modelo in (Libro, LibroBaja, Faltante):
+        tabla = f"{esquema.SCHEMA}.{modelo.__tablename__}"
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                          f"(SELECT COALESCE(MAX(id), 1) FROM {tabla}))"))
+
+
+def sembrar(engine, libros, bajas=0, faltantes=0, semilla=42, lote=LOTE, progreso=False):
+    """Agrega los datos sintéticos y devuelve {tabla: filas insertadas}."""
+    # Base vacía: queda creada y marcada en la última migración (el stamp lo hace preparar_base)
+    esquema.preparar_base(engine)
+    azar = random.Random(semilla)
+    ahora = datetime(2025, 6, 30, 20, 0)
+    avance = Progreso(progreso)
+    insertadas = {}
+    with engine.begin() as conn:
+        paso = max(1, libros // LIBROS_CON_VENTAS)
+        vendibles = []
+
+        def _guardando(filas):
+            for n, fila in enumerate(filas):
+                if n % paso == 0 and len(vendibles) < LIBROS_CON_VENTAS:
+                    vendibles.append(fila)
+                yield fila
+
+        generados = generar_libros(azar, libros, _siguiente_id(conn, Libro), ahora)
+        insertadas["libros"] = _insertar(conn, Libro, COLUMNAS_LIBRO, _guardando(generados), libros, lote, avance)
+        if bajas and vendibles:
+            azar.shuffle(vendibles)   # los más vendidos no son siempre los primeros ids
+            generadas = generar_bajas(azar, bajas, vendibles, _siguiente_id(conn, LibroBaja), ahora)
+            insertadas["libros_bajas"] = _insertar(conn, LibroBaja, COLUMNAS_BAJA, generadas, bajas, lote, avance)
+        if faltantes:
+            generados = generar_faltantes(azar, faltantes, _siguiente_id(conn, Faltante), ahora)
+            insertadas["faltantes"] = _insertar(conn, Faltante, COLUMNAS_FALTANTE, generados, faltantes, lote, avance)
+        if engine.dialect.name == "postgresql":
+            _ajustar_secuencias(conn)
+
+    if insertadas.get("libros_bajas"):
+        with Session(engine) as session:
+            insertadas["bajas_diarias"] = resumen_bajas.reconstruir(session)
+            session.commit()
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for modelo in (Libro, LibroBaja, Faltante):
+                conn.execute(text(f"ANALYZE {esquema.SCHEMA}.{modelo.__tablename__}"))
+    return insertadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=ESCALAS, default="10k")
+    parser.add_argument("--libros", type=int, help="pisa la cantidad de la escala")
+    parser.add_argument("--bajas", type=int)
+    parser.add_argument("--faltantes", type=int)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=LOTE, help="filas por COPY / executemany")
+    parser.add_argument("--sin-progreso", action="store_true")
+    args = parser.parse_args()
+
+    libros, bajas, faltantes = ESCALAS[args.escala]
+    engine = crear_engine(config=Config)
+    inicio = time.perf_counter()
+    insertadas = sembrar(
+        engine,
+        libros if args.libros is None else args.libros,
+        bajas if args.bajas is None else args.bajas,
+        faltantes if args.faltantes is None else args.faltantes,
+        semilla=args.semilla, lote=args.lote, progreso=not args.sin_progreso,
+    )
+    duracion = time.perf_counter() - inicio
+    filas = sum(cantidad for tabla, cantidad in insertadas.items() if tabla != "bajas_diarias")
+    detalle = ", ".join(f"{cantidad:,} {tabla}" for tabla, cantidad in insertadas.items())
+    print(f"✅ Datos sintéticos agregados en {duracion:.1f}s ({filas / duracion * 60:,.0f} filas/min): {detalle}")
 
-# Agregar y guardar
-session.add_all(libros)
-session.commit()
-session.close()
 
-print("Libros agregados exitosamente.")
+if __name__ == "__main__":
+    main()
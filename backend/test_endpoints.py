@@ -0,0 +1,79 @@
+"""
+Endpoints contra SQLite: /ventas todo o nada y revalidación con ETag / 304.
+"""
+from models.libro import Libro
+
+
+def _stock(session, libro_id):
+    session.expire_all()
+    return session.get(Libro, libro_id).stock
+
+
+# ----------------------------------------------------------------------
+# /ventas
+# ----------------------------------------------------------------------
+def test_ventas_descuenta_todos_los_items(cliente, session, crear_libro):
+    a, b = crear_libro(stock=5), crear_libro(stock=2)
+
+    respuesta = cliente.post("/ventas", json={"items": [
+        {"libro_id": a, "cantidad": 2}, {"libro_id": b, "cantidad": 1}, {"libro_id": a, "cantidad": 1},
+    ]})
+
+    assert respuesta.status_code == 200
+    assert {i["libro_id"]: i["stock"] for i in respuesta.get_json()["items"]} == {a: 2, b: 1}
+    assert (_stock(session, a), _stock(session, b)) == (2, 1)
+
+
+def test_ventas_sin_stock_en_un_item_no_descuenta_ninguno(cliente, session, crear_libro):
+    a, b = crear_libro(stock=5), crear_libro(stock=1)
+
+    respuesta = cliente.post("/ventas", json={"items": [
+        {"libro_id": a, "cantidad": 2}, {"libro_id": b, "cantidad": 3},
+    ]})
+
+    assert respuesta.status_code == 400
+    assert [f["libro_id"] for f in respuesta.get_json()["faltantes"]] == [b]
+    assert (_stock(session, a), _stock(session, b)) == (5, 1)
+
+
+def test_ventas_con_un_libro_inexistente_no_descuenta_ninguno(cliente, session, crear_libro):
+    a = crear_libro(stock=5)
+
+    respuesta = cliente.post("/ventas", json={"items": [{"libro_id": a}, {"libro_id": 10**9}]})
+
+    assert respuesta.status_code == 400
+    assert _stock(session, a) == 5
+
+
+# ----------------------------------------------------------------------
+# ETag / 304
+# ----------------------------------------------------------------------
+def test_faltantes_contesta_304_hasta_que_cambian(cliente):
+    primera = cliente.get("/api/faltantes")
+    etag = primera.headers["ETag"]
+    assert primera.status_code == 200
+    assert primera.headers["Cache-Control"] == "no-cache"
+
+    repetida = cliente.get("/api/faltantes", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.headers["ETag"] == etag
+
+    assert cliente.post("/api/faltantes", json={"descripcion": "Zama"}).status_code == 200
+
+    despues = cliente.get("/api/faltantes", headers={"If-None-Match": etag})
+    assert despues.status_code == 200
+    assert despues.headers["ETag"] != etag
+    assert "Zama" in [f["descripcion"] for f in despues.get_json()]
+
+
+def test_isbn_revalida_despues_de_una_venta(cliente, session, crear_libro):
+    libro_id = crear_libro(stock=3)
+    isbn = session.get(Libro, libro_id).isbn
+    etag = cliente.get(f"/libros/isbn/{isbn}").headers["ETag"]
+    assert cliente.get(f"/libros/isbn/{isbn}", headers={"If-None-Match": etag}).status_code == 304
+
+    assert cliente.put(f"/libros/{libro_id}/vender", json={"cantidad": 1}).status_code == 200
+
+    despues = cliente.get(f"/libros/isbn/{isbn}", headers={"If-None-Match": etag})
+    assert despues.status_code == 200
+    assert despues.get_json()["stock"] == 2
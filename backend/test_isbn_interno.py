@@ -0,0 +1,46 @@
+"""
+Códigos internos de /generar-isbn: bloques por worker y tope de 5 dígitos.
+"""
+import pytest
+from sqlalchemy import delete, insert
+
+from controllers.isbn_interno import MAXIMO, NOMBRE_CONTADOR, AsignadorIsbn, CodigosAgotados
+from models.libro import Contador
+
+
+@pytest.fixture
+def contador(app):
+    """Fija el valor del contador de códigos internos (lo borra al terminar)."""
+    def _fijar(valor):
+        with app.engine.begin() as conn:
+            conn.execute(delete(Contador).where(Contador.nombre == NOMBRE_CONTADOR))
+            conn.execute(insert(Contador).values(nombre=NOMBRE_CONTADOR, valor=valor))
+    yield _fijar
+    with app.engine.begin() as conn:
+        conn.execute(delete(Contador).where(Contador.nombre == NOMBRE_CONTADOR))
+
+
+def test_entrega_codigos_consecutivos_de_un_bloque(app, contador):
+    contador(100)
+    asignador = AsignadorIsbn(app.engine, tamanio_bloque=3)
+
+    assert [asignador.siguiente() for _ in range(4)] == ["00101", "00102", "00103", "00104"]
+
+
+def test_el_ultimo_bloque_se_recorta_en_el_maximo(app, contador):
+    contador(MAXIMO - 2)
+    asignador = AsignadorIsbn(app.engine, tamanio_bloque=20)
+
+    assert [asignador.siguiente() for _ in range(2)] == ["99998", "99999"]
+    with pytest.raises(CodigosAgotados):
+        asignador.siguiente()
+
+
+def test_generar_isbn_sin_codigos_libres_contesta_409(app, cliente, contador):
+    contador(MAXIMO)
+    app.asignador_isbn._disponibles = []
+
+    respuesta = cliente.get("/generar-isbn")
+
+    assert respuesta.status_code == 409
+    assert "99999" in respuesta.get_json()["mensaje"]
@@ -0,0 +1,156 @@
+"""
+Estructuras en memoria frente a commits que llegan en medio de una carga o
+de una consulta: IndiceLibros, DiccionarioEditoriales, SugerenciasLibros y
+CacheIsbn.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from controllers import eventos
+from controllers.busqueda import IndiceLibros
+from controllers.cache_isbn import CacheIsbn
+from controllers.editoriales import DiccionarioEditoriales
+from controllers.sugerencias import TZ_ARGENTINA, SugerenciasLibros
+from models.libro import Libro, LibroBaja
+
+
+def _con_commit_en_medio(filas, commit, despues_de=1):
+    """Itera `filas` y llama a `commit()` después de las primeras `despues_de`."""
+    for n, fila in enumerate(filas, 1):
+        yield fila
+        if n == despues_de:
+            commit()
+
+
+class SesionConCommitEnVuelo:
+    """Sesión que simula un commit de otro request entre el SELECT y el uso de sus filas."""
+
+    def __init__(self, session, commit):
+        self.session = session
+        self.commit = commit
+
+    def execute(self, *args, **kwargs):
+        congelado = self.session.execute(*args, **kwargs).freeze()
+        self.commit()
+        return congelado()
+
+
+# ----------------------------------------------------------------------
+# Carga con commits en vuelo (se guardan y se aplican al terminar)
+# ----------------------------------------------------------------------
+def test_indice_aplica_los_commits_recibidos_durante_la_carga():
+    indice = IndiceLibros()
+    filas = [(1, "Rayuela", "Cortázar"), (2, "Ficciones", "Borges"), (3, "Zama", "Di Benedetto")]
+
+    def commit():
+        indice.on_commit(eventos.MODIFICACION, {"id": 3, "titulo": "Zama (edición crítica)"})
+        indice.on_commit(eventos.BAJA, {"id": 2})
+
+    indice.cargar(_con_commit_en_medio(filas, commit))
+
+    assert indice.cargado
+    assert indice.doc(2) is None
+    assert "critica" in indice.doc(3)[0]
+
+
+def test_indice_descarta_los_commits_sin_carga_en_curso():
+    indice = IndiceLibros()
+    indice.on_commit(eventos.ALTA, {"id": 1, "titulo": "Rayuela", "autor": "Cortázar"})
+
+    indice.cargar([])
+
+    assert indice.doc(1) is None   # la carga ya lee lo confirmado
+
+
+def test_editoriales_aplica_los_commits_recibidos_durante_la_carga():
+    editoriales = DiccionarioEditoriales()
+    filas = [(1, "Sudamericana"), (2, "Sudamericana"), (3, "Emecé")]
+
+    def commit():
+        editoriales.on_commit(eventos.MODIFICACION, {"id": 3, "editorial": "Sudamericana"})
+
+    editoriales.cargar(_con_commit_en_medio(filas, commit))
+
+    assert editoriales.cargado
+    assert editoriales._conteos == {"Sudamericana": 3}
+
+
+def test_sugerencias_no_cuenta_dos_veces_una_venta_durante_la_carga(app, session, crear_libro):
+    libro_id = crear_libro(titulo="Sugerencia en carrera", stock=8)
+    indice = IndiceLibros()
+    indice.asegurar_cargado(session)
+    sugerencias = SugerenciasLibros(indice)
+    eventos.suscribir(Libro, sugerencias.on_commit_libro)
+    eventos.suscribir(LibroBaja, sugerencias.on_commit_baja)
+    cargar_ventas = sugerencias._cargar_ventas
+
+    def commit_en_medio(s):
+        # Otro request vende mientras se carga: la carga puede o no ver la venta
+        otra = app.session_factory.session_factory()
+        try:
+            libro = otra.get(Libro, libro_id)
+            libro.stock = 5
+            otra.add(LibroBaja(libro_id=libro_id, fecha_baja=datetime.now(TZ_ARGENTINA).replace(tzinfo=None),
+                               cantidad_bajada=3, stock_resultante=5, titulo=libro.titulo, autor=libro.autor,
+                               isbn=libro.isbn, ubicacion=libro.ubicacion))
+            otra.commit()
+        finally:
+            otra.close()
+        cargar_ventas(s)
+
+    sugerencias._cargar_ventas = commit_en_medio
+    try:
+        sugerencias.asegurar_cargado(session)
+    finally:
+        for modelo, callback in ((Libro, sugerencias.on_commit_libro), (LibroBaja, sugerencias.on_commit_baja)):
+            eventos._suscriptores[modelo].remove(callback)
+
+    assert sugerencias.cargado
+    assert sugerencias._stock[libro_id] == 5
+    assert sugerencias._ventas[libro_id] == 3
+
+
+# ----------------------------------------------------------------------
+# Cache de ISBN: lecturas viejas que no pisan commits más nuevos
+# ----------------------------------------------------------------------
+def test_cache_descarta_la_fila_leida_antes_de_un_commit(session, crear_libro):
+    libro_id = crear_libro(stock=5)
+    isbn = session.get(Libro, libro_id).isbn
+    cache = CacheIsbn()
+
+    def commit():
+        cache.on_commit(eventos.MODIFICACION, {"id": libro_id, "stock": 4})
+
+    fila = cache.buscar(SesionConCommitEnVuelo(session, commit), isbn)
+
+    assert fila["stock"] == 5          # lo que se leyó se devuelve...
+    assert isbn not in cache._filas    # ...pero no queda cacheado por encima del commit
+
+
+def test_cache_no_marca_inexistente_un_isbn_dado_de_alta_en_vuelo(session):
+    cache = CacheIsbn()
+    nuevo = {"id": 10**9, "titulo": "Nuevo", "autor": "Autor", "editorial": None,
+             "isbn": "9789879999999", "stock": 1, "precio": 10.0, "ubicacion": "B2"}
+
+    def commit():
+        cache.on_commit(eventos.ALTA, nuevo)
+
+    assert cache.buscar(SesionConCommitEnVuelo(session, commit), nuevo["isbn"]) is None
+    assert nuevo["isbn"] not in cache._negativos
+    assert cache._filas[nuevo["isbn"]][0] == nuevo
+
+
+def test_cache_la_carga_no_pisa_un_commit_en_vuelo(session, crear_libro):
+    libro_id = crear_libro(stock=5)
+    isbn = session.get(Libro, libro_id).isbn
+    cache = CacheIsbn()
+    cache.buscar(session, isbn)
+
+    def commit():
+        cache.on_commit(eventos.MODIFICACION, {"id": libro_id, "stock": 2})
+
+    cache.cargar(SesionConCommitEnVuelo(session, commit))
+
+    assert cache._filas[isbn][0]["stock"] == 2
+    assert session.execute(select(Libro.stock).where(Libro.id == libro_id)).scalar() == 5
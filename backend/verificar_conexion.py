@@ -5,7 +5,9 @@ y mostrar información de la BD actual
 """
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+
+from database import crear_engine
 
 # Cargar variables de entorno
 load_dotenv()
@@ -24,7 +26,7 @@ print("=" * 50)
 
 try:
     # Crear conexión
-    engine = create_engine(database_url)
+    engine = crear_engine(database_url)
     
     with engine.connect() as conn:
         # Verificar a qué base de datos estamos conectados